@@ -1,12 +1,49 @@
+from importlib import import_module
 from .result import Result
 from .error import *
-from .fifo_lock import FifoLock
-from .gate import Gate, ServerStatus, ServerStatusEnum
-from .redis_protocol import RedisProtocol
-from .redis_server_base import RedisServerBase
-from .redis_server import RedisServer
-from .websocket_session import WebsocketSession
-from .websocket_app import WebsocketApp
-from .node import PorkPepperNode
-from .design import SocketBasedRedisServer, ServiceBasedRedisServer, WebsocketNode, RedisServiceNode, service
-from .monitor_node import SimpleMonitorNode
+from .error import __all__ as _error_all
+
+
+_LAZY_ATTRIBUTES = {
+    "FifoLock": ".fifo_lock",
+    "Gate": ".gate",
+    "ServerStatus": ".gate",
+    "ServerStatusEnum": ".gate",
+    "RedisProtocol": ".redis_protocol",
+    "RedisRequestParser": ".redis_parser",
+    "RedisConnection": ".redis_connection",
+    "RedisCommand": ".redis_command",
+    "command": ".redis_command",
+    "RedisServerBase": ".redis_server_base",
+    "RedisServer": ".redis_server",
+    "WebsocketSession": ".websocket_session",
+    "WebsocketApp": ".websocket_app",
+    "WebsocketCodec": ".websocket_codec",
+    "JsonCodec": ".websocket_codec",
+    "MsgpackCodec": ".websocket_codec",
+    "CborCodec": ".websocket_codec",
+    "PorkPepperNode": ".node",
+    "SocketBasedRedisServer": ".design",
+    "ServiceBasedRedisServer": ".design",
+    "WebsocketNode": ".design",
+    "RedisServiceNode": ".design",
+    "service": ".design",
+    "PorkPepperClient": ".client",
+    "SimpleMonitorNode": ".monitor_node",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name, None)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
+
+
+__all__ = ["Result", ] + list(_error_all) + list(_LAZY_ATTRIBUTES)
@@ -0,0 +1,376 @@
+from typing import *
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import platform
+import aiohttp
+from .client import ClientConnection
+from .websocket_session import WebsocketSession
+from .design import WebsocketNode, RedisServiceNode, service
+
+
+SCENARIOS = ["service_getset", "service_set", "websocket_set", "scan", "fanout", "info", ]
+SERVER_KIND = {
+    "service_getset": "service",
+    "service_set": "service",
+    "websocket_set": "websocket",
+    "scan": "websocket",
+    "fanout": "websocket",
+    "info": "service",
+}
+
+
+class BenchService:
+    @classmethod
+    @service("echo", output=True)
+    async def echo(cls, message):
+        return message
+
+    @classmethod
+    @service("sink")
+    async def sink(cls, message):
+        pass
+
+
+class BenchSession(WebsocketSession):
+    pass
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(math.ceil(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(scenario: str, operations: int, latencies: List[float], errors: int, duration: float, **extra) -> Dict:
+    latencies = sorted(latencies)
+    report = dict(
+        scenario=scenario,
+        operations=operations,
+        errors=errors,
+        duration=round(duration, 6),
+        ops_per_sec=round(operations / duration, 2) if duration > 0 else 0.0,
+        latency_ms=dict(
+            mean=round(sum(latencies) / len(latencies) * 1000, 4) if latencies else 0.0,
+            p50=round(percentile(latencies, 0.5) * 1000, 4),
+            p99=round(percentile(latencies, 0.99) * 1000, 4),
+            p999=round(percentile(latencies, 0.999) * 1000, 4),
+            max=round(latencies[-1] * 1000, 4) if latencies else 0.0,
+        ),
+    )
+    report.update(extra)
+    return report
+
+
+async def start_node(kind: str, redis_port: int, http_port: int, keys: int):
+    if kind == "service":
+        node = RedisServiceNode()
+        await node.start(service_map={0: BenchService}, redis_host="127.0.0.1", redis_port=redis_port)
+        return node
+    node = WebsocketNode(BenchSession, "/bench")
+    await node.start(host="127.0.0.1", port=http_port, redis_host="127.0.0.1", redis_port=redis_port)
+    app = node._http_app
+    for i in range(keys):
+        app.add_session(f"bench:{i:08d}", WebsocketSession())
+    return node
+
+
+async def start_subprocess(kind: str, options):
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "porkpepper.bench",
+        "--serve", kind,
+        "--redis-port", str(options.redis_port),
+        "--http-port", str(options.http_port),
+        "--keys", str(options.keys),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    line = await process.stdout.readline()
+    if line.strip() != b"ready":
+        process.kill()
+        raise RuntimeError(f"benchmark server failed to start: {line!r}")
+    return process
+
+
+async def open_connections(options) -> List[ClientConnection]:
+    loop = asyncio.get_running_loop()
+    connections = list()
+    for _ in range(options.clients):
+        _, connection = await loop.create_connection(ClientConnection, "127.0.0.1", options.redis_port)
+        connections.append(connection)
+    return connections
+
+
+async def drive(options, make_command: Callable[[int], Tuple]) -> Tuple[List[float], int, float]:
+    connections = await open_connections(options)
+    latencies = list()
+    errors = 0
+    remaining = options.requests
+    sequence = 0
+
+    async def worker(connection: ClientConnection):
+        nonlocal errors, remaining, sequence
+        while remaining > 0:
+            depth = min(options.pipeline, remaining)
+            remaining -= depth
+            start = time.perf_counter()
+            waiters = list()
+            for _ in range(depth):
+                waiters.append(connection.send(*make_command(sequence)))
+                sequence += 1
+            for waiter in waiters:
+                reply = await waiter
+                latencies.append(time.perf_counter() - start)
+                if isinstance(reply, Exception):
+                    errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(connection) for connection in connections])
+    duration = time.perf_counter() - start
+    for connection in connections:
+        connection.close()
+    return latencies, errors, duration
+
+
+class WebsocketClients:
+    def __init__(self, options):
+        self.options = options
+        self.http: Optional[aiohttp.ClientSession] = None
+        self.sockets = list()
+        self.tasks = list()
+        self.session_ids: List[str] = list()
+        self.received = 0
+        self.expected = 0
+        self.event = asyncio.Event()
+
+    async def __aenter__(self):
+        options = self.options
+        self.http = aiohttp.ClientSession()
+        for _ in range(options.sessions):
+            ws = await self.http.ws_connect(f"http://127.0.0.1:{options.http_port}/bench")
+            self.sockets.append(ws)
+            self.tasks.append(asyncio.ensure_future(self.receive(ws)))
+        loop = asyncio.get_running_loop()
+        _, connection = await loop.create_connection(ClientConnection, "127.0.0.1", options.redis_port)
+        reply = await connection.send(b"KEYS", b"SS*")
+        connection.close()
+        while len(reply) < options.sessions:
+            await asyncio.sleep(0.01)
+            _, connection = await loop.create_connection(ClientConnection, "127.0.0.1", options.redis_port)
+            reply = await connection.send(b"KEYS", b"SS*")
+            connection.close()
+        self.session_ids = [key.decode("utf8") for key in reply]
+        return self
+
+    async def receive(self, ws):
+        async for _ in ws:
+            self.received += 1
+            if self.expected and self.received >= self.expected:
+                self.event.set()
+
+    def expect(self, count: int):
+        self.received = 0
+        self.expected = count
+        self.event.clear()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        for ws in self.sockets:
+            await ws.close()
+        for task in self.tasks:
+            task.cancel()
+        await self.http.close()
+
+
+def payload_message(options) -> bytes:
+    return json.dumps(dict(data="x" * options.payload)).encode("utf8")
+
+
+async def bench_service_getset(options) -> Dict:
+    value = payload_message(options)
+    latencies, errors, duration = await drive(options, lambda i: (b"GETSET", b"echo", value))
+    return summarize("service_getset", len(latencies), latencies, errors, duration)
+
+
+async def bench_service_set(options) -> Dict:
+    value = payload_message(options)
+    latencies, errors, duration = await drive(options, lambda i: (b"SET", b"sink", value))
+    return summarize("service_set", len(latencies), latencies, errors, duration)
+
+
+async def bench_websocket_set(options) -> Dict:
+    value = payload_message(options)
+    async with WebsocketClients(options) as clients:
+        session_ids = [session_id.encode("utf8") for session_id in clients.session_ids]
+        clients.expect(options.requests)
+        latencies, errors, duration = await drive(
+            options, lambda i: (b"SET", session_ids[i % len(session_ids)], value))
+        try:
+            await asyncio.wait_for(clients.event.wait(), options.timeout)
+        except asyncio.TimeoutError:
+            pass
+        delivered = clients.received
+    return summarize("websocket_set", len(latencies), latencies, errors, duration, delivered=delivered)
+
+
+async def bench_scan(options) -> Dict:
+    count = str(options.scan_count).encode("utf8")
+    connections = await open_connections(options)
+    latencies = list()
+    errors = 0
+    remaining = options.requests
+
+    async def worker(connection: ClientConnection):
+        nonlocal errors, remaining
+        cursor = b"0"
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            reply = await connection.send(b"SCAN", cursor, b"MATCH", b"bench:*", b"COUNT", count)
+            latencies.append(time.perf_counter() - start)
+            if isinstance(reply, Exception):
+                errors += 1
+                cursor = b"0"
+            else:
+                cursor = reply[0]
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(connection) for connection in connections])
+    duration = time.perf_counter() - start
+    for connection in connections:
+        connection.close()
+    return summarize("scan", len(latencies), latencies, errors, duration, keys=options.keys)
+
+
+async def bench_fanout(options) -> Dict:
+    value = payload_message(options)
+    rounds = max(1, options.requests // max(1, options.sessions))
+    latencies = list()
+    errors = 0
+    loop = asyncio.get_running_loop()
+    async with WebsocketClients(options) as clients:
+        _, connection = await loop.create_connection(ClientConnection, "127.0.0.1", options.redis_port)
+        session_ids = [session_id.encode("utf8") for session_id in clients.session_ids]
+        start = time.perf_counter()
+        for _ in range(rounds):
+            clients.expect(len(session_ids))
+            round_start = time.perf_counter()
+            waiters = [connection.send(b"SET", session_id, value) for session_id in session_ids]
+            for waiter in waiters:
+                if isinstance(await waiter, Exception):
+                    errors += 1
+            try:
+                await asyncio.wait_for(clients.event.wait(), options.timeout)
+            except asyncio.TimeoutError:
+                errors += 1
+            latencies.append(time.perf_counter() - round_start)
+        duration = time.perf_counter() - start
+        connection.close()
+    return summarize("fanout", rounds * len(session_ids), latencies, errors, duration,
+                     rounds=rounds, sessions=len(session_ids))
+
+
+async def bench_info(options) -> Dict:
+    sections = [(b"INFO", ), (b"INFO", b"stats"), (b"INFO", b"keyspace"), ]
+    latencies, errors, duration = await drive(options, lambda i: sections[i % len(sections)])
+    return summarize("info", len(latencies), latencies, errors, duration)
+
+
+BENCHMARKS = {
+    "service_getset": bench_service_getset,
+    "service_set": bench_service_set,
+    "websocket_set": bench_websocket_set,
+    "scan": bench_scan,
+    "fanout": bench_fanout,
+    "info": bench_info,
+}
+
+
+async def run_scenario(scenario: str, options) -> Dict:
+    kind = SERVER_KIND[scenario]
+    node = None
+    process = None
+    if options.subprocess:
+        process = await start_subprocess(kind, options)
+    else:
+        node = await start_node(kind, options.redis_port, options.http_port, options.keys)
+    try:
+        return await BENCHMARKS[scenario](options)
+    finally:
+        await asyncio.sleep(0.05)
+        if node is not None:
+            await node.stop()
+        if process is not None:
+            process.terminate()
+            await process.wait()
+
+
+async def run_benchmark(options) -> Dict:
+    results = list()
+    for scenario in options.scenario or SCENARIOS:
+        results.append(await run_scenario(scenario, options))
+    return dict(
+        python=platform.python_version(),
+        platform=platform.platform(),
+        timestamp=int(time.time()),
+        options=dict(
+            clients=options.clients,
+            pipeline=options.pipeline,
+            payload=options.payload,
+            requests=options.requests,
+            sessions=options.sessions,
+            keys=options.keys,
+            subprocess=options.subprocess,
+        ),
+        results=results,
+    )
+
+
+async def serve(options):
+    node = await start_node(options.serve, options.redis_port, options.http_port, options.keys)
+    print("ready", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await node.stop()
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m porkpepper.bench")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--pipeline", type=int, default=1)
+    parser.add_argument("--payload", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--scan-count", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=5)
+    parser.add_argument("--redis-port", type=int, default=6390)
+    parser.add_argument("--http-port", type=int, default=9190)
+    parser.add_argument("--subprocess", action="store_true")
+    parser.add_argument("--output")
+    parser.add_argument("--serve", choices=["service", "websocket", ], help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    options = parse_args(argv)
+    if options.serve:
+        try:
+            asyncio.run(serve(options))
+        except KeyboardInterrupt:
+            pass
+        return
+    report = asyncio.run(run_benchmark(options))
+    output = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
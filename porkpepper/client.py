@@ -0,0 +1,330 @@
+from typing import *
+import json
+import asyncio
+from collections import deque
+from urllib.parse import urlparse
+from .error import *
+from .result import Result
+
+
+NOT_ENOUGH_DATA = object()
+
+
+def encode_command(*args: Union[bytes, str, int]) -> List[bytes]:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf8")
+        elif isinstance(arg, int):
+            arg = str(arg).encode("utf8")
+        parts.append(b"$%d\r\n" % len(arg))
+        parts.append(arg)
+        parts.append(b"\r\n")
+    return parts
+
+
+def parse_info(info: Union[bytes, str]) -> Dict[str, Dict[str, Any]]:
+    if isinstance(info, bytes):
+        info = info.decode("utf8")
+    sections = dict()
+    fields = None
+    for line in info.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            fields = sections.setdefault(line[1:].strip().lower(), dict())
+            continue
+        if fields is None or ":" not in line:
+            continue
+        key, value = line.split(":", 1)
+        if "=" in value:
+            value = dict(item.split("=", 1) for item in value.split(",") if "=" in item)
+        fields[key] = value
+    return sections
+
+
+class RedisReplyParser:
+    COMPACT_SIZE = 64 * 1024
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pos = 0
+
+    def feed(self, data: bytes):
+        if self._pos and (self._pos == len(self._buffer) or self._pos > self.COMPACT_SIZE):
+            del self._buffer[:self._pos]
+            self._pos = 0
+        self._buffer.extend(data)
+
+    def _parse(self, pos: int) -> Tuple[Any, int]:
+        buffer = self._buffer
+        line_end = buffer.find(b"\r\n", pos)
+        if line_end < 0:
+            return NOT_ENOUGH_DATA, pos
+        marker = buffer[pos]
+        line = bytes(buffer[pos + 1:line_end])
+        pos = line_end + 2
+        if marker == 36:
+            size = int(line)
+            if size < 0:
+                return None, pos
+            if len(buffer) < pos + size + 2:
+                return NOT_ENOUGH_DATA, pos
+            return bytes(buffer[pos:pos + size]), pos + size + 2
+        if marker == 43:
+            return line.decode("utf8"), pos
+        if marker == 45:
+            return ReplyError(line.decode("utf8")), pos
+        if marker == 58:
+            return int(line), pos
+        if marker == 42:
+            count = int(line)
+            if count < 0:
+                return None, pos
+            items = list()
+            for _ in range(count):
+                item, pos = self._parse(pos)
+                if item is NOT_ENOUGH_DATA:
+                    return NOT_ENOUGH_DATA, pos
+                items.append(item)
+            return items, pos
+        raise RedisProtocolFormatError()
+
+    def gets(self) -> Any:
+        if self._pos >= len(self._buffer):
+            return NOT_ENOUGH_DATA
+        reply, pos = self._parse(self._pos)
+        if reply is not NOT_ENOUGH_DATA:
+            self._pos = pos
+        return reply
+
+
+class ClientConnection(asyncio.Protocol):
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._parser = RedisReplyParser()
+        self._transport: Optional[asyncio.Transport] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._output: List[bytes] = list()
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self.db: Optional[int] = 0
+        self.db_waiter: Optional[asyncio.Future] = None
+        self.closed = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._waiters)
+
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def data_received(self, data):
+        parser = self._parser
+        parser.feed(data)
+        waiters = self._waiters
+        while True:
+            try:
+                reply = parser.gets()
+            except Exception as e:
+                self._transport.abort()
+                return
+            if reply is NOT_ENOUGH_DATA:
+                break
+            if not waiters:
+                self._transport.abort()
+                return
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(reply)
+
+    def connection_lost(self, exc):
+        self.closed = True
+        self._transport = None
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(ConnectionResetError("Connection lost"))
+
+    def send(self, *args: Union[bytes, str, int]) -> asyncio.Future:
+        waiter = self._loop.create_future()
+        if self.closed:
+            waiter.set_result(ConnectionResetError("Connection lost"))
+            return waiter
+        self._output.extend(encode_command(*args))
+        self._waiters.append(waiter)
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_soon(self._flush)
+        return waiter
+
+    def _flush(self):
+        self._flush_handle = None
+        if self._transport is not None and self._output:
+            self._transport.writelines(self._output)
+        self._output = list()
+
+    def close(self):
+        self.closed = True
+        if self._transport is not None:
+            self._flush()
+            self._transport.close()
+
+
+class PorkPepperClient:
+    MAX_CONNECTIONS = 4
+
+    def __init__(
+            self,
+            host: str = "127.0.0.1",
+            port: int = 6379,
+            password: Optional[str] = None,
+            db: int = 0,
+            max_connections: int = MAX_CONNECTIONS,
+            timeout: Optional[float] = None,
+            service=None,
+            loads: Callable = None,
+            dumps: Callable = None,
+    ):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.db = db
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._loads = loads or getattr(service, "LOADS", json.loads)
+        self._dumps = dumps or getattr(service, "DUMPS", json.dumps)
+        self._connections: List[ClientConnection] = list()
+        self._connecting = 0
+        self._connected = asyncio.Condition()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'PorkPepperClient':
+        parsed = urlparse(url)
+        db = parsed.path.strip("/")
+        options = dict(
+            host=parsed.hostname or "127.0.0.1",
+            port=parsed.port or 6379,
+            password=parsed.password,
+            db=int(db) if db else 0,
+        )
+        options.update(kwargs)
+        return cls(**options)
+
+    @property
+    def connections_count(self) -> int:
+        return len(self._connections)
+
+    async def _connect(self) -> ClientConnection:
+        loop = asyncio.get_running_loop()
+        _, connection = await loop.create_connection(ClientConnection, self.host, self.port)
+        if self.password is not None:
+            try:
+                auth_result = await connection.send(b"AUTH", self.password)
+            except BaseException:
+                connection.close()
+                raise
+            if isinstance(auth_result, Exception):
+                connection.close()
+                raise auth_result
+        return connection
+
+    async def _acquire(self) -> ClientConnection:
+        while True:
+            connections = self._connections = [c for c in self._connections if not c.closed]
+            idle = min(connections, key=lambda c: c.pending) if connections else None
+            if idle is not None and idle.pending == 0:
+                return idle
+            if len(connections) + self._connecting < self.max_connections:
+                self._connecting += 1
+                try:
+                    connection = await self._connect()
+                    self._connections.append(connection)
+                    return connection
+                finally:
+                    self._connecting -= 1
+                    async with self._connected:
+                        self._connected.notify_all()
+            if idle is not None:
+                return idle
+            async with self._connected:
+                await self._connected.wait()
+
+    async def execute(self, *args: Union[bytes, str, int], db: Optional[int] = None,
+                      timeout: Optional[float] = None) -> Result[Any]:
+        db = self.db if db is None else db
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        try:
+            if timeout is None:
+                connection = await self._acquire()
+            else:
+                connection = await asyncio.wait_for(self._acquire(), timeout)
+        except Exception as e:
+            return Result(e)
+        if connection.db != db:
+            connection.db_waiter = connection.send(b"SELECT", db)
+            connection.db = db
+        select_waiter = connection.db_waiter
+        waiter = connection.send(*args)
+        try:
+            if timeout is None:
+                reply = await waiter
+            else:
+                reply = await asyncio.wait_for(waiter, max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError as e:
+            return Result(e)
+        if select_waiter is not None:
+            select_reply = select_waiter.result()
+            if isinstance(select_reply, Exception):
+                if connection.db_waiter is select_waiter:
+                    connection.db = None
+                    connection.close()
+                return Result(select_reply)
+        return Result(reply)
+
+    async def call(self, db: int, key: str, payload: Any = None, timeout: Optional[float] = None) -> Result[Any]:
+        try:
+            value = self._dumps(payload)
+        except Exception as e:
+            return Result(e)
+        reply_result = await self.execute(b"GETSET", key, value, db=db, timeout=timeout)
+        if reply_result.is_error:
+            return reply_result
+        reply = reply_result.unwrap()
+        if reply is None:
+            return Result(KeyNotFound())
+        try:
+            return Result(self._loads(reply))
+        except Exception as e:
+            return Result(e)
+
+    async def fire(self, db: int, key: str, payload: Any = None, timeout: Optional[float] = None) -> Result[bool]:
+        try:
+            value = self._dumps(payload)
+        except Exception as e:
+            return Result(e)
+        reply_result = await self.execute(b"SET", key, value, db=db, timeout=timeout)
+        if reply_result.is_error:
+            return reply_result
+        return Result(reply_result.unwrap() == "OK")
+
+    async def info(self, section: Optional[str] = None, timeout: Optional[float] = None) -> Result[Dict]:
+        args = (b"INFO", section) if section else (b"INFO", )
+        reply_result = await self.execute(*args, timeout=timeout)
+        if reply_result.is_error:
+            return reply_result
+        return Result(parse_info(reply_result.unwrap()))
+
+    async def close(self):
+        connections = self._connections
+        self._connections = list()
+        for connection in connections:
+            connection.close()
+        await asyncio.sleep(0)
+
+
+__all__ = ["PorkPepperClient", "RedisReplyParser", "parse_info", ]
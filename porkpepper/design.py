@@ -1,20 +1,29 @@
 from typing import *
-import fnmatch
+import os
 import json
 import inspect
+import signal
+import socket
 import asyncio
 from .error import *
 from .result import Result
 from .node import PorkPepperNode
 from .redis_server import RedisServer
+from .key_index import SortedKeyIndex
+from .redis_stats import LatencyHistogram
+from .service_executor import EXECUTOR_KINDS
+from .service_cache import ServiceCache
+from .service_entry import ServiceEntry
 
 
 PORKPEPPER_ATTR = "__porkpepper__"
 
 
 class SocketBasedRedisServer(RedisServer):
+    INFO_MODE = "websocket"
     MAX_DB_COUNT = 2
-    LOADS = json.loads
+    SCAN_COUNT = 10
+    LOADS = staticmethod(json.loads)
 
     def _session_db_size(self) -> int:
         app = self.app
@@ -36,7 +45,9 @@ class SocketBasedRedisServer(RedisServer):
                     type="session",
                     session_id=session.session_id,
                     create_timestamp=session.create_timestamp,
-                    current_user=session.current_user
+                    current_user=session.current_user,
+                    **session.outbound_stats(),
+                    **session.inbound_stats()
                 )
 
     async def get(self, session, key) -> Result[bytes]:
@@ -56,19 +67,12 @@ class SocketBasedRedisServer(RedisServer):
     async def getset(self, session, key, value) -> Result:
         return Result(NotImplementedError())
 
-    @classmethod
-    async def send_task(cls, session, message):
-        try:
-            await session.send(message)
-        except Exception as e:
-            pass
-
     async def set(self, session, key, value) -> Result:
         app = self.app
         if session.current_db == 0:
             session = app.get_session(key) if app is not None else None
-            if session:
-                asyncio.ensure_future(asyncio.Task(self.send_task(session, self.LOADS(value))))
+            if session and not await session.send(self.LOADS(value)):
+                return Result(MessageDropped())
         return Result(True)
 
     async def key_type(self, session, key):
@@ -77,28 +81,14 @@ class SocketBasedRedisServer(RedisServer):
     async def ping(self, session):
         return Result("PONG")
 
-    def info_arguments(self):
-        service_list = list()
-        service_list.append(
-            (0,
-             dict(
-                 keys=self._session_db_size(),
-             )
-             ))
-        service_list.append(
-            (1,
-             dict(
-                 keys=self._user_db_size(),
-             )
-             ))
-        arguments = super(SocketBasedRedisServer, self).info_arguments()
-        arguments.update(porkpepper_mode="websocket", keyspace=service_list)
-        return arguments
-
-    async def info(self, session):
-        info_arguments = self.info_arguments()
-        info = self.INFO_TEMPLATE.render(info_arguments)
-        return Result(info)
+    def keyspace(self) -> List[Tuple[int, Dict]]:
+        return [
+            (0, dict(keys=self._session_db_size()), ),
+            (1, dict(keys=self._user_db_size()), ),
+        ]
+
+    async def info(self, session, section=None):
+        return Result(self.render_info(section))
 
     async def auth(self, session, password) -> Result[bool]:
         if self.password is None:
@@ -111,36 +101,31 @@ class SocketBasedRedisServer(RedisServer):
 
     def _scan_sessions(self, pattern=None):
         app = self.app
-        keys = list()
-        sessions = app.all_sessions() if app is not None else list()
-        for session in sessions:
-            if pattern is not None:
-                if fnmatch.fnmatch(session.session_id, pattern):
-                    keys.append(session.session_id)
-            else:
-                keys.append(session.session_id)
-        return keys
+        return app.session_keys(pattern) if app is not None else list()
 
     def _scan_users(self, pattern=None):
         app = self.app
-        keys = list()
-        users = app.all_users() if app is not None else list()
-        for user in users:
-            if pattern is not None:
-                if fnmatch.fnmatch(user, pattern):
-                    keys.append(user)
-            else:
-                keys.append(user)
-        return keys
+        return app.user_keys(pattern) if app is not None else list()
 
-    async def scan(self, session, pattern):
-        if session.current_db == 0:
-            keys = self._scan_sessions(pattern)
-            return Result(keys)
-        if session.current_db == 1:
-            keys = self._scan_users(pattern)
-            return Result(keys)
-        return Result(list())
+    async def scan(self, session, pattern, cursor=None, count=None):
+        app = self.app
+        if cursor is None or app is None:
+            if session.current_db == 0:
+                keys = self._scan_sessions(pattern)
+                return Result(keys)
+            if session.current_db == 1:
+                keys = self._scan_users(pattern)
+                return Result(keys)
+            return Result(list())
+        count = count or self.SCAN_COUNT
+        try:
+            if session.current_db == 0:
+                return Result(app.scan_sessions(cursor, count, pattern))
+            if session.current_db == 1:
+                return Result(app.scan_users(cursor, count, pattern))
+        except ValueError:
+            return Result(ReplyError("ERR invalid cursor"))
+        return Result((0, list(), ))
 
     async def dbsize(self, session):
         if session.current_db == 0:
@@ -158,9 +143,12 @@ class SocketBasedRedisServer(RedisServer):
         else:
             return Result(DatabaseNotFound())
 
-    async def config(self, session, get_set, field, value=None):
+    async def config(self, session, get_set, field=None, value=None):
         if get_set == b'GET' and field == b'databases':
             return Result([b'databases', f'{self.MAX_DB_COUNT}'.encode("utf8")])
+        config_result = self.server_config(get_set, field, value)
+        if config_result is not None:
+            return config_result
         return Result(CommandNotFound())
 
     async def delete(self, session, key):
@@ -209,7 +197,24 @@ class WebsocketNode(PorkPepperNode):
         )
 
 
-def service(key: str, output: bool = False, description: Optional[str] = None, meta: Optional[Dict] = None):
+def service(
+        key: str,
+        output: bool = False,
+        description: Optional[str] = None,
+        meta: Optional[Dict] = None,
+        executor: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        cache: Union[bool, int, Dict, ServiceCache, None] = None,
+        single_flight: bool = False,
+):
+    if executor is not None and executor not in EXECUTOR_KINDS:
+        raise ValueError(f"unknown executor: {executor}")
+    if ServiceCache.from_option(cache) is not None and not output:
+        raise ValueError("cache requires output=True")
+    if single_flight and not output:
+        raise ValueError("single_flight requires output=True")
+
     def wrap(func):
         signature = inspect.signature(func)
         setattr(func, PORKPEPPER_ATTR, dict(
@@ -217,85 +222,124 @@ def service(key: str, output: bool = False, description: Optional[str] = None, m
             output=output,
             signature=signature,
             description=description,
-            meta=meta if meta else dict()
+            meta=meta if meta else dict(),
+            executor=executor,
+            max_workers=max_workers,
+            max_queue=max_queue,
+            cache=cache,
+            single_flight=single_flight,
         ))
         return func
 
     return wrap
 
 
+def invalidate_service(handler, payload: Optional[Union[bytes, str]] = None) -> int:
+    if isinstance(payload, str):
+        payload = payload.encode("utf8")
+    return sum(entry.invalidate(payload) for entry in ServiceEntry.entries_of(handler))
+
+
 class ServiceBasedRedisServer(RedisServer):
+    INFO_MODE = "service"
     MAX_DB_COUNT = 0
+    SCAN_COUNT = 10
     SERVICE_MAP = dict()
+    SERVICE_COMMANDS = (b'GETSET', b'SET', )
+    INFO_ALL_SECTIONS = RedisServer.INFO_ALL_SECTIONS + ("services", )
+
+    def reset_stats(self):
+        super(ServiceBasedRedisServer, self).reset_stats()
+        self.service_histograms: Dict[Tuple[int, str], LatencyHistogram] = dict()
+        for _, entry in self.service_entries():
+            if entry.cache is not None:
+                entry.cache.reset_stats()
+            if entry.flight is not None:
+                entry.flight.reset_stats()
+
+    def service_entries(self) -> Iterator[Tuple[int, ServiceEntry]]:
+        for db, current_service in sorted(self.SERVICE_MAP.items()):
+            for entry in current_service["map"].values():
+                yield db, entry
+
+    def info_services(self) -> str:
+        lines = ["# Services\r\n"]
+        for db, entry in self.service_entries():
+            fields = list()
+            cache = entry.cache
+            if cache is not None:
+                fields.append(
+                    f"cache_entries={len(cache)},cache_memory={cache.memory},"
+                    f"cache_hits={cache.hits},cache_misses={cache.misses},"
+                    f"cache_evictions={cache.evictions},cache_expired={cache.expired}"
+                )
+            flight = entry.flight
+            if flight is not None:
+                fields.append(
+                    f"single_flight_calls={flight.calls},single_flight_coalesced={flight.coalesced},"
+                    f"single_flight_in_flight={len(flight)}"
+                )
+            if fields:
+                lines.append(f"service_db{db}_{entry.key}:{','.join(fields)}\r\n")
+        return "".join(lines)
+
+    def record_command(self, node, session, nsec: int):
+        super(ServiceBasedRedisServer, self).record_command(node, session, nsec)
+        if node.entry.name not in self.SERVICE_COMMANDS:
+            return
+        db = session.current_db
+        key = node.fa[1]["key"]
+        histogram = self.service_histograms.get((db, key, ))
+        if histogram is None:
+            current_service = self.SERVICE_MAP.get(db, None)
+            if not current_service or key not in current_service["map"]:
+                return
+            histogram = self.service_histograms[(db, key, )] = LatencyHistogram()
+        histogram.record(nsec)
+
+    def latency_histograms(self) -> Dict[str, LatencyHistogram]:
+        histograms = super(ServiceBasedRedisServer, self).latency_histograms()
+        for (db, key), histogram in self.service_histograms.items():
+            histograms[f"db{db}:{key}"] = histogram
+        return histograms
 
     async def get(self, session, key) -> Result[bytes]:
-        if session.current_db < 0 or session.current_db >= self.MAX_DB_COUNT:
-            return Result(DatabaseNotFound())
         current_service = self.SERVICE_MAP.get(session.current_db, None)
         if not current_service:
             return Result(DatabaseNotFound())
-        service_map = current_service["map"]
-        service_dict = service_map.get(key, None)
-        if not service_dict:
+        entry: Optional[ServiceEntry] = current_service["map"].get(key, None)
+        if entry is None:
             return Result(None)
-        service_arguments = service_dict["args"]
-        output = {
-            "type": "api",
-            "key": service_arguments["key"],
-            "output": service_arguments["output"],
-            "signature": str(service_arguments["signature"]),
-            "description": service_arguments["description"],
-            "meta": service_arguments["meta"],
-        }
-        return Result(json.dumps(output))
+        return Result(entry.metadata)
 
     async def getset(self, session, key, value) -> Result:
-        if session.current_db < 0 or session.current_db >= self.MAX_DB_COUNT:
-            return Result(DatabaseNotFound())
         current_service = self.SERVICE_MAP.get(session.current_db, None)
         if not current_service:
             return Result(DatabaseNotFound())
-        service_map = current_service["map"]
-        service_dict = service_map.get(key, None)
-        if not service_dict:
+        entry: Optional[ServiceEntry] = current_service["map"].get(key, None)
+        if entry is None:
             return Result(KeyNotFound())
-        handler = service_dict["handler"]
-        service_arguments = service_dict["args"]
-        loads = current_service["loads"]
-        dumps = current_service["dumps"]
-        if not service_arguments.get("output", False):
+        if not entry.output:
             return Result(WrongCommand())
         try:
-            signature = service_arguments["signature"]
-            message = loads(value)
-            if "kwargs" in signature.parameters:
-                result = await handler(**message)
-            else:
-                result = await handler(message=message)
-            return Result(dumps(result))
+            if entry.direct:
+                return Result(entry.dumps(await entry.invoke(entry.loads(value))))
+            return Result(await entry.call(value))
         except Exception as e:
             return Result(e)
 
     async def set(self, session, key, value) -> Result:
-        if session.current_db < 0 or session.current_db >= self.MAX_DB_COUNT:
-            return Result(DatabaseNotFound())
         current_service = self.SERVICE_MAP.get(session.current_db, None)
         if not current_service:
             return Result(DatabaseNotFound())
-        service_map = current_service["map"]
-        service_dict = service_map.get(key, None)
-        if not service_dict:
+        entry: Optional[ServiceEntry] = current_service["map"].get(key, None)
+        if entry is None:
             return Result(KeyNotFound())
-        handler = service_dict["handler"]
-        service_arguments = service_dict["args"]
-        loads = current_service["loads"]
         try:
-            signature = service_arguments["signature"]
-            message = loads(value)
-            if "kwargs" in signature.parameters:
-                await handler(**message)
+            if entry.direct:
+                await entry.invoke(entry.loads(value))
             else:
-                await handler(message=message)
+                await entry.fire(value)
             return Result(True)
         except Exception as e:
             return Result(e)
@@ -306,35 +350,33 @@ class ServiceBasedRedisServer(RedisServer):
     async def ping(self, session):
         return Result("PONG")
 
-    def info_arguments(self):
-        service_list = list()
+    def keyspace(self) -> List[Tuple[int, Dict]]:
+        keyspace = list()
+        service_map = self.SERVICE_MAP
         for db in range(self.MAX_DB_COUNT):
-            service_list.append(
-                (db,
-                 dict(
-                     keys=len(self.SERVICE_MAP.get(db, dict()).get("map", list())),
-                 )
-                 ))
-        arguments = super(ServiceBasedRedisServer, self).info_arguments()
-        arguments.update(porkpepper_mode="service", keyspace=service_list)
-        return arguments
-
-    async def info(self, session):
-        info_arguments = self.info_arguments()
-        info = self.INFO_TEMPLATE.render(info_arguments)
-        return Result(info)
+            current_service = service_map.get(db, None)
+            keyspace.append((db, dict(keys=len(current_service["map"]) if current_service else 0), ))
+        return keyspace
+
+    async def info(self, session, section=None):
+        return Result(self.render_info(section))
 
     async def ttl(self, session, key):
         return Result(-1)
 
-    async def scan(self, session, pattern):
+    async def scan(self, session, pattern, cursor=None, count=None):
         if session.current_db < 0 or session.current_db >= self.MAX_DB_COUNT:
             return Result(DatabaseNotFound())
         current_service = self.SERVICE_MAP.get(session.current_db, None)
         if not current_service:
             return Result(list())
-        service_map = current_service["map"]
-        return Result(list(service_map.keys()))
+        index: SortedKeyIndex = current_service["index"]
+        if cursor is None:
+            return Result(index.keys(pattern))
+        try:
+            return Result(index.scan(cursor, count or self.SCAN_COUNT, pattern))
+        except ValueError:
+            return Result(ReplyError("ERR invalid cursor"))
 
     async def dbsize(self, session):
         if session.current_db < 0 or session.current_db >= self.MAX_DB_COUNT:
@@ -352,45 +394,88 @@ class ServiceBasedRedisServer(RedisServer):
         else:
             return Result(DatabaseNotFound())
 
-    async def config(self, session, get_set, field, value=None):
+    async def config(self, session, get_set, field=None, value=None):
         if get_set == b'GET' and field == b'databases':
             return Result([b'databases', f'{self.MAX_DB_COUNT}'.encode("utf8")])
+        config_result = self.server_config(get_set, field, value)
+        if config_result is not None:
+            return config_result
         return Result(CommandNotFound())
 
+    async def delete(self, session, key):
+        if session.current_db < 0 or session.current_db >= self.MAX_DB_COUNT:
+            return Result(DatabaseNotFound())
+        current_service = self.SERVICE_MAP.get(session.current_db, None)
+        if not current_service:
+            return Result(0)
+        entry: Optional[ServiceEntry] = current_service["map"].get(key, None)
+        if entry is None or entry.cache is None:
+            return Result(0)
+        entry.invalidate()
+        return Result(1)
+
 
 class RedisServiceNode(PorkPepperNode):
+    WORKER_CHECK_INTERVAL = 0.5
+    WORKER_BACKLOG = 100
+    WORKER_STOP_TIMEOUT = 5.0
+
     def __init__(self, redis_server=ServiceBasedRedisServer, **kwargs):
         super(RedisServiceNode, self).__init__(redis_server=redis_server, **kwargs)
 
     def clear_service(self):
         if self._redis_server:
             self._redis_server.MAX_DB_COUNT = 0
+            for current_service in self._redis_server.SERVICE_MAP.values():
+                self.shutdown_service(current_service, wait=False)
             self._redis_server.SERVICE_MAP.clear()
 
+    @staticmethod
+    def shutdown_service(current_service: Dict, wait: bool = True):
+        for entry in current_service["map"].values():
+            entry.shutdown(wait=wait)
+
+    def shutdown_services(self, wait: bool = True):
+        if self._redis_server:
+            for current_service in self._redis_server.SERVICE_MAP.values():
+                self.shutdown_service(current_service, wait=wait)
+
     def update_service(self, db: int, new_service: Type):
         members = inspect.getmembers(new_service, inspect.ismethod)
-        service_map = dict()
+        loads = getattr(new_service, "LOADS", json.loads)
+        dumps = getattr(new_service, "DUMPS", json.dumps)
+        service_map: Dict[str, ServiceEntry] = dict()
         for _, member in members:
-            if not inspect.iscoroutinefunction(member):
+            if not hasattr(member, PORKPEPPER_ATTR):
+                continue
+            service_arguments = getattr(member, PORKPEPPER_ATTR)
+            executor = service_arguments.get("executor", None)
+            if inspect.iscoroutinefunction(member):
+                if executor is not None:
+                    raise ValueError(f"coroutine service cannot use executor: {service_arguments['key']}")
+            elif executor is None:
                 continue
             sign = inspect.signature(member)
             if "message" not in sign.parameters and "kwargs" not in sign.parameters:
                 continue
-            if not hasattr(member, PORKPEPPER_ATTR):
-                continue
-            service_arguments = getattr(member, PORKPEPPER_ATTR)
             key = service_arguments.get("key", None)
             if key in service_map:
                 raise KeyError
             if not isinstance(key, str):
                 raise ValueError
-            service_map[key] = dict(handler=member, args=service_arguments)
-        loads = getattr(new_service, "LOADS", json.loads)
-        dumps = getattr(new_service, "DUMPS", json.dumps)
+            service_map[key] = ServiceEntry(member, service_arguments, loads, dumps)
         if self._redis_server:
+            previous_service = self._redis_server.SERVICE_MAP.get(db, None)
+            if previous_service:
+                self.shutdown_service(previous_service, wait=False)
             if db + 1 > self._redis_server.MAX_DB_COUNT:
                 self._redis_server.MAX_DB_COUNT = db + 1
-            self._redis_server.SERVICE_MAP[db] = dict(loads=loads, dumps=dumps, map=service_map)
+            self._redis_server.SERVICE_MAP[db] = dict(
+                loads=loads,
+                dumps=dumps,
+                map=service_map,
+                index=SortedKeyIndex(service_map.keys()),
+            )
             
     async def _initialize_service_map(self, service_map: Dict[int, Type] = None):
         if service_map:
@@ -409,14 +494,127 @@ class RedisServiceNode(PorkPepperNode):
             redis_port=redis_port, **kwargs
         )
 
-    async def serve(self, service_map: Dict[int, Type] = None, redis_host="127.0.0.1", redis_port=6379, **kwargs):
+    async def stop(self):
+        await super(RedisServiceNode, self).stop()
+        self.shutdown_services()
+
+    async def serve(
+            self, service_map: Dict[int, Type] = None, redis_host="127.0.0.1", redis_port=6379, workers=None, **kwargs):
         await self._initialize_service_map(service_map)
-        await super(RedisServiceNode, self).serve(
-            enable_websocket=False,
-            redis_host=redis_host,
-            redis_port=redis_port,
-            **kwargs
+        if workers is not None and workers > 1:
+            await self._serve_workers(workers, redis_host, redis_port)
+            return
+        try:
+            await super(RedisServiceNode, self).serve(
+                enable_websocket=False,
+                redis_host=redis_host,
+                redis_port=redis_port,
+                **kwargs
+            )
+        finally:
+            self.shutdown_services(wait=False)
+
+    def _start_worker(self, worker_id: int):
+        process = self._worker_context.Process(
+            target=self._worker_main,
+            args=(worker_id, self._worker_socket, self._worker_stats, ),
         )
+        process.start()
+        self._workers[worker_id] = process
+
+    def _worker_main(self, worker_id: int, sock, worker_stats):
+        redis_server = self._redis_server
+        redis_server.worker_id = worker_id
+        redis_server.worker_stats = worker_stats
+        os.setpgrp()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        try:
+            asyncio.run(self._worker_serve(sock))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+
+    async def _worker_serve(self, sock):
+        redis_server = self._redis_server
+        redis_server.init_property()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        try:
+            await self.on_start()
+            await redis_server.serve(sock=sock)
+        finally:
+            self.shutdown_services()
+            await self.on_shutdown()
+
+    @property
+    def worker_pids(self) -> List[Optional[int]]:
+        return [process.pid if process is not None else None for process in self._workers]
+
+    def _stop_workers(self):
+        processes = [process for process in self._workers if process is not None]
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(self.WORKER_STOP_TIMEOUT)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            self._kill_worker_group(process)
 
+    @classmethod
+    def _kill_worker_group(cls, process):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            pass
 
-__all__ = ["WebsocketNode", "RedisServiceNode", "service", "SocketBasedRedisServer", "ServiceBasedRedisServer", ]
+    def _create_worker_socket(self, host: str, port: int) -> socket.socket:
+        family, _, _, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(address)
+            sock.listen(self.WORKER_BACKLOG)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    async def _serve_workers(self, workers: int, redis_host: str, redis_port: int):
+        import multiprocessing
+        from .worker_stats import WorkerStatsTable
+        self.start_event.clear()
+        self.stop_event.clear()
+        self.worker_restarts = 0
+        self._worker_context = multiprocessing.get_context("fork")
+        self._worker_socket = self._create_worker_socket(redis_host, redis_port)
+        self._worker_stats = WorkerStatsTable(workers, self._redis_server.COMMANDS.keys(), self._worker_context)
+        self._workers: List[Optional['multiprocessing.Process']] = [None] * workers
+        loop = asyncio.get_running_loop()
+        stop_signals = (signal.SIGINT, signal.SIGTERM, )
+        for signum in stop_signals:
+            loop.add_signal_handler(signum, asyncio.current_task().cancel)
+        try:
+            for worker_id in range(workers):
+                self._start_worker(worker_id)
+            self.start_event.set()
+            while True:
+                await asyncio.sleep(self.WORKER_CHECK_INTERVAL)
+                for worker_id, process in enumerate(self._workers):
+                    if process.is_alive():
+                        continue
+                    process.join()
+                    self._kill_worker_group(process)
+                    self._worker_stats.retire(worker_id)
+                    self.worker_restarts += 1
+                    self._start_worker(worker_id)
+        finally:
+            for signum in stop_signals:
+                loop.remove_signal_handler(signum)
+            self._stop_workers()
+            self._worker_socket.close()
+            self.stop_event.set()
+
+
+__all__ = ["WebsocketNode", "RedisServiceNode", "service", "invalidate_service", "SocketBasedRedisServer", "ServiceBasedRedisServer", ]
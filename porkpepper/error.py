@@ -18,6 +18,11 @@ class NoPasswordError(ExceptionWithReplyError):
     pass
 
 
+class ReplyError(ExceptionWithReplyError):
+    def __init__(self, reply="ERR"):
+        super(ReplyError, self).__init__(reply, reply)
+
+
 class WrongCommand(Exception):
     pass
 
@@ -39,14 +44,27 @@ class CommandNotFound(ExceptionWithReplyError):
         super(CommandNotFound, self).__init__(reply="COMMAND NOT FOUND")
 
 
+class ServiceOverloaded(ExceptionWithReplyError):
+    def __init__(self):
+        super(ServiceOverloaded, self).__init__(reply="BUSY service executor queue is full")
+
+
+class MessageDropped(ExceptionWithReplyError):
+    def __init__(self):
+        super(MessageDropped, self).__init__(reply="BUSY message dropped by the session outbound queue")
+
+
 __all__ = [
     "UnwrapError",
     "RedisProtocolFormatError",
     "ExceptionWithReplyError",
     "NoPasswordError",
+    "ReplyError",
     "WrongCommand",
     "KeyNotFound",
     "NodeNotFound",
     "DatabaseNotFound",
     "CommandNotFound",
+    "ServiceOverloaded",
+    "MessageDropped",
 ]
@@ -0,0 +1,46 @@
+from typing import *
+import asyncio
+
+
+class IdleDeadline:
+    def __init__(self, timeout: Optional[float], task: Optional[asyncio.Task] = None):
+        self._loop = asyncio.get_running_loop()
+        self._timeout = timeout
+        self._task = task
+        self._deadline: Optional[float] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self.expired = False
+
+    def arm(self):
+        timeout = self._timeout
+        if timeout is None:
+            return
+        deadline = self._loop.time() + timeout
+        self._deadline = deadline
+        if self._handle is None:
+            self._handle = self._loop.call_at(deadline, self._check)
+
+    def disarm(self):
+        self._deadline = None
+
+    def cancel(self):
+        self._deadline = None
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _check(self):
+        self._handle = None
+        deadline = self._deadline
+        if deadline is None:
+            return
+        if self._loop.time() < deadline:
+            self._handle = self._loop.call_at(deadline, self._check)
+            return
+        self._deadline = None
+        self.expired = True
+        if self._task is not None:
+            self._task.cancel()
+
+
+__all__ = ["IdleDeadline", ]
@@ -0,0 +1,238 @@
+from typing import *
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from bisect import bisect_left, bisect_right
+
+
+CURSOR_LIMIT = (1 << 63) - 1
+
+
+class KeyPattern:
+    __slots__ = ("pattern", "prefix", "literal", "_match", )
+
+    def __init__(self, pattern: str, prefix: str, literal: bool, regex: Optional[str]):
+        self.pattern = pattern
+        self.prefix = prefix
+        self.literal = literal
+        self._match = re.compile(regex, re.DOTALL).match if regex is not None else None
+
+    def match(self, key: str) -> bool:
+        if self._match is None:
+            return key == self.prefix
+        return self._match(key) is not None
+
+    def __call__(self, key: str) -> bool:
+        return self.match(key)
+
+
+def _translate_class(pattern: str, i: int) -> Tuple[Optional[str], int]:
+    n = len(pattern)
+    negate = False
+    if i < n and pattern[i] == "^":
+        negate = True
+        i += 1
+    items = list()
+    while i < n and pattern[i] != "]":
+        c = pattern[i]
+        if c == "\\" and i + 1 < n:
+            c = pattern[i + 1]
+            i += 1
+        if i + 2 < n and pattern[i + 1] == "-" and pattern[i + 2] != "]":
+            end = pattern[i + 2]
+            if end == "\\" and i + 3 < n:
+                end = pattern[i + 3]
+                i += 1
+            start, end = (c, end) if c <= end else (end, c)
+            items.append(f"{re.escape(start)}-{re.escape(end)}")
+            i += 3
+        else:
+            items.append(re.escape(c))
+            i += 1
+    if i >= n:
+        return None, i
+    if not items:
+        return ("[\\s\\S]" if negate else "(?!)"), i + 1
+    return f"[{'^' if negate else ''}{''.join(items)}]", i + 1
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern: str) -> KeyPattern:
+    parts = list()
+    prefix = list()
+    literal = True
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == "\\" and i < n:
+            c = pattern[i]
+            i += 1
+        elif c == "*":
+            parts.append(".*")
+            literal = False
+            continue
+        elif c == "?":
+            parts.append(".")
+            literal = False
+            continue
+        elif c == "[":
+            item, next_i = _translate_class(pattern, i)
+            if item is not None:
+                parts.append(item)
+                literal = False
+                i = next_i
+                continue
+        parts.append(re.escape(c))
+        if literal:
+            prefix.append(c)
+    prefix = "".join(prefix)
+    if literal:
+        return KeyPattern(pattern, prefix, True, None)
+    return KeyPattern(pattern, prefix, False, f"(?:{''.join(parts)})\\Z")
+
+
+class SortedKeyIndex:
+    LOAD = 512
+    MAX_CURSORS = 1024
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self._lists: List[List[str]] = list()
+        self._maxes: List[str] = list()
+        self._size = 0
+        self._cursors: 'OrderedDict[int, str]' = OrderedDict()
+        self._last_cursor = 0
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for keys in self._lists:
+            yield from keys
+
+    def __contains__(self, key: str):
+        maxes = self._maxes
+        index = bisect_left(maxes, key)
+        if index == len(maxes):
+            return False
+        keys = self._lists[index]
+        position = bisect_left(keys, key)
+        return position < len(keys) and keys[position] == key
+
+    def add(self, key: str):
+        maxes = self._maxes
+        if not maxes:
+            self._lists.append([key])
+            maxes.append(key)
+            self._size += 1
+            return
+        index = bisect_left(maxes, key)
+        if index == len(maxes):
+            index -= 1
+            keys = self._lists[index]
+            keys.append(key)
+            maxes[index] = key
+        else:
+            keys = self._lists[index]
+            position = bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                return
+            keys.insert(position, key)
+        self._size += 1
+        if len(keys) > self.LOAD * 2:
+            half = keys[self.LOAD:]
+            del keys[self.LOAD:]
+            maxes[index] = keys[-1]
+            self._lists.insert(index + 1, half)
+            maxes.insert(index + 1, half[-1])
+
+    def discard(self, key: str):
+        maxes = self._maxes
+        index = bisect_left(maxes, key)
+        if index == len(maxes):
+            return
+        keys = self._lists[index]
+        position = bisect_left(keys, key)
+        if position == len(keys) or keys[position] != key:
+            return
+        del keys[position]
+        self._size -= 1
+        if not keys:
+            del self._lists[index]
+            del maxes[index]
+        elif position == len(keys):
+            maxes[index] = keys[-1]
+
+    def irange(self, after: Optional[str] = None, prefix: str = "") -> Iterator[str]:
+        lists = self._lists
+        maxes = self._maxes
+        if after is not None and after >= prefix:
+            index = bisect_right(maxes, after)
+            if index == len(lists):
+                return
+            position = bisect_right(lists[index], after)
+        elif prefix:
+            index = bisect_left(maxes, prefix)
+            if index == len(lists):
+                return
+            position = bisect_left(lists[index], prefix)
+        else:
+            index = 0
+            position = 0
+        while index < len(lists):
+            keys = lists[index]
+            if prefix and not maxes[index].startswith(prefix):
+                for key in keys[position:]:
+                    if not key.startswith(prefix):
+                        return
+                    yield key
+                return
+            yield from keys[position:]
+            position = 0
+            index += 1
+
+    def keys(self, pattern: Optional[str] = None) -> List[str]:
+        if pattern is None:
+            return list(self)
+        key_pattern = compile_pattern(pattern)
+        if key_pattern.literal:
+            return [key_pattern.prefix] if key_pattern.prefix in self else list()
+        return [key for key in self.irange(prefix=key_pattern.prefix) if key_pattern.match(key)]
+
+    def save_cursor(self, key: str) -> int:
+        cursor = self._last_cursor = self._last_cursor % CURSOR_LIMIT + 1
+        cursors = self._cursors
+        cursors[cursor] = key
+        while len(cursors) > self.MAX_CURSORS:
+            cursors.popitem(last=False)
+        return cursor
+
+    def load_cursor(self, cursor: int) -> Optional[str]:
+        if cursor == 0:
+            return None
+        key = self._cursors.get(cursor, None)
+        if key is None:
+            raise ValueError("invalid cursor")
+        self._cursors.move_to_end(cursor)
+        return key
+
+    def scan(self, cursor: int, count: int, pattern: Optional[str] = None) -> Tuple[int, List[str]]:
+        keys = list()
+        last_key = None
+        visited = 0
+        key_pattern = compile_pattern(pattern) if pattern is not None else None
+        prefix = key_pattern.prefix if key_pattern is not None else ""
+        for key in self.irange(self.load_cursor(cursor), prefix):
+            if visited >= count:
+                return self.save_cursor(last_key), keys
+            visited += 1
+            last_key = key
+            if key_pattern is None or key_pattern.match(key):
+                keys.append(key)
+        return 0, keys
+
+
+__all__ = ["SortedKeyIndex", "KeyPattern", "compile_pattern", "CURSOR_LIMIT", ]
@@ -0,0 +1,100 @@
+from typing import *
+from .redis_stats import LatencyHistogram
+
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+HISTOGRAM_BUCKETS = 27
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class MetricsWriter:
+    def __init__(self, prefix: str = "porkpepper"):
+        self.prefix = prefix
+        self.lines: List[str] = list()
+
+    def family(self, name: str, metric_type: str, help_text: str, unit: Optional[str] = None):
+        name = f"{self.prefix}_{name}"
+        self.lines.append(f"# TYPE {name} {metric_type}")
+        if unit:
+            self.lines.append(f"# UNIT {name} {unit}")
+        self.lines.append(f"# HELP {name} {help_text}")
+
+    def sample(self, name: str, value: Union[int, float], labels: Optional[Dict[str, str]] = None):
+        if labels:
+            label_text = ",".join(f'{key}="{escape_label(str(v))}"' for key, v in labels.items())
+            self.lines.append(f"{self.prefix}_{name}{{{label_text}}} {value}")
+        else:
+            self.lines.append(f"{self.prefix}_{name} {value}")
+
+    def gauge(self, name: str, value: Union[int, float], help_text: str, unit: Optional[str] = None):
+        self.family(name, "gauge", help_text, unit)
+        self.sample(name, value)
+
+    def counter(self, name: str, value: Union[int, float], help_text: str, unit: Optional[str] = None):
+        self.family(name, "counter", help_text, unit)
+        self.sample(f"{name}_total", value)
+
+    def histogram_samples(self, name: str, histogram: LatencyHistogram, labels: Optional[Dict[str, str]] = None):
+        labels = labels or dict()
+        counts = histogram.counts
+        count = 0
+        for index in range(HISTOGRAM_BUCKETS):
+            count += counts[index]
+            self.sample(f"{name}_bucket", count, dict(labels, le=f"{(1 << index) / 1e6:g}"))
+        self.sample(f"{name}_bucket", histogram.total, dict(labels, le="+Inf"))
+        self.sample(f"{name}_count", histogram.total, labels)
+        self.sample(f"{name}_sum", histogram.nsec / 1e9, labels)
+
+    def render(self) -> str:
+        self.lines.append("# EOF")
+        return "\n".join(self.lines) + "\n"
+
+
+def render_metrics(redis_server, app=None) -> str:
+    # RESP counters and command stats use the same view as INFO, summed over all workers under
+    # serve(workers=N); service, websocket and event loop metrics belong to the scraped worker
+    writer = MetricsWriter()
+    stats = redis_server.stats_view()
+    process_labels = dict() if redis_server.worker_id is None else dict(worker=str(redis_server.worker_id))
+    writer.gauge("connected_clients", stats["connected_clients"], "Number of RESP client connections")
+    writer.counter("connections_received", stats["total_connections_received"],
+                   "RESP connections accepted since start")
+    writer.counter("commands_processed", stats["total_commands_processed"], "RESP commands processed")
+    writer.gauge("instantaneous_ops_per_sec", stats["instantaneous_ops_per_sec"],
+                 "Commands per second over the sampling window")
+    writer.counter("net_input_bytes", stats["total_net_input_bytes"], "Bytes read from RESP clients", "bytes")
+    writer.counter("net_output_bytes", stats["total_net_output_bytes"], "Bytes written to RESP clients", "bytes")
+    command_stats = redis_server.command_stats_view()
+    if command_stats:
+        writer.family("command_calls", "counter", "Calls per RESP command")
+        for name, stats in command_stats.items():
+            writer.sample("command_calls_total", stats.calls, dict(command=name.decode("utf8").lower()))
+        writer.family("command_failed_calls", "counter", "Failed calls per RESP command")
+        for name, stats in command_stats.items():
+            writer.sample("command_failed_calls_total", stats.failed_calls, dict(command=name.decode("utf8").lower()))
+        writer.family("command_duration_seconds", "histogram", "RESP command latency", "seconds")
+        for name, stats in command_stats.items():
+            writer.histogram_samples("command_duration_seconds", stats.histogram,
+                                     dict(command=name.decode("utf8").lower()))
+    service_histograms = getattr(redis_server, "service_histograms", None)
+    if service_histograms:
+        writer.family("service_duration_seconds", "histogram", "Service call latency", "seconds")
+        for (db, key), histogram in service_histograms.items():
+            writer.histogram_samples("service_duration_seconds", histogram, dict(process_labels, db=str(db), key=key))
+    if app is not None:
+        writer.family("websocket_sessions", "gauge", "Connected websocket sessions")
+        writer.sample("websocket_sessions", app.sessions_count, process_labels)
+        writer.family("websocket_users", "gauge", "Logged in websocket users")
+        writer.sample("websocket_users", app.users_count, process_labels)
+    writer.family("event_loop_lag_seconds", "gauge", "Last measured event loop lag", "seconds")
+    writer.sample("event_loop_lag_seconds", redis_server.event_loop_lag, process_labels)
+    writer.family("event_loop_lag_distribution_seconds", "histogram", "Event loop lag samples", "seconds")
+    writer.histogram_samples("event_loop_lag_distribution_seconds", redis_server.event_loop_lag_histogram,
+                             process_labels)
+    return writer.render()
+
+
+__all__ = ["OPENMETRICS_CONTENT_TYPE", "MetricsWriter", "render_metrics", ]
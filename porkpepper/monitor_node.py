@@ -1,23 +1,17 @@
 import asyncio
-import aioredis
 from .result import Result
 from .websocket_session import WebsocketSession
 from .design import WebsocketNode
 from .redis_server import RedisServer
+from .client import PorkPepperClient
 
 
 class MonitorRedisServer(RedisServer):
+    INFO_MODE = "monitor"
     MAX_DB_COUNT = 0
 
-    def info_arguments(self):
-        arguments = super(MonitorRedisServer, self).info_arguments()
-        arguments.update(porkpepper_mode="monitor")
-        return arguments
-
-    async def info(self, session):
-        info_arguments = self.info_arguments()
-        info = self.INFO_TEMPLATE.render(info_arguments)
-        return Result(info)
+    async def info(self, session, section=None):
+        return Result(self.render_info(section))
 
 
 class SimpleMonitorNode(WebsocketNode):
@@ -33,34 +27,28 @@ class SimpleMonitorNode(WebsocketNode):
         )
 
     async def monitor_task(self, node_url):
-        while True:
-            connectivity = False
-            conn = None
-            info = None
-            try:
-                conn = await aioredis.create_redis(node_url, timeout=1)
-                info = await conn.info()
-                connectivity = True
-            except asyncio.CancelledError:
-                return
-            except Exception as e:
-                connectivity = False
-            finally:
-                if conn is not None:
-                    conn.close()
-            message = {
-                    "type": "monitorNodeStatus",
-                    "nodeUrl": node_url,
-                    "connectivity": connectivity,
-                    "info": info,
-                }
-            app = self._http_app
-            if app is not None:
-                all_sessions = self._http_app.all_sessions()
-                send_list = [session.send(message) for session in all_sessions]
-                if send_list:
-                    asyncio.ensure_future(asyncio.gather(*send_list))
-            await asyncio.sleep(self.TIMER_INTERVAL)
+        client = PorkPepperClient.from_url(node_url, max_connections=1, timeout=1)
+        try:
+            while True:
+                info = None
+                info_result = await client.info()
+                connectivity = not info_result.is_error
+                if connectivity:
+                    info = info_result.unwrap()
+                message = {
+                        "type": "monitorNodeStatus",
+                        "nodeUrl": node_url,
+                        "connectivity": connectivity,
+                        "info": info,
+                    }
+                app = self._http_app
+                if app is not None:
+                    await app.broadcast(message, timeout=0)
+                await asyncio.sleep(self.TIMER_INTERVAL)
+        except asyncio.CancelledError:
+            return
+        finally:
+            await client.close()
 
     def cancel_monitor_tasks(self):
         task_list = self.MONITOR_TASK_LIST
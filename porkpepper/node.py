@@ -1,19 +1,25 @@
 from typing import *
 import asyncio
-from aiohttp import web
-from .websocket_app import WebsocketApp
 from .redis_server_base import RedisServerBase
+from .metrics import OPENMETRICS_CONTENT_TYPE, render_metrics
 
 
 class PorkPepperNode:
-    def __init__(self, redis_server, session_class=None, websocket_path="/porkpepper", **kwargs):
+    def __init__(self, redis_server, session_class=None, websocket_path="/porkpepper", metrics_path=None, **kwargs):
         if redis_server is None:
             raise ValueError
         self._session_class = session_class
+        self._metrics_path = metrics_path
 
         self._app_options = kwargs or dict()
-        self._http_app: WebsocketApp = WebsocketApp(session_class=session_class, **self._app_options)
-        self._http_app.add_routes([web.route('GET', path, self._http_app.handler) for path in [websocket_path, ]])
+        self._http_app: Optional['WebsocketApp'] = None
+        if session_class is not None or metrics_path is not None:
+            from aiohttp import web
+            from .websocket_app import WebsocketApp
+            self._http_app = WebsocketApp(session_class=session_class, **self._app_options)
+            self._http_app.add_routes([web.route('GET', path, self._http_app.handler) for path in [websocket_path, ]])
+            if metrics_path is not None:
+                self._http_app.add_routes([web.route('GET', metrics_path, self.metrics_handler), ])
 
         self._redis_server_class = redis_server
         self._redis_server = self._redis_server_class(app=self._http_app)
@@ -25,22 +31,38 @@ class PorkPepperNode:
         self.start_event = asyncio.Event()
         self.stop_event = asyncio.Event()
 
+    async def metrics_handler(self, request):
+        from aiohttp import web
+        app = self._http_app if self._session_class is not None else None
+        body = render_metrics(self._redis_server, app)
+        return web.Response(body=body.encode("utf8"), headers={"Content-Type": OPENMETRICS_CONTENT_TYPE})
+
     async def on_start(self):
         pass
 
     async def on_shutdown(self):
         pass
 
-    async def start(self, enable_websocket=False, redis_host="127.0.0.1", redis_port=6379, **kwargs):
+    async def start_http(self, enable_websocket=False, **kwargs):
         app = self._http_app
-        redis_server: RedisServerBase = self._redis_server
-        redis_server.init_property()
+        if app is None:
+            return None
+        from aiohttp import web
         runner = web.AppRunner(app)
-        self._runner = runner
         await runner.setup()
-        if enable_websocket:
-            site = web.TCPSite(runner, **kwargs)
-            await site.start()
+        try:
+            if enable_websocket or self._metrics_path is not None:
+                site = web.TCPSite(runner, **kwargs)
+                await site.start()
+        except BaseException:
+            await runner.cleanup()
+            raise
+        return runner
+
+    async def start(self, enable_websocket=False, redis_host="127.0.0.1", redis_port=6379, **kwargs):
+        redis_server: RedisServerBase = self._redis_server
+        redis_server.init_property()
+        self._runner = await self.start_http(enable_websocket, **kwargs)
         await self.on_start()
         redis_server_object = await redis_server.serve(redis_host, redis_port, False)
         self._redis_server_object = redis_server_object
@@ -51,6 +73,7 @@ class PorkPepperNode:
             self._redis_server_object.close()
             await self._redis_server_object.wait_closed()
             self._redis_server_object = None
+        self._redis_server.stop_stats_sampler()
         if self._redis_server_task:
             self._redis_server_task.cancel()
             self._redis_server_task = None
@@ -62,18 +85,15 @@ class PorkPepperNode:
     async def serve(self, enable_websocket=False, redis_host="127.0.0.1", redis_port=6379, **kwargs):
         self.start_event.clear()
         self.stop_event.clear()
-        app = self._http_app
         redis_server: RedisServerBase = self._redis_server
         redis_server.init_property()
-        runner = web.AppRunner(app)
-        await runner.setup()
+        runner = None
         try:
-            if enable_websocket:
-                site = web.TCPSite(runner, **kwargs)
-                await site.start()
+            runner = await self.start_http(enable_websocket, **kwargs)
             await self.on_start()
             await redis_server.serve(redis_host, redis_port, True, self.start_event.set)
         finally:
-            await runner.cleanup()
+            if runner is not None:
+                await runner.cleanup()
             await self.on_shutdown()
             self.stop_event.set()
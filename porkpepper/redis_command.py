@@ -0,0 +1,389 @@
+from typing import *
+from .error import *
+from .result import Result
+
+
+COMMAND_ATTR = "__porkpepper_command__"
+
+
+class RedisCommand:
+    __slots__ = ("name", "arity", "handler", "decoder", "encoder", "auth_required", "barrier", )
+
+    def __init__(
+            self,
+            name: Union[bytes, str],
+            arity: int,
+            handler: str,
+            decoder: Callable[[List[bytes]], Result[Dict]],
+            encoder: Callable[['RedisTaskNode', 'RedisSession', 'RedisServerBase'], Result[bool]],
+            auth_required: bool = True,
+            barrier: bool = False,
+    ):
+        if isinstance(name, str):
+            name = name.encode("utf8")
+        self.name: bytes = name.upper()
+        self.arity = arity
+        self.handler = handler
+        self.decoder = decoder
+        self.encoder = encoder
+        self.auth_required = auth_required
+        self.barrier = barrier
+
+    def check_arity(self, commands: List[bytes]) -> bool:
+        arity = self.arity
+        if arity >= 0:
+            return len(commands) == arity
+        return len(commands) >= -arity
+
+
+def command(
+        name: Union[bytes, str],
+        arity: int,
+        decoder: Callable[[List[bytes]], Result[Dict]],
+        encoder: Callable[['RedisTaskNode', 'RedisSession', 'RedisServerBase'], Result[bool]],
+        auth_required: bool = True,
+        barrier: bool = False,
+):
+    def wrap(func):
+        setattr(func, COMMAND_ATTR, dict(
+            name=name,
+            arity=arity,
+            decoder=decoder,
+            encoder=encoder,
+            auth_required=auth_required,
+            barrier=barrier,
+        ))
+        return func
+
+    return wrap
+
+
+def write(session, binary):
+    session.output.append(binary)
+    session.output_size += len(binary)
+
+
+def write_bulk(session, mixin, value) -> bool:
+    if isinstance(value, bool) or not isinstance(value, (bytes, str, int)):
+        return False
+    header, payload, tail = mixin.bulk_parts(value)
+    output = session.output
+    output.append(header)
+    output.append(payload)
+    output.append(tail)
+    session.output_size += len(header) + len(payload) + 2
+    return True
+
+
+def write_integer(session, mixin, value) -> bool:
+    if isinstance(value, bool) or not isinstance(value, int):
+        return False
+    write(session, mixin.integer_reply(value))
+    return True
+
+
+def write_error(session, mixin, error):
+    if isinstance(error, ExceptionWithReplyError):
+        write(session, mixin.error_reply(error.reply))
+    else:
+        write(session, mixin.ERR)
+
+
+def decode_none(commands: List[bytes]) -> Result[Dict]:
+    return Result(dict())
+
+
+def decode_key(commands: List[bytes]) -> Result[Dict]:
+    return Result(dict(key=commands[1].decode("utf8").strip()))
+
+
+def decode_key_value(commands: List[bytes]) -> Result[Dict]:
+    return Result(dict(key=commands[1].decode("utf8").strip(), value=commands[2]))
+
+
+def decode_auth(commands: List[bytes]) -> Result[Dict]:
+    if len(commands) > 1:
+        password = commands[1]
+    else:
+        password = b''
+    return Result(dict(password=password))
+
+
+def decode_config(commands: List[bytes]) -> Result[Dict]:
+    if len(commands) > 3:
+        return Result(dict(get_set=commands[1].upper(), field=commands[2].lower(), value=commands[3]))
+    if len(commands) > 2:
+        return Result(dict(get_set=commands[1].upper(), field=commands[2].lower()))
+    return Result(dict(get_set=commands[1].upper()))
+
+
+def decode_info(commands: List[bytes]) -> Result[Dict]:
+    if len(commands) > 1:
+        return Result(dict(section=commands[1].decode("utf8").lower()))
+    return Result(dict())
+
+
+def decode_select(commands: List[bytes]) -> Result[Dict]:
+    try:
+        return Result(dict(db=int(commands[1])))
+    except ValueError as e:
+        return Result(e)
+
+
+def decode_scan(commands: List[bytes]) -> Result[Dict]:
+    if len(commands) % 2:
+        return Result(ReplyError("ERR syntax error"))
+    pattern = None
+    count = None
+    try:
+        cursor = int(commands[1])
+    except ValueError:
+        return Result(ReplyError("ERR invalid cursor"))
+    if cursor < 0:
+        return Result(ReplyError("ERR invalid cursor"))
+    try:
+        args_pairs = zip(commands[2::2], commands[3::2])
+        for arg_name, arg_value in args_pairs:
+            if arg_name.upper() == b'MATCH':
+                pattern = arg_value.decode("utf8")
+            elif arg_name.upper() == b'COUNT':
+                count = int(arg_value)
+            else:
+                return Result(ReplyError("ERR syntax error"))
+    except ValueError:
+        return Result(ReplyError("ERR value is not an integer or out of range"))
+    if count is not None and count < 1:
+        return Result(ReplyError("ERR syntax error"))
+    return Result(dict(pattern=pattern, cursor=cursor, count=count))
+
+
+def decode_slowlog(commands: List[bytes]) -> Result[Dict]:
+    if len(commands) > 3:
+        return Result(RedisProtocolFormatError())
+    if len(commands) == 3:
+        try:
+            return Result(dict(subcommand=commands[1].upper(), count=int(commands[2])))
+        except ValueError as e:
+            return Result(e)
+    return Result(dict(subcommand=commands[1].upper()))
+
+
+def decode_latency(commands: List[bytes]) -> Result[Dict]:
+    return Result(dict(subcommand=commands[1].upper(), names=commands[2:]))
+
+
+def decode_keys(commands: List[bytes]) -> Result[Dict]:
+    return Result(dict(pattern=commands[1].decode("utf8")))
+
+
+def write_reply(session, mixin, value) -> bool:
+    if value is None:
+        write(session, mixin.NIL)
+    elif value is True:
+        write(session, mixin.OK)
+    elif isinstance(value, int):
+        return write_integer(session, mixin, value)
+    elif isinstance(value, (list, tuple, )):
+        write(session, mixin.count_header(len(value)))
+        for item in value:
+            if not write_reply(session, mixin, item):
+                return False
+    else:
+        return write_bulk(session, mixin, value)
+    return True
+
+
+def encode_auth(node, session, mixin) -> Result[bool]:
+    need_auth_event = session.need_auth_event
+    auth_result = node.result
+    if auth_result.is_error:
+        if isinstance(auth_result.error, ExceptionWithReplyError):
+            error_reply = auth_result.error.reply
+        else:
+            error_reply = "ERR"
+        write(session, mixin.error_reply(error_reply))
+        need_auth_event.set()
+    elif not auth_result.unwrap():
+        write(session, mixin.error_reply("ERR invalid password"))
+        need_auth_event.set()
+    else:
+        write(session, mixin.OK)
+        need_auth_event.clear()
+    return Result(True)
+
+
+def encode_array(node, session, mixin) -> Result[bool]:
+    array_result = node.result
+    if array_result.is_error:
+        write(session, mixin.ERR)
+        return Result(True)
+    binary_lines = array_result.unwrap()
+    write(session, mixin.count_header(len(binary_lines)))
+    for binary in binary_lines:
+        if not write_bulk(session, mixin, binary):
+            return Result(RedisProtocolFormatError())
+    return Result(True)
+
+
+def encode_config(node, session, mixin) -> Result[bool]:
+    config_result = node.result
+    if not config_result.is_error and config_result.unwrap() is True:
+        write(session, mixin.OK)
+        return Result(True)
+    return encode_array(node, session, mixin)
+
+
+def encode_bulk(node, session, mixin) -> Result[bool]:
+    bulk_result = node.result
+    if bulk_result.is_error:
+        write_error(session, mixin, bulk_result.error)
+        return Result(True)
+    value = bulk_result.unwrap()
+    if value is None:
+        write(session, mixin.NIL)
+    elif not write_bulk(session, mixin, value):
+        return Result(RedisProtocolFormatError())
+    return Result(True)
+
+
+def encode_select(node, session, mixin) -> Result[bool]:
+    if node.result.is_error:
+        write(session, mixin.error_reply("ERR invalid DB index"))
+    else:
+        write(session, mixin.OK)
+    return Result(True)
+
+
+def encode_ok(node, session, mixin) -> Result[bool]:
+    if node.result.is_error:
+        write_error(session, mixin, node.result.error)
+    else:
+        write(session, mixin.OK)
+    return Result(True)
+
+
+def encode_status(node, session, mixin) -> Result[bool]:
+    status_result = node.result
+    if status_result.is_error:
+        write(session, mixin.ERR)
+        return Result(True)
+    status = status_result.unwrap()
+    if not isinstance(status, str):
+        return Result(RedisProtocolFormatError())
+    write(session, mixin.status_reply(status))
+    return Result(True)
+
+
+def encode_pong(node, session, mixin) -> Result[bool]:
+    ping_result = node.result
+    if ping_result.is_error:
+        return Result(ping_result.error)
+    status = ping_result.unwrap()
+    if not isinstance(status, str):
+        return Result(RedisProtocolFormatError())
+    write(session, mixin.status_reply(status))
+    return Result(True)
+
+
+def encode_integer(node, session, mixin) -> Result[bool]:
+    integer_result = node.result
+    if integer_result.is_error:
+        write(session, mixin.ERR)
+        return Result(True)
+    if not write_integer(session, mixin, integer_result.unwrap()):
+        return Result(RedisProtocolFormatError())
+    return Result(True)
+
+
+def encode_strict_integer(node, session, mixin) -> Result[bool]:
+    integer_result = node.result
+    if integer_result.is_error:
+        return Result(integer_result.error)
+    if not write_integer(session, mixin, integer_result.unwrap()):
+        return Result(RedisProtocolFormatError())
+    return Result(True)
+
+
+def encode_reply(node, session, mixin) -> Result[bool]:
+    reply_result = node.result
+    if reply_result.is_error:
+        write(session, mixin.ERR)
+        return Result(True)
+    if not write_reply(session, mixin, reply_result.unwrap()):
+        return Result(RedisProtocolFormatError())
+    return Result(True)
+
+
+def encode_scan(node, session, mixin) -> Result[bool]:
+    scan_result = node.result
+    if scan_result.is_error:
+        write_error(session, mixin, scan_result.error)
+        return Result(True)
+    keys = scan_result.unwrap()
+    if node.command == b'SCAN':
+        if isinstance(keys, tuple):
+            cursor, keys = keys
+        else:
+            cursor = 0
+        write(session, mixin.count_header(2))
+        if not write_bulk(session, mixin, cursor):
+            return Result(RedisProtocolFormatError())
+    write(session, mixin.count_header(len(keys)))
+    for key in keys:
+        if not write_bulk(session, mixin, key):
+            return Result(RedisProtocolFormatError())
+    return Result(True)
+
+
+DEFAULT_COMMANDS = [
+    RedisCommand(b'AUTH', -1, "auth", decode_auth, encode_auth, auth_required=False, barrier=True),
+    RedisCommand(b'CONFIG', -2, "config", decode_config, encode_config),
+    RedisCommand(b'INFO', -1, "info", decode_info, encode_bulk),
+    RedisCommand(b'SELECT', 2, "select", decode_select, encode_select, barrier=True),
+    RedisCommand(b'DBSIZE', 1, "dbsize", decode_none, encode_integer),
+    RedisCommand(b'PING', -1, "ping", decode_none, encode_pong),
+    RedisCommand(b'SET', -3, "set", decode_key_value, encode_ok),
+    RedisCommand(b'GETSET', -3, "getset", decode_key_value, encode_bulk),
+    RedisCommand(b'GET', 2, "get", decode_key, encode_bulk),
+    RedisCommand(b'TYPE', 2, "key_type", decode_key, encode_status),
+    RedisCommand(b'TTL', 2, "ttl", decode_key, encode_strict_integer),
+    RedisCommand(b'SCAN', -2, "scan", decode_scan, encode_scan),
+    RedisCommand(b'KEYS', 2, "scan", decode_keys, encode_scan),
+    RedisCommand(b'DEL', 2, "delete", decode_key, encode_strict_integer),
+    RedisCommand(b'SLOWLOG', -2, "slowlog", decode_slowlog, encode_reply),
+    RedisCommand(b'LATENCY', -2, "latency", decode_latency, encode_reply),
+]
+
+
+__all__ = [
+    "RedisCommand",
+    "command",
+    "DEFAULT_COMMANDS",
+    "write",
+    "write_bulk",
+    "write_integer",
+    "write_reply",
+    "decode_none",
+    "decode_key",
+    "decode_key_value",
+    "decode_auth",
+    "decode_config",
+    "decode_info",
+    "decode_select",
+    "decode_scan",
+    "decode_keys",
+    "decode_slowlog",
+    "decode_latency",
+    "encode_auth",
+    "encode_array",
+    "encode_config",
+    "encode_bulk",
+    "encode_select",
+    "encode_ok",
+    "encode_status",
+    "encode_pong",
+    "encode_integer",
+    "encode_strict_integer",
+    "encode_scan",
+    "encode_reply",
+]
@@ -0,0 +1,138 @@
+from typing import *
+import asyncio
+from collections import deque
+from .result import Result
+from .redis_parser import RedisRequestParser
+
+
+class RedisConnection(asyncio.BufferedProtocol):
+    HIGH_WATER_COMMANDS = 1024
+    LOW_WATER_COMMANDS = 256
+
+    def __init__(self, server, buffer_size: int = RedisRequestParser.BUFFER_SIZE):
+        self._server = server
+        self._parser = RedisRequestParser(buffer_size)
+        self._loop = asyncio.get_running_loop()
+        self._transport: Optional[asyncio.Transport] = None
+        self._commands: Deque[List[bytes]] = deque()
+        self._read_waiter: Optional[asyncio.Future] = None
+        self._drain_waiter: Optional[asyncio.Future] = None
+        self._closed = self._loop.create_future()
+        self._reading_paused = False
+        self._writing_paused = False
+        self._eof = False
+        self._error: Optional[Exception] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending_commands(self) -> int:
+        return len(self._commands)
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._task = self._loop.create_task(self._server.handle_stream(self, self))
+
+    def connection_lost(self, exc):
+        self._eof = True
+        if exc is not None and self._error is None:
+            self._error = exc
+        self._wakeup_reader()
+        waiter = self._drain_waiter
+        if waiter is not None and not waiter.done():
+            if exc is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(exc)
+        self._drain_waiter = None
+        if not self._closed.done():
+            self._closed.set_result(None)
+        self._transport = None
+
+    def get_buffer(self, sizehint):
+        return self._parser.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes):
+        self._server.total_net_input_bytes += nbytes
+        self._parser.buffer_updated(nbytes)
+        commands_result = self._parser.parse()
+        if commands_result.is_error:
+            self._error = commands_result.error
+        else:
+            commands = commands_result.unwrap()
+            if commands:
+                self._commands.extend(commands)
+                if len(self._commands) >= self.HIGH_WATER_COMMANDS and not self._reading_paused:
+                    self._reading_paused = True
+                    self._transport.pause_reading()
+        self._wakeup_reader()
+
+    def eof_received(self):
+        self._eof = True
+        self._wakeup_reader()
+        return False
+
+    def pause_writing(self):
+        self._writing_paused = True
+
+    def resume_writing(self):
+        self._writing_paused = False
+        waiter = self._drain_waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        self._drain_waiter = None
+
+    def _wakeup_reader(self):
+        waiter = self._read_waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        self._read_waiter = None
+
+    async def read_command(self) -> Result[List[bytes]]:
+        commands = self._commands
+        while not commands:
+            if self._error is not None:
+                return Result(self._error)
+            if self._eof:
+                return Result(EOFError())
+            self._read_waiter = self._loop.create_future()
+            try:
+                await self._read_waiter
+            finally:
+                self._read_waiter = None
+        if self._reading_paused and len(commands) <= self.LOW_WATER_COMMANDS:
+            self._reading_paused = False
+            if self._transport is not None:
+                self._transport.resume_reading()
+        return Result(commands.popleft())
+
+    def write(self, data):
+        if self._transport is not None:
+            self._transport.write(data)
+
+    def writelines(self, list_of_data):
+        if self._transport is not None:
+            self._transport.writelines(list_of_data)
+
+    async def drain(self):
+        if self._transport is None:
+            raise ConnectionResetError("Connection lost")
+        if not self._writing_paused:
+            return
+        waiter = self._loop.create_future()
+        self._drain_waiter = waiter
+        await waiter
+
+    def get_extra_info(self, name, default=None):
+        if self._transport is None:
+            return default
+        return self._transport.get_extra_info(name, default)
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+
+    async def wait_closed(self):
+        await self._closed
+
+
+__all__ = ["RedisConnection", ]
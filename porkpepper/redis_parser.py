@@ -0,0 +1,144 @@
+from typing import *
+from .result import Result
+from .error import *
+
+
+class RedisRequestParser:
+    BUFFER_SIZE = 64 * 1024
+    MIN_READ_SIZE = 4 * 1024
+    MAX_LINE_SIZE = 64 * 1024
+    MAX_BULK_SIZE = 512 * 1024 * 1024
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE):
+        self._buffer_size = buffer_size
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self._scan = 0
+        self._args: Optional[List[bytes]] = None
+        self._args_count = 0
+        self._bulk_size = -1
+        self._error: Optional[Exception] = None
+
+    @property
+    def buffered_size(self) -> int:
+        return self._end - self._start
+
+    @property
+    def error(self) -> Optional[Exception]:
+        return self._error
+
+    def _required_size(self) -> int:
+        if self._bulk_size >= 0:
+            remain = self._start + self._bulk_size + 2 - self._end
+            if remain > 0:
+                return remain + self.MIN_READ_SIZE
+        return self.MIN_READ_SIZE
+
+    def _reserve(self, required: int):
+        buffered = self._end - self._start
+        capacity = len(self._buffer)
+        if not buffered and capacity > self._buffer_size and required <= self._buffer_size:
+            self._buffer = bytearray(self._buffer_size)
+            self._view = memoryview(self._buffer)
+            self._start = self._end = self._scan = 0
+            return
+        if capacity - self._end >= required:
+            return
+        if buffered + required <= capacity:
+            if buffered:
+                self._view[:buffered] = self._view[self._start:self._end]
+        else:
+            size = max(capacity * 2, buffered + required)
+            buffer = bytearray(size)
+            buffer[:buffered] = self._view[self._start:self._end]
+            self._buffer = buffer
+            self._view = memoryview(buffer)
+        self._scan -= self._start
+        self._start = 0
+        self._end = buffered
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        required = self._required_size()
+        if sizehint > required:
+            required = sizehint
+        self._reserve(required)
+        return self._view[self._end:]
+
+    def buffer_updated(self, nbytes: int):
+        self._end += nbytes
+
+    def feed(self, data: bytes):
+        size = len(data)
+        self._reserve(size)
+        self._view[self._end:self._end + size] = data
+        self._end += size
+
+    def _fail(self, error: Exception) -> Result[List[List[bytes]]]:
+        self._error = error
+        return Result(error)
+
+    def _read_size(self, marker: int, pos: int, end: int) -> Tuple[int, int]:
+        buffer = self._buffer
+        if buffer[pos] != marker:
+            return -2, pos
+        scan = self._scan if self._scan > pos else pos
+        line_end = buffer.find(b"\r\n", scan, end)
+        if line_end < 0:
+            if end - pos > self.MAX_LINE_SIZE:
+                return -2, pos
+            self._scan = end - 1 if end > pos else pos
+            return -1, pos
+        value_binary = buffer[pos + 1:line_end]
+        if not value_binary.isdigit():
+            return -2, pos
+        return int(value_binary), line_end + 2
+
+    def parse(self) -> Result[List[List[bytes]]]:
+        if self._error is not None:
+            return Result(self._error)
+        commands = list()
+        buffer = self._buffer
+        view = self._view
+        pos = self._start
+        end = self._end
+        while pos < end:
+            if self._args is None:
+                args_count, next_pos = self._read_size(42, pos, end)
+                if args_count == -1:
+                    break
+                if args_count < 1:
+                    return self._fail(RedisProtocolFormatError())
+                self._args = list()
+                self._args_count = args_count
+                pos = next_pos
+            elif self._bulk_size < 0:
+                bulk_size, next_pos = self._read_size(36, pos, end)
+                if bulk_size == -1:
+                    break
+                if bulk_size < 0 or bulk_size > self.MAX_BULK_SIZE:
+                    return self._fail(RedisProtocolFormatError())
+                self._bulk_size = bulk_size
+                pos = next_pos
+            else:
+                bulk_end = pos + self._bulk_size
+                if bulk_end + 2 > end:
+                    break
+                if buffer[bulk_end] != 13 or buffer[bulk_end + 1] != 10:
+                    return self._fail(RedisProtocolFormatError())
+                args = self._args
+                args.append(bytes(view[pos:bulk_end]))
+                self._bulk_size = -1
+                pos = bulk_end + 2
+                if len(args) == self._args_count:
+                    commands.append(args)
+                    self._args = None
+        if pos >= end:
+            self._start = self._end = self._scan = 0
+        else:
+            self._start = pos
+        return Result(commands)
+
+
+__all__ = ["RedisRequestParser", ]
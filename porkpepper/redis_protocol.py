@@ -3,13 +3,70 @@ from .result import Result
 from .error import *
 
 
+SMALL_NUMBER_LIMIT = 1024
+
+
 class RedisProtocol:
     CR_LF = [13, 10, ]
+    CRLF = b"\r\n"
+    OK = b"+OK\r\n"
+    PONG = b"+PONG\r\n"
+    ERR = b"-ERR\r\n"
+    NIL = b"$-1\r\n"
+    INTEGER_REPLIES = [f":{n}\r\n".encode("utf8") for n in range(SMALL_NUMBER_LIMIT)]
+    COUNT_HEADERS = [f"*{n}\r\n".encode("utf8") for n in range(SMALL_NUMBER_LIMIT)]
+    BULK_HEADERS = [f"${n}\r\n".encode("utf8") for n in range(SMALL_NUMBER_LIMIT)]
+    STATUS_REPLIES = {"OK": OK, "PONG": PONG, }
+    ERROR_REPLIES = {"ERR": ERR, }
+    REPLY_CACHE_SIZE = 256
+
+    @classmethod
+    def integer_reply(cls, n: int) -> bytes:
+        if 0 <= n < SMALL_NUMBER_LIMIT:
+            return cls.INTEGER_REPLIES[n]
+        return b":%d\r\n" % n
+
+    @classmethod
+    def count_header(cls, n: int) -> bytes:
+        if 0 <= n < SMALL_NUMBER_LIMIT:
+            return cls.COUNT_HEADERS[n]
+        return b"*%d\r\n" % n
+
+    @classmethod
+    def bulk_header(cls, n: int) -> bytes:
+        if 0 <= n < SMALL_NUMBER_LIMIT:
+            return cls.BULK_HEADERS[n]
+        return b"$%d\r\n" % n
+
+    @classmethod
+    def bulk_parts(cls, b: Union[bytes, str, int]) -> Tuple[bytes, bytes, bytes]:
+        if isinstance(b, str):
+            b = b.encode("utf8")
+        elif isinstance(b, int):
+            b = str(b).encode("utf8")
+        return cls.bulk_header(len(b)), b, cls.CRLF
+
+    @classmethod
+    def status_reply(cls, reason: str) -> bytes:
+        reply = cls.STATUS_REPLIES.get(reason, None)
+        if reply is None:
+            reply = f"+{reason}\r\n".encode("utf8")
+            if len(cls.STATUS_REPLIES) < cls.REPLY_CACHE_SIZE:
+                cls.STATUS_REPLIES[reason] = reply
+        return reply
+
+    @classmethod
+    def error_reply(cls, reason: str) -> bytes:
+        reply = cls.ERROR_REPLIES.get(reason, None)
+        if reply is None:
+            reply = f"-{reason}\r\n".encode("utf8")
+            if len(cls.ERROR_REPLIES) < cls.REPLY_CACHE_SIZE:
+                cls.ERROR_REPLIES[reason] = reply
+        return reply
 
     @classmethod
     def set_nil(cls):
-        buffer = "$-1\r\n".encode("utf8")
-        return Result(buffer)
+        return Result(cls.NIL)
 
     @classmethod
     def set_integer(cls, n):
@@ -17,7 +74,7 @@ class RedisProtocol:
             return Result(RedisProtocolFormatError())
         elif not isinstance(n, int):
             return Result(RedisProtocolFormatError())
-        return Result(f":{n}\r\n".encode("utf8"))
+        return Result(cls.integer_reply(n))
 
     @classmethod
     def get_integer(cls, line: bytes):
@@ -36,13 +93,13 @@ class RedisProtocol:
     def set_ok(cls, reason: str = "OK"):
         if not isinstance(reason, str):
             return Result(RedisProtocolFormatError())
-        return Result(f"+{reason}\r\n".encode("utf8"))
+        return Result(cls.status_reply(reason))
 
     @classmethod
     def set_err(cls, reason: str = "ERR"):
         if not isinstance(reason, str):
             return Result(RedisProtocolFormatError())
-        return Result(f"-{reason}\r\n".encode("utf8"))
+        return Result(cls.error_reply(reason))
 
     @classmethod
     def set_count(cls, n: int) -> Result[bytes]:
@@ -52,25 +109,15 @@ class RedisProtocol:
             return Result(RedisProtocolFormatError())
         if n < 0:
             return Result(RedisProtocolFormatError())
-        return Result(f"*{n}\r\n".encode("utf8"))
+        return Result(cls.count_header(n))
 
     @classmethod
     def set_binary(cls, b: Union[bytes, str, int]):
         if isinstance(b, bool):
             return Result(RedisProtocolFormatError())
-        if isinstance(b, str):
-            arg_buffer = b.encode("utf8")
-        elif isinstance(b, bytes):
-            arg_buffer = b
-        elif isinstance(b, int):
-            arg_buffer = str(b).encode("utf8")
-        else:
+        if not isinstance(b, (bytes, str, int)):
             return Result(RedisProtocolFormatError())
-        length = len(arg_buffer)
-        buffer = bytearray(f"${length}\r\n".encode("utf8"))
-        buffer.extend(arg_buffer)
-        buffer.extend(cls.CR_LF)
-        return Result(buffer)
+        return Result(b"".join(cls.bulk_parts(b)))
 
     @classmethod
     def get_count(cls, line: bytes) -> Result[int]:
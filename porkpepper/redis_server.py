@@ -19,7 +19,7 @@ class RedisServer(RedisServerBase):
     async def ping(self, session):
         return Result(NotImplementedError())
 
-    async def info(self, session):
+    async def info(self, session, section=None):
         return Result(NotImplementedError())
 
     async def auth(self, session, password) -> Result[bool]:
@@ -34,7 +34,7 @@ class RedisServer(RedisServerBase):
     async def ttl(self, session, key):
         return Result(NotImplementedError())
 
-    async def scan(self, session, pattern):
+    async def scan(self, session, pattern, cursor=None, count=None):
         return Result(NotImplementedError())
 
     async def dbsize(self, session):
@@ -43,8 +43,5 @@ class RedisServer(RedisServerBase):
     async def select(self, session, db):
         return Result(NotImplementedError())
 
-    async def config(self, session, get_set, field, value=None):
-        return Result(NotImplementedError())
-
 
 __all__ = ["RedisServer", ]
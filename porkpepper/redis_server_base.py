@@ -5,12 +5,19 @@ import math
 import random
 import string
 import asyncio
-from jinja2 import Template
+from time import perf_counter_ns
+from types import SimpleNamespace
+from collections import deque
 from .result import *
 from .utils import *
 from .redis_protocol import RedisProtocol
 from .redis_task_node import RedisTaskNode
 from .redis_session import RedisSession
+from .redis_connection import RedisConnection
+from .idle_deadline import IdleDeadline
+from .error import CommandNotFound
+from .redis_stats import CommandStats, InstantaneousMetric, LatencyHistogram, SlowLog
+from .redis_command import RedisCommand, DEFAULT_COMMANDS, COMMAND_ATTR
 
 
 class RedisServerBase(RedisProtocol):
@@ -18,42 +25,56 @@ class RedisServerBase(RedisProtocol):
     WORKER_QUEUE = asyncio.Queue()
     ENABLE_AUTH = False
     MAX_DB_COUNT = 1
+    ENGINE = "stream"
+    ENABLE_PIPELINE = True
+    PIPELINE_FLUSH_SIZE = 64 * 1024
+    MAX_CONCURRENT_COMMANDS = 1
+    STATS_SAMPLE_INTERVAL = 0.1
+    STATS_SAMPLE_COUNT = 16
+    SLOWLOG_LOG_SLOWER_THAN = 10000
+    SLOWLOG_MAX_LEN = 128
+    COMMANDS: Dict[bytes, RedisCommand] = {entry.name: entry for entry in DEFAULT_COMMANDS}
 
-    INFO_TEMPLATE = Template(
-        """# Server
-redis_version:3.0.0
-porkpepper_version:0.1.0
-porkpepper_mode:{{ porkpepper_mode }}
-process_id:{{ process_id }}
-run_id:{{ run_id }}
-tcp_port:{{ tcp_port }}
-uptime_in_seconds:{{ uptime_in_seconds }}
-uptime_in_days:{{ uptime_in_days }}
-
-# Clients
-connected_clients:{{ connected_clients }}
-
-# Stats
-total_connections_received:{{ total_connections_received }}
-total_commands_processed:{{ total_commands_processed }}
-instantaneous_ops_per_sec:{{ instantaneous_ops_per_sec }}
-total_net_input_bytes:{{ total_net_input_bytes }}
-total_net_output_bytes:{{ total_net_output_bytes }}
-
-# Replication
-role:master
-connected_slaves:0
-master_repl_offset:0
-
-# Cluster
-cluster_enabled:0
-
-# Keyspace
-{% for db, info in keyspace %}db{{ db }}:keys={{ info["keys"] }},expires=0,avg_ttl=0\r\n{% endfor %}
-""", newline_sequence="\r\n")
+    REDIS_VERSION = "3.0.0"
+    PORKPEPPER_VERSION = "0.1.0"
+    INFO_MODE = ""
+    INFO_DEFAULT_SECTIONS = ("server", "clients", "stats", "replication", "cluster", "keyspace", )
+    INFO_ALL_SECTIONS = INFO_DEFAULT_SECTIONS + ("commandstats", )
+    INFO_REPLICATION = "# Replication\r\nrole:master\r\nconnected_slaves:0\r\nmaster_repl_offset:0\r\n"
+    INFO_CLUSTER = "# Cluster\r\ncluster_enabled:0\r\n"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.COMMANDS = dict(cls.COMMANDS)
+        for name, member in cls.__dict__.items():
+            command_arguments = getattr(member, COMMAND_ATTR, None)
+            if command_arguments is not None:
+                cls.register_command(handler=name, **command_arguments)
+
+    @classmethod
+    def register_command(
+            cls,
+            name: Union[bytes, str],
+            arity: int,
+            handler: str,
+            decoder: Callable[[List[bytes]], Result[Dict]],
+            encoder: Callable,
+            auth_required: bool = True,
+            barrier: bool = False,
+    ):
+        if "COMMANDS" not in cls.__dict__:
+            cls.COMMANDS = dict(cls.COMMANDS)
+        entry = RedisCommand(name, arity, handler, decoder, encoder, auth_required=auth_required, barrier=barrier)
+        cls.COMMANDS[entry.name] = entry
+        return entry
 
     def __init__(self, app=None):
         self._http_app = app
+        self._info_server_header: Optional[str] = None
+        self._info_keyspace_lines: Dict[int, Tuple[int, str]] = dict()
+        self.worker_id: Optional[int] = None
+        self.worker_stats: Optional['WorkerStatsTable'] = None
+        self.worker_stats_epoch = 0
         self.host = None
         self.port = None
         self.connections = set()
@@ -64,6 +85,15 @@ cluster_enabled:0
         self.instantaneous_ops_per_sec = 0
         self.total_net_input_bytes = 0
         self.total_net_output_bytes = 0
+        self.instantaneous_input_kbps = 0.0
+        self.instantaneous_output_kbps = 0.0
+        self.command_stats: Dict[bytes, CommandStats] = dict()
+        self._ops_metric = InstantaneousMetric(self.STATS_SAMPLE_COUNT)
+        self._input_metric = InstantaneousMetric(self.STATS_SAMPLE_COUNT)
+        self._output_metric = InstantaneousMetric(self.STATS_SAMPLE_COUNT)
+        self._stats_sampler: Optional[asyncio.TimerHandle] = None
+        self.slow_log = SlowLog(self.SLOWLOG_MAX_LEN)
+        self._slowlog_threshold = self.SLOWLOG_LOG_SLOWER_THAN * 1000
         self.init_property()
 
     def init_property(self):
@@ -72,11 +102,110 @@ cluster_enabled:0
         random_key = ''.join(random.choices(string.ascii_letters, k=128))
         run_id = create_base58_key(random_key, length=20, prefix="PP", timestamp=True)
         self.run_id = run_id
+        self._info_server_header = None
+        self.reset_stats()
+
+    def reset_stats(self):
         self.total_connections_received = 0
         self.total_commands_processed = 0
         self.instantaneous_ops_per_sec = 0
         self.total_net_input_bytes = 0
         self.total_net_output_bytes = 0
+        self.instantaneous_input_kbps = 0.0
+        self.instantaneous_output_kbps = 0.0
+        self.command_stats.clear()
+        self.event_loop_lag = 0.0
+        self.event_loop_lag_histogram = LatencyHistogram()
+        self._ops_metric.reset()
+        self._input_metric.reset()
+        self._output_metric.reset()
+
+    def record_command(self, node: RedisTaskNode, session: RedisSession, nsec: int):
+        name = node.entry.name
+        stats = self.command_stats.get(name)
+        if stats is None:
+            stats = self.command_stats[name] = CommandStats()
+        stats.calls += 1
+        stats.nsec += nsec
+        stats.histogram.record(nsec)
+        result = node.result
+        if result is None or result.is_error:
+            stats.failed_calls += 1
+        if 0 <= self._slowlog_threshold <= nsec:
+            self.slow_log.add(node.arguments or [name], nsec // 1000, self.client_address(session), session.current_db)
+
+    @classmethod
+    def client_address(cls, session: RedisSession) -> str:
+        writer = session.write
+        peername = writer.get_extra_info("peername") if writer is not None else None
+        if isinstance(peername, tuple) and len(peername) >= 2:
+            return f"{peername[0]}:{peername[1]}"
+        return ""
+
+    def start_stats_sampler(self):
+        if self._stats_sampler is None:
+            loop = asyncio.get_running_loop()
+            due = loop.time() + self.STATS_SAMPLE_INTERVAL
+            self._stats_sampler = loop.call_at(due, self._sample_stats, loop, due)
+
+    def stop_stats_sampler(self):
+        if self._stats_sampler is not None:
+            self._stats_sampler.cancel()
+            self._stats_sampler = None
+
+    def _sample_stats(self, loop, due):
+        now = loop.time()
+        lag = now - due if now > due else 0.0
+        self.event_loop_lag = lag
+        self.event_loop_lag_histogram.record(int(lag * 1e9))
+        self._ops_metric.sample(now, self.total_commands_processed)
+        self._input_metric.sample(now, self.total_net_input_bytes)
+        self._output_metric.sample(now, self.total_net_output_bytes)
+        self.instantaneous_ops_per_sec = int(round(self._ops_metric.value))
+        self.instantaneous_input_kbps = round(self._input_metric.value / 1024, 2)
+        self.instantaneous_output_kbps = round(self._output_metric.value / 1024, 2)
+        worker_stats = self.worker_stats
+        if worker_stats is not None:
+            if worker_stats.epoch != self.worker_stats_epoch:
+                self.worker_stats_epoch = worker_stats.epoch
+                self.reset_stats()
+            worker_stats.publish(self.worker_id, os.getpid(), self.stats_snapshot(), self.command_stats)
+        due = now + self.STATS_SAMPLE_INTERVAL
+        self._stats_sampler = loop.call_at(due, self._sample_stats, loop, due)
+
+    def stats_snapshot(self) -> Dict[str, Union[int, float]]:
+        return {
+            "connected_clients": len(self.connections),
+            "total_connections_received": self.total_connections_received,
+            "total_commands_processed": self.total_commands_processed,
+            "instantaneous_ops_per_sec": self.instantaneous_ops_per_sec,
+            "total_net_input_bytes": self.total_net_input_bytes,
+            "total_net_output_bytes": self.total_net_output_bytes,
+            "instantaneous_input_kbps": self.instantaneous_input_kbps,
+            "instantaneous_output_kbps": self.instantaneous_output_kbps,
+        }
+
+    def stats_view(self) -> Dict[str, Union[int, float]]:
+        stats = self.stats_snapshot()
+        if self.worker_stats is not None:
+            others, _ = self.worker_stats.aggregate(exclude=self.worker_id)
+            for field, value in others.items():
+                stats[field] = round(stats[field] + value, 2) if isinstance(value, float) else stats[field] + value
+        return stats
+
+    def command_stats_view(self) -> Dict[bytes, CommandStats]:
+        if self.worker_stats is None:
+            return self.command_stats
+        _, command_stats = self.worker_stats.aggregate(exclude=self.worker_id)
+        for name, stats in self.command_stats.items():
+            command = command_stats.get(name)
+            if command is None:
+                command = command_stats[name] = CommandStats()
+            command.calls += stats.calls
+            command.nsec += stats.nsec
+            command.failed_calls += stats.failed_calls
+            command.histogram.merge(stats.histogram)
+        return command_stats
 
     @property
     def app(self):
@@ -88,6 +217,7 @@ cluster_enabled:0
 
     async def handle_stream(self, reader, writer):
         session = None
+        in_flight: Deque[Tuple[RedisTaskNode, Optional[asyncio.Future]]] = deque()
         try:
             self.connections.add((reader, writer, ))
             self.total_connections_received += 1
@@ -101,28 +231,59 @@ cluster_enabled:0
             session.write = writer
             session.need_auth_event = need_auth_event
             session.server = self
-            idle_timeout = self.IDLE_TIMEOUT
+            session.deadline = IdleDeadline(self.IDLE_TIMEOUT, asyncio.current_task())
+            pipeline = self.ENABLE_PIPELINE
+            flush_size = self.PIPELINE_FLUSH_SIZE
+            concurrency = self.MAX_CONCURRENT_COMMANDS
             while True:
                 node_result = await RedisTaskNode.create(session, self)
                 if node_result.is_error:
                     raise node_result.error
-                if node_result.is_some:
-                    node: RedisTaskNode = node_result.unwrap()
-                    if node.fa:
-                        func, kwargs = node.fa
-                        if kwargs:
-                            result = await func(**kwargs)
-                        else:
-                            result = await func()
-                        node.result = result
-                    write_result = await asyncio.wait_for(node.write_result(session, self),
-                                                          timeout=idle_timeout)
+                node: RedisTaskNode = node_result.unwrap()
+                if concurrency > 1 and (node.entry is None or not node.entry.barrier):
+                    in_flight.append((node, self.start_node(node), ))
+                    if pipeline and RedisTaskNode.has_pending_command(session):
+                        while len(in_flight) >= concurrency:
+                            await self.complete_node(in_flight, session)
+                        if session.output_size < flush_size:
+                            continue
+                    else:
+                        while in_flight:
+                            await self.complete_node(in_flight, session)
+                    await RedisTaskNode.flush(session, self)
+                    continue
+                while in_flight:
+                    await self.complete_node(in_flight, session)
+                if node.fa:
+                    func, kwargs = node.fa
+                    start = perf_counter_ns()
+                    if kwargs:
+                        result = await func(**kwargs)
+                    else:
+                        result = await func()
+                    node.result = result
+                    write_result = await node.write_result(session, self)
+                    self.record_command(node, session, perf_counter_ns() - start)
+                else:
+                    write_result = await node.write_result(session, self)
                 self.total_commands_processed += 1
+                if pipeline and session.output_size < flush_size and RedisTaskNode.has_pending_command(session):
+                    continue
+                await RedisTaskNode.flush(session, self)
+        except asyncio.CancelledError:
+            if session is not None and session.deadline is not None and session.deadline.expired:
+                return Result(asyncio.TimeoutError())
+            raise
         except asyncio.TimeoutError as e:
             return Result(e)
         except Exception as e:
             return Result(e)
         finally:
+            for _, task in in_flight:
+                if task is not None:
+                    task.cancel()
+            if session is not None and session.deadline is not None:
+                session.deadline.cancel()
             try:
                 writer.close()
                 await writer.wait_closed()
@@ -134,33 +295,144 @@ cluster_enabled:0
                 session.write = None
                 session.server = None
 
-    def info_arguments(self):
-        return {
-            "porkpepper_version": "0.1.0",
-            "porkpepper_mode": "",
-            "process_id": os.getpid(),
-            "run_id": self.run_id,
-            "tcp_port": self.port,
-            "uptime_in_seconds": int(time.time()) - self.start_time,
-            "uptime_in_days": math.ceil((time.time() - self.start_time) / (24 * 60 * 60)),
-            "connected_clients": len(self.connections),
-            "keyspace": list(),
-            "total_connections_received": self.total_connections_received,
-            "total_commands_processed": self.total_commands_processed,
-            "instantaneous_ops_per_sec": self.instantaneous_ops_per_sec,
-            "total_net_input_bytes": self.total_net_input_bytes,
-            "total_net_output_bytes": self.total_net_output_bytes,
-        }
+    def start_node(self, node: RedisTaskNode) -> Optional[asyncio.Future]:
+        if not node.fa:
+            return None
+        return asyncio.ensure_future(self.execute_node(node))
 
-    async def serve(self, host='127.0.0.1', port=6379, forever=True, after_start=None, **kwargs):
+    async def execute_node(self, node: RedisTaskNode) -> Result:
+        func, kwargs = node.fa
+        start = perf_counter_ns()
+        if kwargs:
+            result = await func(**kwargs)
+        else:
+            result = await func()
+        node.elapsed = perf_counter_ns() - start
+        return result
+
+    async def complete_node(self, in_flight: Deque[Tuple[RedisTaskNode, Optional[asyncio.Future]]], session):
+        node, task = in_flight[0]
+        if task is not None:
+            node.result = await task
+        in_flight.popleft()
+        if task is not None:
+            start = perf_counter_ns()
+            write_result = await node.write_result(session, self)
+            self.record_command(node, session, node.elapsed + perf_counter_ns() - start)
+        else:
+            write_result = await node.write_result(session, self)
+        self.total_commands_processed += 1
+
+    def keyspace(self) -> List[Tuple[int, Dict]]:
+        return list()
+
+    def info_server(self) -> str:
+        header = self._info_server_header
+        if header is None:
+            header = self._info_server_header = (
+                f"# Server\r\n"
+                f"redis_version:{self.REDIS_VERSION}\r\n"
+                f"porkpepper_version:{self.PORKPEPPER_VERSION}\r\n"
+                f"porkpepper_mode:{self.INFO_MODE}\r\n"
+                f"process_id:{os.getpid()}\r\n"
+                f"run_id:{self.run_id}\r\n"
+                f"tcp_port:{self.port}\r\n"
+            )
+        uptime = time.time() - self.start_time
+        return (
+            f"{header}"
+            f"uptime_in_seconds:{int(uptime)}\r\n"
+            f"uptime_in_days:{math.ceil(uptime / (24 * 60 * 60))}\r\n"
+        )
+
+    def info_clients(self) -> str:
+        if self.worker_stats is None:
+            connected_clients = len(self.connections)
+        else:
+            connected_clients = self.stats_view()["connected_clients"]
+        return f"# Clients\r\nconnected_clients:{connected_clients}\r\n"
+
+    def info_stats(self) -> str:
+        if self.worker_stats is None:
+            stats = self
+        else:
+            stats = SimpleNamespace(**self.stats_view())
+        return (
+            f"# Stats\r\n"
+            f"total_connections_received:{stats.total_connections_received}\r\n"
+            f"total_commands_processed:{stats.total_commands_processed}\r\n"
+            f"instantaneous_ops_per_sec:{stats.instantaneous_ops_per_sec}\r\n"
+            f"total_net_input_bytes:{stats.total_net_input_bytes}\r\n"
+            f"total_net_output_bytes:{stats.total_net_output_bytes}\r\n"
+            f"instantaneous_input_kbps:{stats.instantaneous_input_kbps}\r\n"
+            f"instantaneous_output_kbps:{stats.instantaneous_output_kbps}\r\n"
+        )
+
+    def info_replication(self) -> str:
+        return self.INFO_REPLICATION
+
+    def info_cluster(self) -> str:
+        return self.INFO_CLUSTER
+
+    def info_keyspace(self) -> str:
+        lines = ["# Keyspace\r\n"]
+        cache = self._info_keyspace_lines
+        for db, info in self.keyspace():
+            keys = info["keys"]
+            cached = cache.get(db)
+            if cached is None or cached[0] != keys:
+                cached = cache[db] = (keys, f"db{db}:keys={keys},expires=0,avg_ttl=0\r\n", )
+            lines.append(cached[1])
+        return "".join(lines)
+
+    def info_commandstats(self) -> str:
+        lines = ["# Commandstats\r\n"]
+        for name, stats in self.command_stats_view().items():
+            lines.append(
+                f"cmdstat_{name.decode('utf8').lower()}:calls={stats.calls},usec={stats.usec},"
+                f"usec_per_call={stats.usec_per_call:.2f},rejected_calls=0,failed_calls={stats.failed_calls}\r\n"
+            )
+        return "".join(lines)
+
+    def render_info(self, section: Optional[str] = None) -> str:
+        if section is None or section == "default":
+            sections = self.INFO_DEFAULT_SECTIONS
+        elif section == "all" or section == "everything":
+            sections = self.INFO_ALL_SECTIONS
+        elif section in self.INFO_ALL_SECTIONS:
+            return getattr(self, f"info_{section}")()
+        else:
+            return ""
+        return "\r\n".join([getattr(self, f"info_{name}")() for name in sections])
+
+    async def serve(
+            self, host='127.0.0.1', port=6379, forever=True, after_start=None, engine=None, sock=None, **kwargs):
+        if sock is not None:
+            host, port = sock.getsockname()[:2]
+            kwargs["sock"] = sock
+            listen_host, listen_port = None, None
+        else:
+            listen_host, listen_port = host, port
         self.host = host
         self.port = port
-        server = await asyncio.start_server(self.handle_stream, host, port, **kwargs)
+        self._info_server_header = None
+        engine = engine or self.ENGINE
+        if engine == "stream":
+            server = await asyncio.start_server(self.handle_stream, listen_host, listen_port, **kwargs)
+        elif engine == "buffered":
+            loop = asyncio.get_running_loop()
+            server = await loop.create_server(lambda: RedisConnection(self), listen_host, listen_port, **kwargs)
+        else:
+            raise ValueError(f"unknown engine: {engine}")
+        self.start_stats_sampler()
         if after_start:
             after_start()
         if forever:
-            async with server:
-                await server.serve_forever()
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                self.stop_stats_sampler()
         else:
             return server
 
@@ -179,7 +451,7 @@ cluster_enabled:0
     async def ping(self, session):
         return Result(NotImplementedError())
 
-    async def info(self, session):
+    async def info(self, session, section=None):
         return Result(NotImplementedError())
 
     async def auth(self, session, password) -> Result[bool]:
@@ -195,7 +467,7 @@ cluster_enabled:0
     async def ttl(self, session, key):
         return Result(NotImplementedError())
 
-    async def scan(self, session, pattern):
+    async def scan(self, session, pattern, cursor=None, count=None):
         return Result(NotImplementedError())
 
     async def dbsize(self, session):
@@ -204,9 +476,82 @@ cluster_enabled:0
     async def select(self, session, db):
         return Result(NotImplementedError())
 
-    async def config(self, session, get_set, field, value=None):
+    async def config(self, session, get_set, field=None, value=None):
+        config_result = self.server_config(get_set, field, value)
+        if config_result is not None:
+            return config_result
         return Result(NotImplementedError())
 
+    @property
+    def slowlog_log_slower_than(self) -> int:
+        threshold = self._slowlog_threshold
+        return threshold // 1000 if threshold >= 0 else -1
+
+    @slowlog_log_slower_than.setter
+    def slowlog_log_slower_than(self, v: int):
+        self._slowlog_threshold = v * 1000 if v >= 0 else -1
+
+    def server_config(self, get_set, field, value=None) -> Optional[Result]:
+        if get_set == b'RESETSTAT':
+            self.reset_stats()
+            if self.worker_stats is not None:
+                self.worker_stats_epoch = self.worker_stats.reset()
+            return Result(True)
+        if field not in (b'slowlog-log-slower-than', b'slowlog-max-len', ):
+            return None
+        if get_set == b'GET':
+            if field == b'slowlog-log-slower-than':
+                return Result([field, str(self.slowlog_log_slower_than).encode("utf8")])
+            return Result([field, str(self.slow_log.max_len).encode("utf8")])
+        if get_set == b'SET' and value is not None:
+            try:
+                number = int(value)
+            except ValueError as e:
+                return Result(e)
+            if field == b'slowlog-log-slower-than':
+                self.slowlog_log_slower_than = number
+            elif number >= 0:
+                self.slow_log.max_len = number
+            else:
+                return Result(ValueError())
+            return Result(True)
+        return None
+
+    async def slowlog(self, session, subcommand, count=None):
+        if subcommand == b'GET':
+            return Result([entry.to_reply() for entry in self.slow_log.get(10 if count is None else count)])
+        if subcommand == b'LEN':
+            return Result(len(self.slow_log))
+        if subcommand == b'RESET':
+            self.slow_log.reset()
+            return Result(True)
+        return Result(CommandNotFound())
+
+    def latency_histograms(self) -> Dict[str, LatencyHistogram]:
+        return {name.decode("utf8").lower(): stats.histogram for name, stats in self.command_stats.items()}
+
+    async def latency(self, session, subcommand, names=None):
+        if subcommand != b'HISTOGRAM':
+            return Result(CommandNotFound())
+        histograms = self.latency_histograms()
+        if names:
+            selected = dict()
+            for name in names:
+                name = name.decode("utf8")
+                key = name if name in histograms else name.lower()
+                if key in histograms:
+                    selected[key] = histograms[key]
+            histograms = selected
+        reply = list()
+        for name, histogram in histograms.items():
+            buckets = list()
+            for bucket, count in histogram.cumulative():
+                buckets.append(bucket)
+                buckets.append(count)
+            reply.append(name)
+            reply.append([b"calls", histogram.total, b"histogram_usec", buckets])
+        return Result(reply)
+
     async def delete(self, session, key):
         return Result(NotImplementedError())
 
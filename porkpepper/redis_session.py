@@ -1,3 +1,4 @@
+from collections import deque
 
 
 class RedisSession:
@@ -5,8 +6,13 @@ class RedisSession:
         self.current_db: int = 0
         self.reader = None
         self.write = None
+        self.output = list()
+        self.output_size: int = 0
         self.need_auth_event = None
         self.server = None
+        self.deadline = None
+        self.parser = None
+        self.commands = deque()
 
 
 __all__ = ["RedisSession", ]
@@ -0,0 +1,175 @@
+from typing import *
+import time
+from collections import deque
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "total", "nsec", )
+    BUCKETS = 40
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total = 0
+        self.nsec = 0
+
+    def record(self, nsec: int):
+        index = (nsec // 1000).bit_length()
+        if index >= self.BUCKETS:
+            index = self.BUCKETS - 1
+        self.counts[index] += 1
+        self.total += 1
+        self.nsec += nsec
+
+    def merge(self, other: 'LatencyHistogram'):
+        counts = self.counts
+        for index, bucket_count in enumerate(other.counts):
+            counts[index] += bucket_count
+        self.total += other.total
+        self.nsec += other.nsec
+
+    def cumulative(self) -> List[Tuple[int, int]]:
+        buckets = list()
+        count = 0
+        for index, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            count += bucket_count
+            buckets.append((1 << index, count, ))
+        return buckets
+
+    def percentile(self, q: float) -> int:
+        if not self.total:
+            return 0
+        rank = q * self.total
+        count = 0
+        for index, bucket_count in enumerate(self.counts):
+            count += bucket_count
+            if count >= rank:
+                return 1 << index
+        return 1 << (self.BUCKETS - 1)
+
+
+class CommandStats:
+    __slots__ = ("calls", "nsec", "failed_calls", "histogram", )
+
+    def __init__(self):
+        self.calls = 0
+        self.nsec = 0
+        self.failed_calls = 0
+        self.histogram = LatencyHistogram()
+
+    @property
+    def usec(self) -> int:
+        return self.nsec // 1000
+
+    @property
+    def usec_per_call(self) -> float:
+        if not self.calls:
+            return 0.0
+        return self.nsec / 1000 / self.calls
+
+
+class InstantaneousMetric:
+    __slots__ = ("_samples", "_last_time", "_last_value", )
+
+    def __init__(self, size: int = 16):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._last_time: Optional[float] = None
+        self._last_value = 0
+
+    def sample(self, now: float, value: int):
+        last_time = self._last_time
+        if last_time is not None and now > last_time:
+            self._samples.append((value - self._last_value) / (now - last_time))
+        self._last_time = now
+        self._last_value = value
+
+    def reset(self):
+        self._samples.clear()
+        self._last_time = None
+        self._last_value = 0
+
+    @property
+    def value(self) -> float:
+        samples = self._samples
+        if not samples:
+            return 0.0
+        return sum(samples) / len(samples)
+
+
+class SlowLogEntry:
+    __slots__ = ("id", "timestamp", "usec", "arguments", "client", "db", )
+
+    def __init__(self, id: int, timestamp: int, usec: int, arguments: List[bytes], client: str, db: int):
+        self.id = id
+        self.timestamp = timestamp
+        self.usec = usec
+        self.arguments = arguments
+        self.client = client
+        self.db = db
+
+    def to_reply(self) -> List:
+        return [self.id, self.timestamp, self.usec, self.arguments, self.client, b"", self.db]
+
+
+class SlowLog:
+    MAX_ARGUMENTS = 32
+    MAX_ARGUMENT_SIZE = 128
+    REDACTED = b"(redacted)"
+
+    def __init__(self, max_len: int = 128):
+        self._entries: Deque[SlowLogEntry] = deque(maxlen=max_len)
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def max_len(self) -> int:
+        return self._entries.maxlen
+
+    @max_len.setter
+    def max_len(self, v: int):
+        self._entries = deque(list(self._entries)[:v], maxlen=v)
+
+    @classmethod
+    def truncate(cls, arguments: List[bytes]) -> List[bytes]:
+        max_arguments = cls.MAX_ARGUMENTS
+        max_size = cls.MAX_ARGUMENT_SIZE
+        truncated = list()
+        head = arguments if len(arguments) <= max_arguments else arguments[:max_arguments - 1]
+        for argument in head:
+            if len(argument) > max_size:
+                argument = argument[:max_size] + b"... (%d more bytes)" % (len(argument) - max_size)
+            truncated.append(argument)
+        if len(arguments) > max_arguments:
+            truncated.append(b"... (%d more arguments)" % (len(arguments) - max_arguments + 1))
+        return truncated
+
+    @classmethod
+    def redact(cls, arguments: List[bytes]) -> List[bytes]:
+        name = arguments[0].upper() if arguments else b""
+        if name == b"AUTH" and len(arguments) > 1:
+            return [arguments[0]] + [cls.REDACTED] * (len(arguments) - 1)
+        if name == b"CONFIG" and len(arguments) > 3 and arguments[1].upper() == b"SET":
+            return arguments[:3] + [cls.REDACTED] * (len(arguments) - 3)
+        return arguments
+
+    def add(self, arguments: List[bytes], usec: int, client: str = "", db: int = 0) -> SlowLogEntry:
+        entry = SlowLogEntry(
+            self._next_id, int(time.time()), usec, self.truncate(self.redact(arguments)), client, db)
+        self._next_id += 1
+        self._entries.appendleft(entry)
+        return entry
+
+    def get(self, count: Optional[int] = 10) -> List[SlowLogEntry]:
+        entries = list(self._entries)
+        if count is None or count < 0:
+            return entries
+        return entries[:count]
+
+    def reset(self):
+        self._entries.clear()
+
+
+__all__ = ["LatencyHistogram", "CommandStats", "InstantaneousMetric", "SlowLogEntry", "SlowLog", ]
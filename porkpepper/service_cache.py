@@ -0,0 +1,106 @@
+from typing import *
+import sys
+import time
+import struct
+from collections import OrderedDict
+
+
+class ServiceCache:
+    # bookkeeping charged per entry on top of len(payload) + len(reply): both bytes headers, the
+    # (expire_at, reply) tuple and its float, a dict slot (3 words) and an OrderedDict link node (4 words)
+    ENTRY_OVERHEAD = (
+        2 * sys.getsizeof(b"") + sys.getsizeof((0.0, b"", )) + sys.getsizeof(0.0) + 7 * struct.calcsize("P")
+    )
+    DEFAULT_MAX_ENTRIES = 1024
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None, ttl: Optional[float] = None):
+        if max_entries is None and max_bytes is None:
+            max_entries = self.DEFAULT_MAX_ENTRIES
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.memory = 0
+        self._entries: 'OrderedDict[bytes, Tuple[Optional[float], bytes]]' = OrderedDict()
+        self.reset_stats()
+
+    @classmethod
+    def from_option(cls, option: Union[bool, int, Dict, 'ServiceCache', None]) -> Optional['ServiceCache']:
+        if option is None or option is False:
+            return None
+        if isinstance(option, ServiceCache):
+            return cls(max_entries=option.max_entries, max_bytes=option.max_bytes, ttl=option.ttl)
+        if option is True:
+            return cls()
+        if isinstance(option, int):
+            return cls(max_entries=option)
+        if isinstance(option, dict):
+            return cls(**option)
+        raise ValueError(f"invalid cache option: {option!r}")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def entry_size(self, payload: bytes, reply: bytes) -> int:
+        return len(payload) + len(reply) + self.ENTRY_OVERHEAD
+
+    def get(self, payload: bytes) -> Optional[bytes]:
+        entries = self._entries
+        entry = entries.get(payload)
+        if entry is None:
+            self.misses += 1
+            return None
+        expire_at, reply = entry
+        if expire_at is not None and expire_at <= time.monotonic():
+            self._remove(payload)
+            self.expired += 1
+            self.misses += 1
+            return None
+        entries.move_to_end(payload)
+        self.hits += 1
+        return reply
+
+    def put(self, payload: bytes, reply: bytes):
+        size = self.entry_size(payload, reply)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        if payload in self._entries:
+            self._remove(payload)
+        expire_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[payload] = (expire_at, reply, )
+        self.memory += size
+        self._evict()
+
+    def _remove(self, payload: bytes):
+        _, reply = self._entries.pop(payload)
+        self.memory -= self.entry_size(payload, reply)
+
+    def _evict(self):
+        entries = self._entries
+        max_entries = self.max_entries
+        max_bytes = self.max_bytes
+        while entries and (
+                (max_entries is not None and len(entries) > max_entries) or
+                (max_bytes is not None and self.memory > max_bytes)):
+            payload, (_, reply) = entries.popitem(last=False)
+            self.memory -= self.entry_size(payload, reply)
+            self.evictions += 1
+
+    def invalidate(self, payload: Optional[bytes] = None) -> int:
+        if payload is None:
+            count = len(self._entries)
+            self._entries.clear()
+            self.memory = 0
+            return count
+        if payload not in self._entries:
+            return 0
+        self._remove(payload)
+        return 1
+
+
+__all__ = ["ServiceCache", ]
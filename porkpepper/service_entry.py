@@ -0,0 +1,106 @@
+from typing import *
+import json
+import weakref
+from .service_cache import ServiceCache
+from .single_flight import SingleFlight
+from .service_executor import ServiceExecutor, invoke_service
+
+
+def message_invoker(handler):
+    def invoke(message):
+        return handler(message=message)
+    return invoke
+
+
+def kwargs_invoker(handler):
+    def invoke(message):
+        return handler(**message)
+    return invoke
+
+
+class ServiceEntry:
+    __slots__ = (
+        "key", "handler", "arguments", "output", "use_kwargs", "invoke",
+        "loads", "dumps", "executor", "cache", "flight", "metadata", "direct", "__weakref__",
+    )
+    _registry: 'weakref.WeakKeyDictionary[Callable, weakref.WeakSet]' = weakref.WeakKeyDictionary()
+
+    def __init__(self, handler, arguments: Dict, loads, dumps):
+        self.key: str = arguments["key"]
+        self.handler = handler
+        self.arguments = arguments
+        self.output: bool = arguments["output"]
+        self.use_kwargs = "kwargs" in arguments["signature"].parameters
+        self.invoke = kwargs_invoker(handler) if self.use_kwargs else message_invoker(handler)
+        self.loads = loads
+        self.dumps = dumps
+        executor = arguments.get("executor", None)
+        self.executor: Optional[ServiceExecutor] = ServiceExecutor(
+            executor, arguments.get("max_workers", None), arguments.get("max_queue", None)) if executor else None
+        self.cache: Optional[ServiceCache] = ServiceCache.from_option(arguments.get("cache", None))
+        self.flight: Optional[SingleFlight] = SingleFlight() if arguments.get("single_flight", False) else None
+        self.direct = self.executor is None and self.cache is None and self.flight is None
+        self.metadata: bytes = json.dumps({
+            "type": "api",
+            "key": self.key,
+            "output": self.output,
+            "signature": str(arguments["signature"]),
+            "description": arguments["description"],
+            "meta": arguments["meta"],
+        }).encode("utf8")
+        if self.cache is not None:
+            entries = self._registry.get(self.function(handler))
+            if entries is None:
+                entries = self._registry[self.function(handler)] = weakref.WeakSet()
+            entries.add(self)
+
+    @classmethod
+    def function(cls, handler):
+        return getattr(handler, "__func__", handler)
+
+    @classmethod
+    def entries_of(cls, handler) -> List['ServiceEntry']:
+        entries = cls._registry.get(cls.function(handler), ())
+        return [entry for entry in entries if entry.handler == handler]
+
+    def invalidate(self, payload: Optional[bytes] = None) -> int:
+        if self.cache is None:
+            return 0
+        return self.cache.invalidate(payload)
+
+    async def call(self, value: bytes):
+        cache = self.cache
+        if cache is not None:
+            reply = cache.get(value)
+            if reply is not None:
+                return reply
+        flight = self.flight
+        if flight is not None:
+            return await flight.run(value, self.execute, value)
+        return await self.execute(value)
+
+    async def execute(self, value: bytes):
+        if self.executor is not None:
+            reply = await self.executor.run(invoke_service, self.handler, self.use_kwargs, self.loads, self.dumps, value)
+        else:
+            reply = self.dumps(await self.invoke(self.loads(value)))
+        cache = self.cache
+        if cache is not None:
+            if isinstance(reply, str):
+                reply = reply.encode("utf8")
+            if isinstance(reply, bytes):
+                cache.put(value, reply)
+        return reply
+
+    async def fire(self, value: bytes):
+        if self.executor is not None:
+            await self.executor.run(invoke_service, self.handler, self.use_kwargs, self.loads, None, value)
+        else:
+            await self.invoke(self.loads(value))
+
+    def shutdown(self, wait: bool = True):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+
+
+__all__ = ["ServiceEntry", ]
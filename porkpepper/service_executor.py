@@ -0,0 +1,67 @@
+from typing import *
+import sys
+import asyncio
+from concurrent.futures import Executor
+from .error import ServiceOverloaded
+
+
+EXECUTOR_KINDS = ("thread", "process", )
+
+
+def invoke_service(handler, use_kwargs: bool, loads, dumps, value):
+    message = loads(value)
+    if use_kwargs:
+        result = handler(**message)
+    else:
+        result = handler(message=message)
+    if dumps is None:
+        return None
+    return dumps(result)
+
+
+class ServiceExecutor:
+    def __init__(self, kind: str, max_workers: Optional[int] = None, max_queue: Optional[int] = None):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"unknown executor: {kind}")
+        if max_queue is not None and max_queue < 1:
+            raise ValueError("max_queue must be positive")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "thread":
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="porkpepper-service")
+            else:
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(self.max_workers)
+        return self._executor
+
+    async def run(self, func, *args):
+        if self.max_queue is not None and self.pending >= self.max_queue:
+            self.rejected += 1
+            raise ServiceOverloaded()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self, wait: bool = True):
+        executor = self._executor
+        self._executor = None
+        if executor is None:
+            return
+        if sys.version_info >= (3, 9):
+            executor.shutdown(wait=wait, cancel_futures=True)
+        else:
+            executor.shutdown(wait=wait)
+
+
+__all__ = ["EXECUTOR_KINDS", "ServiceExecutor", "invoke_service", ]
@@ -0,0 +1,35 @@
+from typing import *
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = dict()
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self._flights)
+
+    def reset_stats(self):
+        self.calls = 0
+        self.coalesced = 0
+
+    def _done(self, key: Hashable, task: asyncio.Future):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, key: Hashable, func: Callable[..., Awaitable], *args):
+        task = self._flights.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(func(*args))
+            task.add_done_callback(lambda done: self._done(key, done))
+            self._flights[key] = task
+            self.calls += 1
+        return await asyncio.shield(task)
+
+
+__all__ = ["SingleFlight", ]
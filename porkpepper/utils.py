@@ -1,7 +1,6 @@
 from typing import *
 from struct import pack
 import time
-import base58
 import hashlib
 
 
@@ -29,6 +28,7 @@ def create_base58_key(
         cipher=hashlib.blake2b,
         timestamp: bool = False,
 ) -> str:
+    import base58
     hash_cipher = HashCipher(salt=salt, cipher=cipher)
     hash_key = hash_cipher.digest(str(data))
     slice_key = base58.b58encode(hash_key)
@@ -3,15 +3,20 @@ import asyncio
 from collections import defaultdict
 import aiohttp
 from aiohttp import web
+from .result import Result
 from .websocket_session import WebsocketSession
+from .key_index import SortedKeyIndex
 
 
 class WebsocketApp(web.Application):
+    BROADCAST_TIMEOUT = 5.0
     def __init__(self, session_class=WebsocketSession, **kwargs):
         super(WebsocketApp, self).__init__(**kwargs)
         self._session_class = session_class
         self._session_dict: Dict[str, WebsocketSession] = dict()
         self._user_dict: Dict[str, Set[WebsocketSession]] = defaultdict(set)
+        self._session_index = SortedKeyIndex()
+        self._user_index = SortedKeyIndex()
 
     def all_sessions(self):
         return list(self._session_dict.values())
@@ -19,6 +24,18 @@ class WebsocketApp(web.Application):
     def all_users(self):
         return list(self._user_dict.keys())
 
+    def session_keys(self, pattern: Optional[str] = None) -> List[str]:
+        return self._session_index.keys(pattern)
+
+    def user_keys(self, pattern: Optional[str] = None) -> List[str]:
+        return self._user_index.keys(pattern)
+
+    def scan_sessions(self, cursor: int, count: int, pattern: Optional[str] = None) -> Tuple[int, List[str]]:
+        return self._session_index.scan(cursor, count, pattern)
+
+    def scan_users(self, cursor: int, count: int, pattern: Optional[str] = None) -> Tuple[int, List[str]]:
+        return self._user_index.scan(cursor, count, pattern)
+
     @property
     def sessions_count(self) -> int:
         return len(self._session_dict)
@@ -27,6 +44,48 @@ class WebsocketApp(web.Application):
     def users_count(self) -> int:
         return len(self._user_dict)
 
+    async def broadcast(
+            self,
+            message,
+            sessions: Optional[Iterable[WebsocketSession]] = None,
+            user: Optional[str] = None,
+            predicate: Optional[Callable[[WebsocketSession], bool]] = None,
+            timeout: Optional[float] = None,
+    ) -> Dict[str, int]:
+        if sessions is None:
+            sessions = self.get_user(user) if user is not None else self._session_dict.values()
+        targets = [
+            session for session in sessions
+            if session.socket is not None and (predicate is None or predicate(session))
+        ]
+        counts = dict(targets=len(targets), delivered=0, dropped=0, pending=0, skipped=0)
+        frames: Dict[Any, Result] = dict()
+        waiters: List[asyncio.Future] = list()
+        loop = asyncio.get_running_loop()
+        for session in targets:
+            encoder = session.codec if session.codec is not None else type(session).message_dumps
+            frame_result = frames.get(encoder)
+            if frame_result is None:
+                frame_result = frames[encoder] = session.encode_message(message)
+            if not frame_result.is_some:
+                counts["skipped"] += 1
+                continue
+            waiter = loop.create_future()
+            if session.enqueue_frame(frame_result.unwrap(), waiter):
+                waiters.append(waiter)
+            else:
+                counts["dropped"] += 1
+        timeout = self.BROADCAST_TIMEOUT if timeout is None else timeout
+        if waiters and timeout > 0:
+            await asyncio.wait(waiters, timeout=timeout)
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.cancel()
+                counts["pending"] += 1
+            else:
+                counts["delivered" if waiter.result() else "dropped"] += 1
+        return counts
+
     def get_session(self, session_id: str):
         return self._session_dict.get(session_id, None)
 
@@ -38,18 +97,24 @@ class WebsocketApp(web.Application):
             self._user_dict[user].remove(session)
             if not len(self._user_dict[user]):
                 self._user_dict.pop(user)
+                self._user_index.discard(user)
 
     def add_user(self, user, session):
         if user is not None:
+            if user not in self._user_dict:
+                self._user_index.add(user)
             self._user_dict[user].add(session)
 
     def remove_session(self, session_id):
         if session_id in self._session_dict:
             self._session_dict.pop(session_id)
+            self._session_index.discard(session_id)
             return True
         return False
 
     def add_session(self, session_id, session):
+        if session_id not in self._session_dict:
+            self._session_index.add(session_id)
         self._session_dict[session_id] = session
 
     def setup_session(self, session, ws):
@@ -67,19 +132,20 @@ class WebsocketApp(web.Application):
     async def handler(self, request):
         if not self._session_class:
             return
-        ws = web.WebSocketResponse()
+        ws = web.WebSocketResponse(protocols=self._session_class.protocols())
         await ws.prepare(request)
         session = self._session_class()
+        session.select_protocol(ws.ws_protocol)
         self.setup_session(session, ws)
         try:
             await session.prepare()
             while True:
                 read_timeout = session.read_timeout()
                 msg = await ws.receive(read_timeout)
-                if msg.type in (aiohttp.WSMsgType.TEXT, msg.type == aiohttp.WSMsgType.BINARY, ):
-                    message_result = session.message_loads(msg.data)
+                if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY, ):
+                    message_result = session.decode_message(msg.data)
                     if message_result.is_some:
-                        await session.request(message_result.unwrap())
+                        await session.dispatch(message_result.unwrap())
                 elif msg.type == aiohttp.WSMsgType.PING:
                     await ws.pong()
                 elif msg.type in (
@@ -91,6 +157,7 @@ class WebsocketApp(web.Application):
         except Exception as e:
             pass
         finally:
+            await session.cancel_requests()
             try:
                 await session.on_finish()
             except Exception as e:
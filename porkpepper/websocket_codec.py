@@ -0,0 +1,62 @@
+from typing import *
+import json
+
+
+class WebsocketCodec:
+    name: Optional[str] = None
+    binary = False
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        raise NotImplementedError
+
+    def dumps(self, o: Any) -> Union[str, bytes]:
+        raise NotImplementedError
+
+
+class JsonCodec(WebsocketCodec):
+    name = "json"
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, o: Any) -> str:
+        return json.dumps(o)
+
+
+class MsgpackCodec(WebsocketCodec):
+    name = "msgpack"
+    binary = True
+
+    def __init__(self):
+        import msgpack
+        self._packer = msgpack.Packer(use_bin_type=True)
+        self._unpackb = msgpack.unpackb
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        if isinstance(data, str):
+            raise TypeError("msgpack codec expects binary frames")
+        return self._unpackb(data, raw=False)
+
+    def dumps(self, o: Any) -> bytes:
+        return self._packer.pack(o)
+
+
+class CborCodec(WebsocketCodec):
+    name = "cbor"
+    binary = True
+
+    def __init__(self):
+        import cbor2
+        self._loads = cbor2.loads
+        self._dumps = cbor2.dumps
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        if isinstance(data, str):
+            raise TypeError("cbor codec expects binary frames")
+        return self._loads(data)
+
+    def dumps(self, o: Any) -> bytes:
+        return self._dumps(o)
+
+
+__all__ = ["WebsocketCodec", "JsonCodec", "MsgpackCodec", "CborCodec", ]
@@ -3,14 +3,57 @@ import time
 import json
 import random
 import string
+import struct
+import asyncio
+from collections import deque
 from aiohttp import WSCloseCode
 from aiohttp.web import WebSocketResponse
 from .result import Result
 from .utils import create_base58_key
 from .fifo_lock import FifoLock
+from .websocket_codec import WebsocketCodec
+
+
+BATCH_LENGTH = struct.Struct(">I")
+
+
+def frame_size(data: Union[str, bytes]) -> int:
+    if isinstance(data, str) and not data.isascii():
+        return len(data.encode("utf8"))
+    return len(data)
+
+
+def unpack_batch(data: bytes) -> List[bytes]:
+    frames = list()
+    view = memoryview(data)
+    offset = 0
+    while offset < len(data):
+        length, = BATCH_LENGTH.unpack_from(view, offset)
+        offset += BATCH_LENGTH.size
+        frames.append(bytes(view[offset:offset + length]))
+        offset += length
+    return frames
+
+
+def notify_waiter(waiter: Optional[asyncio.Future], delivered: bool):
+    if waiter is not None and not waiter.done():
+        waiter.set_result(delivered)
 
 
 class WebsocketSession:
+    OUTBOUND_POLICIES = ("drop_oldest", "drop_newest", "disconnect", )
+    OUTBOUND_MAX_MESSAGES: Optional[int] = None
+    OUTBOUND_MAX_BYTES: Optional[int] = None
+    OUTBOUND_POLICY = "drop_newest"
+    COALESCE_MODES = ("json", "binary", )
+    COALESCE: Optional[str] = None
+    COALESCE_WINDOW_US = 0
+    COALESCE_MAX_BYTES = 64 * 1024
+    DISPATCH_CONCURRENCY = 1
+    DISPATCH_ORDERED = False
+    CODEC: Optional[WebsocketCodec] = None
+    CODECS: Tuple[WebsocketCodec, ...] = ()
+
     def __init__(self):
         self.session_id = create_base58_key(''.join(random.choices(string.ascii_letters, k=12)), length=22, prefix="SS")
         self.create_timestamp = int(time.time() * 1000)
@@ -18,6 +61,21 @@ class WebsocketSession:
         self.socket: WebSocketResponse = None
         self.lock = FifoLock()
         self.app = None
+        self._outbound: Deque[Tuple[Union[str, bytes], int, Optional[asyncio.Future]]] = deque()
+        self._outbound_writer: Optional[asyncio.Task] = None
+        self.outbound_bytes = 0
+        self.outbound_sent = 0
+        self.outbound_dropped = 0
+        self.outbound_frames = 0
+        self.evicted = False
+        self.coalesce: Optional[str] = self.COALESCE
+        self.coalesce_window_us: int = self.COALESCE_WINDOW_US
+        self._requests: Set[asyncio.Task] = set()
+        self._request_slot: Optional[asyncio.Future] = None
+        self._channel_locks: Dict[Hashable, Tuple[FifoLock, int]] = dict()
+        self.requests_dispatched = 0
+        self.requests_paused = 0
+        self.codec: Optional[WebsocketCodec] = self.CODEC
 
     def read_timeout(self):
         return None
@@ -46,25 +104,254 @@ class WebsocketSession:
     async def request(self, message):
         pass
 
+    def message_channel(self, message) -> Optional[Hashable]:
+        return None
+
+    @property
+    def requests_in_flight(self) -> int:
+        return len(self._requests)
+
+    def inbound_stats(self) -> Dict[str, int]:
+        return dict(
+            requests_in_flight=len(self._requests),
+            requests_dispatched=self.requests_dispatched,
+            requests_paused=self.requests_paused,
+        )
+
+    async def dispatch(self, message):
+        self.requests_dispatched += 1
+        if self.DISPATCH_CONCURRENCY <= 1:
+            await self.request(message)
+            return
+        if len(self._requests) >= self.DISPATCH_CONCURRENCY:
+            self.requests_paused += 1
+            while len(self._requests) >= self.DISPATCH_CONCURRENCY:
+                self._request_slot = asyncio.get_running_loop().create_future()
+                await self._request_slot
+        task = asyncio.ensure_future(self._run_request(message))
+        self._requests.add(task)
+        task.add_done_callback(self._request_done)
+
+    def _request_done(self, task: asyncio.Task):
+        self._requests.discard(task)
+        slot = self._request_slot
+        if slot is not None and not slot.done():
+            slot.set_result(None)
+
+    def _channel_lock(self, channel: Optional[Hashable]) -> Optional[FifoLock]:
+        if channel is None:
+            return None
+        lock, count = self._channel_locks.get(channel, (None, 0, ))
+        if lock is None:
+            lock = FifoLock()
+        self._channel_locks[channel] = (lock, count + 1, )
+        return lock
+
+    def _release_channel(self, channel: Hashable):
+        lock, count = self._channel_locks[channel]
+        if count <= 1:
+            del self._channel_locks[channel]
+        else:
+            self._channel_locks[channel] = (lock, count - 1, )
+
+    async def _run_request(self, message):
+        channel = None
+        try:
+            key = self.message_channel(message)
+            if key is None and self.DISPATCH_ORDERED:
+                lock = self.lock
+            else:
+                lock = self._channel_lock(key)
+                channel = key
+            if lock is None:
+                await self.request(message)
+            else:
+                async with lock:
+                    await self.request(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.close()
+        finally:
+            if channel is not None:
+                self._release_channel(channel)
+
+    async def cancel_requests(self):
+        requests = list(self._requests)
+        for task in requests:
+            task.cancel()
+        if requests:
+            await asyncio.gather(*requests, return_exceptions=True)
+
     async def send(self, message):
         if self.socket is not None:
-            message_result = self.message_dumps(message)
+            message_result = self.encode_message(message)
             if message_result.is_some:
-                try:
-                    data = message_result.unwrap()
-                    if isinstance(data, str):
-                        await self.socket.send_str(data)
-                    else:
-                        await self.socket.send_bytes(data)
-                    return True
-                except Exception as e:
-                    await self.close()
-                    app = self.app
-                    if app is not None:
-                        app.cleanup_session(self)
-                    return False
+                return await self.send_frame(message_result.unwrap())
         return False
 
+    @classmethod
+    def protocols(cls) -> List[str]:
+        return [codec.name for codec in cls.CODECS if codec.name]
+
+    def select_protocol(self, protocol: Optional[str]):
+        for codec in self.CODECS:
+            if protocol is not None and codec.name == protocol:
+                self.codec = codec
+                return
+
+    def decode_message(self, data: Union[str, bytes]) -> Result[Any]:
+        codec = self.codec
+        if codec is None:
+            return self.message_loads(data)
+        try:
+            return Result(codec.loads(data))
+        except Exception as e:
+            return Result(e)
+
+    def encode_message(self, o) -> Result[Union[str, bytes]]:
+        codec = self.codec
+        if codec is None:
+            return self.message_dumps(o)
+        try:
+            return Result(codec.dumps(o))
+        except Exception as e:
+            return Result(e)
+
+    async def write_frame(self, data: Union[str, bytes]):
+        if isinstance(data, str):
+            await self.socket.send_str(data)
+        else:
+            await self.socket.send_bytes(data)
+
+    async def send_frame(self, data: Union[str, bytes]) -> bool:
+        return self.enqueue_frame(data)
+
+    @property
+    def outbound_queue_size(self) -> int:
+        return len(self._outbound)
+
+    def outbound_stats(self) -> Dict[str, int]:
+        return dict(
+            outbound_queue=len(self._outbound),
+            outbound_bytes=self.outbound_bytes,
+            outbound_sent=self.outbound_sent,
+            outbound_dropped=self.outbound_dropped,
+            outbound_frames=self.outbound_frames,
+        )
+
+    def _outbound_full(self, size: int) -> bool:
+        max_messages = self.OUTBOUND_MAX_MESSAGES
+        max_bytes = self.OUTBOUND_MAX_BYTES
+        return (
+            (max_messages is not None and len(self._outbound) + 1 > max_messages) or
+            (max_bytes is not None and self.outbound_bytes + size > max_bytes)
+        )
+
+    def enqueue_frame(self, data: Union[str, bytes], waiter: Optional[asyncio.Future] = None) -> bool:
+        if self.socket is None or self.evicted:
+            return False
+        size = frame_size(data)
+        if self.OUTBOUND_MAX_BYTES is not None and size > self.OUTBOUND_MAX_BYTES:
+            self.outbound_dropped += 1
+            return False
+        outbound = self._outbound
+        if self._outbound_full(size):
+            policy = self.OUTBOUND_POLICY
+            if policy == "drop_newest":
+                self.outbound_dropped += 1
+                return False
+            elif policy == "drop_oldest":
+                while outbound and self._outbound_full(size):
+                    _, dropped_size, dropped_waiter = outbound.popleft()
+                    self.outbound_bytes -= dropped_size
+                    self.outbound_dropped += 1
+                    notify_waiter(dropped_waiter, False)
+            else:
+                self.outbound_dropped += len(outbound) + 1
+                self.evict()
+                return False
+        outbound.append((data, size, waiter, ))
+        self.outbound_bytes += size
+        if self._outbound_writer is None:
+            self._outbound_writer = asyncio.ensure_future(self._write_outbound())
+        return True
+
+    async def _write_outbound(self):
+        outbound = self._outbound
+        batch = None
+        try:
+            if self.coalesce is not None:
+                window = self.coalesce_window_us
+                await asyncio.sleep(window / 1e6 if window > 0 else 0)
+            while outbound:
+                if self.coalesce is None:
+                    batch = [outbound.popleft()]
+                    self.outbound_bytes -= batch[0][1]
+                    await self.write_frame(batch[0][0])
+                else:
+                    batch = self._take_batch()
+                    await self.write_frame(self.pack_batch([data for data, _, _ in batch]))
+                self.outbound_sent += len(batch)
+                self.outbound_frames += 1
+                for _, _, waiter in batch:
+                    notify_waiter(waiter, True)
+                batch = None
+        except Exception as e:
+            await self.close()
+            app = self.app
+            if app is not None:
+                app.cleanup_session(self)
+            self.clear_outbound()
+        finally:
+            self._outbound_writer = None
+            for _, _, waiter in batch or ():
+                notify_waiter(waiter, False)
+
+    def _take_batch(self) -> List[Tuple[Union[str, bytes], int, Optional[asyncio.Future]]]:
+        outbound = self._outbound
+        batch = [outbound.popleft()]
+        size = batch[0][1]
+        max_bytes = self.COALESCE_MAX_BYTES
+        while outbound and size + outbound[0][1] <= max_bytes:
+            item = outbound.popleft()
+            size += item[1]
+            batch.append(item)
+        self.outbound_bytes -= size
+        return batch
+
+    def pack_batch(self, batch: List[Union[str, bytes]]) -> Union[str, bytes]:
+        codec = self.codec
+        if self.coalesce == "json" and (codec is None or not codec.binary):
+            return "[" + ",".join(data if isinstance(data, str) else data.decode("utf8") for data in batch) + "]"
+        packed = list()
+        for data in batch:
+            if isinstance(data, str):
+                data = data.encode("utf8")
+            packed.append(BATCH_LENGTH.pack(len(data)))
+            packed.append(data)
+        return b"".join(packed)
+
+    def clear_outbound(self):
+        outbound = self._outbound
+        while outbound:
+            notify_waiter(outbound.popleft()[2], False)
+        self.outbound_bytes = 0
+
+    def evict(self):
+        self.evicted = True
+        self.clear_outbound()
+        writer = self._outbound_writer
+        if writer is not None:
+            writer.cancel()
+        asyncio.ensure_future(self._evict())
+
+    async def _evict(self):
+        await self.close(b'Slow consumer')
+        app = self.app
+        if app is not None:
+            app.cleanup_session(self)
+
     async def close(self, message: bytes = b'Server shutdown'):
         if self.socket is not None:
             try:
@@ -87,4 +374,4 @@ class WebsocketSession:
             return Result(e)
 
 
-__all__ = ["WebsocketSession", ]
+__all__ = ["WebsocketSession", "unpack_batch", ]
@@ -0,0 +1,125 @@
+from typing import *
+import multiprocessing
+from .redis_stats import CommandStats, LatencyHistogram
+
+
+STATS_FIELDS = (
+    "connected_clients",
+    "total_connections_received",
+    "total_commands_processed",
+    "instantaneous_ops_per_sec",
+    "total_net_input_bytes",
+    "total_net_output_bytes",
+    "instantaneous_input_kbps",
+    "instantaneous_output_kbps",
+)
+FLOAT_FIELDS = ("instantaneous_input_kbps", "instantaneous_output_kbps", )
+COUNTER_FIELDS = (
+    "total_connections_received",
+    "total_commands_processed",
+    "total_net_input_bytes",
+    "total_net_output_bytes",
+)
+
+
+class WorkerStatsTable:
+    def __init__(self, workers: int, commands: Iterable[bytes], context=None):
+        context = context or multiprocessing.get_context("fork")
+        self.workers = workers
+        self.commands: List[bytes] = list(commands)
+        self._command_index = {name: index for index, name in enumerate(self.commands)}
+        # calls, nsec, failed_calls and the latency histogram buckets of each command
+        self._slot = 3 + LatencyHistogram.BUCKETS
+        self._width = 1 + len(STATS_FIELDS) + self._slot * len(self.commands)
+        # one row per worker, a retained row holding the counters of dead workers, and the reset epoch
+        self._array = context.RawArray('d', (workers + 1) * self._width + 1)
+
+    def _offset(self, worker_id: int) -> int:
+        return worker_id * self._width
+
+    def pid(self, worker_id: int) -> int:
+        return int(self._array[self._offset(worker_id)])
+
+    @property
+    def epoch(self) -> int:
+        return int(self._array[-1])
+
+    def clear(self, worker_id: int):
+        offset = self._offset(worker_id)
+        self._array[offset:offset + self._width] = [0.0] * self._width
+
+    def retire(self, worker_id: int):
+        array = self._array
+        offset = self._offset(worker_id) + 1
+        retained = self._offset(self.workers) + 1
+        for index, field in enumerate(STATS_FIELDS):
+            if field in COUNTER_FIELDS:
+                array[retained + index] += array[offset + index]
+        offset += len(STATS_FIELDS)
+        retained += len(STATS_FIELDS)
+        for index in range(self._slot * len(self.commands)):
+            array[retained + index] += array[offset + index]
+        self.clear(worker_id)
+
+    def reset(self) -> int:
+        array = self._array
+        epoch = array[-1] + 1
+        array[:] = [0.0] * len(array)
+        array[-1] = epoch
+        return int(epoch)
+
+    def publish(self, worker_id: int, pid: int, stats: Dict[str, Union[int, float]], command_stats: Dict[bytes, CommandStats]):
+        array = self._array
+        offset = self._offset(worker_id)
+        array[offset] = pid
+        offset += 1
+        for index, field in enumerate(STATS_FIELDS):
+            array[offset + index] = stats[field]
+        offset += len(STATS_FIELDS)
+        command_index = self._command_index
+        slot = self._slot
+        for name, command in command_stats.items():
+            index = command_index.get(name, None)
+            if index is None:
+                continue
+            position = offset + index * slot
+            array[position] = command.calls
+            array[position + 1] = command.nsec
+            array[position + 2] = command.failed_calls
+            array[position + 3:position + slot] = command.histogram.counts
+
+    def aggregate(self, exclude: Optional[int] = None) -> Tuple[Dict[str, Union[int, float]], Dict[bytes, CommandStats]]:
+        array = self._array
+        stats = dict.fromkeys(STATS_FIELDS, 0)
+        command_stats: Dict[bytes, CommandStats] = dict()
+        slot = self._slot
+        for worker_id in range(self.workers + 1):
+            if worker_id == exclude:
+                continue
+            offset = self._offset(worker_id) + 1
+            for index, field in enumerate(STATS_FIELDS):
+                stats[field] += array[offset + index]
+            offset += len(STATS_FIELDS)
+            for index, name in enumerate(self.commands):
+                position = offset + index * slot
+                calls = int(array[position])
+                if not calls:
+                    continue
+                command = command_stats.get(name)
+                if command is None:
+                    command = command_stats[name] = CommandStats()
+                command.calls += calls
+                command.nsec += int(array[position + 1])
+                command.failed_calls += int(array[position + 2])
+                histogram = command.histogram
+                counts = histogram.counts
+                for bucket, bucket_count in enumerate(array[position + 3:position + slot]):
+                    counts[bucket] += int(bucket_count)
+                histogram.total += calls
+                histogram.nsec += int(array[position + 1])
+        for field in STATS_FIELDS:
+            stats[field] = round(stats[field], 2) if field in FLOAT_FIELDS else int(stats[field])
+        return stats, command_stats
+
+
+__all__ = ["WorkerStatsTable", "STATS_FIELDS", "COUNTER_FIELDS", ]
@@ -6,10 +6,15 @@ test_deps = [
     'python-coveralls',
     'pytest-cov',
     'codecov',
+    'aioredis<2',
+    'msgpack',
+    'cbor2',
 ]
 
 extras = {
     'test': test_deps,
+    'msgpack': ['msgpack'],
+    'cbor': ['cbor2'],
 }
 
 setup(
@@ -26,13 +31,11 @@ setup(
     ],
     python_requires='>=3.7.0',
     install_requires=[
-        'Jinja2',
         'base58',
         'aiotools',
         'aiohttp',
         'typing',
         'pytest',
-        'aioredis',
     ],
     tests_require=test_deps,
     extras_require=extras,
@@ -0,0 +1,52 @@
+import time
+import asyncio
+import aioredis
+from porkpepper.design import *
+from porkpepper.client import PorkPepperClient
+
+
+REQUESTS = 20000
+CONCURRENCY = 200
+PORT = 6391
+
+
+class EchoService:
+    @classmethod
+    @service("echo", output=True)
+    async def echo(cls, message):
+        return message
+
+
+async def run(call):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(i):
+        async with semaphore:
+            await call(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(REQUESTS)])
+    return time.perf_counter() - start
+
+
+async def main():
+    node = RedisServiceNode()
+    await node.start(service_map={0: EchoService}, redis_host="127.0.0.1", redis_port=PORT)
+    redis = await aioredis.create_redis(f"redis://127.0.0.1:{PORT}/0")
+    aioredis_time = await run(lambda i: redis.getset("echo", '{"i": %d}' % i))
+    redis.close()
+    await redis.wait_closed()
+    client = PorkPepperClient(port=PORT)
+    execute_time = await run(lambda i: client.execute(b"GETSET", "echo", '{"i": %d}' % i))
+    call_time = await run(lambda i: client.call(0, "echo", dict(i=i)))
+    connections_count = client.connections_count
+    await client.close()
+    await asyncio.sleep(0.1)
+    await node.stop()
+    print(f"aioredis getset     {REQUESTS / aioredis_time:>10.0f} ops/sec")
+    print(f"client execute      {REQUESTS / execute_time:>10.0f} ops/sec  speedup={aioredis_time / execute_time:.2f}x")
+    print(f"client call(json)   {REQUESTS / call_time:>10.0f} ops/sec  connections={connections_count}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
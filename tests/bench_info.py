@@ -0,0 +1,35 @@
+import time
+from porkpepper.design import ServiceBasedRedisServer
+
+
+ROUNDS = 20000
+
+
+def measure(func):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func()
+    return time.perf_counter() - start
+
+
+def main():
+    server = ServiceBasedRedisServer()
+    server.port = 6379
+    server.MAX_DB_COUNT = 16
+    cases = [
+        ("default", lambda: server.render_info()),
+        ("server", lambda: server.render_info("server")),
+        ("clients", lambda: server.render_info("clients")),
+        ("stats", lambda: server.render_info("stats")),
+        ("keyspace", lambda: server.render_info("keyspace")),
+    ]
+    default_time = None
+    for name, func in cases:
+        section_time = measure(func)
+        if default_time is None:
+            default_time = section_time
+        print(f"{name:<10} {section_time / ROUNDS * 1e6:>8.2f} us  ratio={section_time / default_time:.2f}")
+
+
+if __name__ == '__main__':
+    main()
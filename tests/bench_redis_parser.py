@@ -0,0 +1,130 @@
+import time
+import asyncio
+from typing import List
+from porkpepper.error import RedisProtocolFormatError
+from porkpepper.result import Result
+from porkpepper.redis_server import RedisServer
+from porkpepper.redis_parser import RedisRequestParser
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def encode_command(*args: bytes) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode("utf8")]
+    for arg in args:
+        parts.append(f"${len(arg)}\r\n".encode("utf8"))
+        parts.append(arg)
+        parts.append(b"\r\n")
+    return b"".join(parts)
+
+
+def chunks(data: bytes):
+    return [data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+
+
+# Frozen copy of the readline based request reader that RedisTaskNode.create
+# used before the incremental parser, kept as the baseline for this bench.
+def legacy_get_count(line: bytes) -> Result[int]:
+    if isinstance(line, bytes):
+        buffer = bytearray(line)
+        if buffer.startswith(b"*") and buffer.endswith(b"\r\n"):
+            value_binary = buffer[1:-2]
+            if value_binary.isdigit():
+                return Result(int(value_binary))
+    return Result(RedisProtocolFormatError())
+
+
+def legacy_get_binary_size(line: bytes) -> Result[int]:
+    if isinstance(line, bytes):
+        buffer = bytearray(line)
+        if buffer.startswith(b"$") and buffer.endswith(b"\r\n"):
+            value_binary = buffer[1:-2]
+            if value_binary.isdigit():
+                return Result(int(value_binary))
+    return Result(RedisProtocolFormatError())
+
+
+async def legacy_readline(reader, server):
+    line = await reader.readline()
+    if line:
+        server.total_net_input_bytes += len(line)
+    return line
+
+
+async def legacy_readexactly(reader, read_size, server):
+    line = await reader.readexactly(read_size)
+    if line:
+        server.total_net_input_bytes += read_size
+    return line
+
+
+async def legacy_read_command(reader, server) -> Result[List[bytes]]:
+    idle_timeout = server.IDLE_TIMEOUT
+    line = await asyncio.wait_for(legacy_readline(reader, server), timeout=idle_timeout)
+    if not line:
+        return Result(EOFError())
+    args_count_result = legacy_get_count(line)
+    if args_count_result.is_error:
+        return Result(args_count_result.error)
+    commands = list()
+    for _ in range(args_count_result.unwrap()):
+        data = await asyncio.wait_for(legacy_readline(reader, server), timeout=idle_timeout)
+        binary_size_result = legacy_get_binary_size(data)
+        if binary_size_result.is_error:
+            return Result(binary_size_result.error)
+        binary_size = binary_size_result.unwrap()
+        data = await asyncio.wait_for(legacy_readexactly(reader, binary_size + 2, server), timeout=idle_timeout)
+        commands.append(data[:-2])
+    return Result(commands)
+
+
+def bench_buffered(data_chunks, count):
+    parser = RedisRequestParser()
+    parsed = 0
+    start = time.perf_counter()
+    for chunk in data_chunks:
+        size = len(chunk)
+        buffer = parser.get_buffer(size)
+        buffer[:size] = chunk
+        parser.buffer_updated(size)
+        parsed += len(parser.parse().unwrap())
+    elapsed = time.perf_counter() - start
+    assert parsed == count
+    return elapsed
+
+
+async def bench_readline(data_chunks, count):
+    server = RedisServer()
+    reader = asyncio.StreamReader(limit=2 ** 31)
+    for chunk in data_chunks:
+        reader.feed_data(chunk)
+    reader.feed_eof()
+    parsed = 0
+    start = time.perf_counter()
+    while True:
+        commands_result = await legacy_read_command(reader, server)
+        if commands_result.is_error:
+            break
+        parsed += 1
+    elapsed = time.perf_counter() - start
+    assert parsed == count
+    return elapsed
+
+
+def main():
+    cases = [
+        ("small", encode_command(b"GETSET", b"add", b'{"x": 1, "y": 2}'), 100000),
+        ("large", encode_command(b"GETSET", b"add", b"x" * 256 * 1024), 500),
+    ]
+    for name, command, count in cases:
+        data_chunks = chunks(command * count)
+        buffered = bench_buffered(data_chunks, count)
+        readline = asyncio.run(bench_readline(data_chunks, count))
+        print(f"{name:<8} commands={count:<8} "
+              f"readline={count / readline:>12.0f} ops/s  buffered={count / buffered:>12.0f} ops/s  "
+              f"speedup={readline / buffered:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import time
+from porkpepper.result import Result
+from porkpepper.redis_protocol import RedisProtocol
+
+
+ROUNDS = 200000
+
+
+def legacy_set_ok(out, reason="OK"):
+    out.append(Result(f"+{reason}\r\n".encode("utf8")).unwrap())
+
+
+def legacy_set_nil(out):
+    out.append(Result("$-1\r\n".encode("utf8")).unwrap())
+
+
+def legacy_set_integer(out, n):
+    out.append(Result(f":{n}\r\n".encode("utf8")).unwrap())
+
+
+def legacy_set_count(out, n):
+    out.append(Result(f"*{n}\r\n".encode("utf8")).unwrap())
+
+
+def legacy_set_binary(out, b):
+    if isinstance(b, str):
+        arg_buffer = b.encode("utf8")
+    elif isinstance(b, bytes):
+        arg_buffer = b
+    else:
+        arg_buffer = str(b).encode("utf8")
+    buffer = bytearray(f"${len(arg_buffer)}\r\n".encode("utf8"))
+    buffer.extend(arg_buffer)
+    buffer.extend([13, 10, ])
+    out.append(Result(buffer).unwrap())
+
+
+def legacy_scan_header(out):
+    legacy_set_count(out, 2)
+    legacy_set_binary(out, 0)
+
+
+def cached_scan_header(out):
+    out.append(RedisProtocol.count_header(2))
+    out.extend(RedisProtocol.bulk_parts(0))
+
+
+def measure(func):
+    out = list()
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        func(out)
+        if len(out) > 1024:
+            out.clear()
+    return time.perf_counter() - start
+
+
+def main():
+    small_payload = b'{"result": 3}'
+    large_payload = b"x" * 64 * 1024
+    cases = [
+        ("ok", lambda out: legacy_set_ok(out), lambda out: out.append(RedisProtocol.OK)),
+        ("pong", lambda out: legacy_set_ok(out, "PONG"), lambda out: out.append(RedisProtocol.status_reply("PONG"))),
+        ("nil", legacy_set_nil, lambda out: out.append(RedisProtocol.NIL)),
+        ("integer", lambda out: legacy_set_integer(out, 1), lambda out: out.append(RedisProtocol.integer_reply(1))),
+        ("scan header", legacy_scan_header, cached_scan_header),
+        ("bulk small", lambda out: legacy_set_binary(out, small_payload),
+         lambda out: out.extend(RedisProtocol.bulk_parts(small_payload))),
+        ("bulk 64k", lambda out: legacy_set_binary(out, large_payload),
+         lambda out: out.extend(RedisProtocol.bulk_parts(large_payload))),
+    ]
+    for name, legacy, cached in cases:
+        legacy_time = measure(legacy)
+        cached_time = measure(cached)
+        print(f"{name:<12} legacy={legacy_time / ROUNDS * 1e9:>9.1f} ns  "
+              f"cached={cached_time / ROUNDS * 1e9:>9.1f} ns  speedup={legacy_time / cached_time:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
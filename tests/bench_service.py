@@ -0,0 +1,121 @@
+import json
+import time
+import asyncio
+from porkpepper.design import RedisServiceNode, service
+from porkpepper.redis_session import RedisSession
+from porkpepper.result import Result
+from porkpepper.error import DatabaseNotFound, KeyNotFound, WrongCommand
+
+
+ROUNDS = 100000
+
+
+class BenchService:
+    @classmethod
+    @service("echo", output=True, description="echo", meta=dict(group="bench"))
+    async def echo(cls, message):
+        return message
+
+    @service("add", output=True)
+    async def add(self, x, y, **kwargs):
+        return x + y
+
+
+class RawService:
+    LOADS = staticmethod(lambda value: value)
+    DUMPS = staticmethod(lambda value: value)
+
+    @classmethod
+    @service("echo", output=True)
+    async def echo(cls, message):
+        return message
+
+
+def legacy_service_map(server):
+    legacy = dict()
+    for db, current_service in server.SERVICE_MAP.items():
+        legacy[db] = dict(
+            loads=current_service["loads"],
+            dumps=current_service["dumps"],
+            map={key: dict(handler=entry.handler, args=entry.arguments) for key, entry in current_service["map"].items()},
+        )
+    return legacy
+
+
+async def legacy_getset(server, service_map, session, key, value):
+    if session.current_db < 0 or session.current_db >= server.MAX_DB_COUNT:
+        return Result(DatabaseNotFound())
+    current_service = service_map.get(session.current_db, None)
+    if not current_service:
+        return Result(DatabaseNotFound())
+    service_dict = current_service["map"].get(key, None)
+    if not service_dict:
+        return Result(KeyNotFound())
+    handler = service_dict["handler"]
+    service_arguments = service_dict["args"]
+    loads = current_service["loads"]
+    dumps = current_service["dumps"]
+    if not service_arguments.get("output", False):
+        return Result(WrongCommand())
+    try:
+        signature = service_arguments["signature"]
+        message = loads(value)
+        if "kwargs" in signature.parameters:
+            result = await handler(**message)
+        else:
+            result = await handler(message=message)
+        return Result(dumps(result))
+    except Exception as e:
+        return Result(e)
+
+
+async def legacy_get(server, service_map, session, key):
+    current_service = service_map.get(session.current_db, None)
+    service_arguments = current_service["map"][key]["args"]
+    return Result(json.dumps({
+        "type": "api",
+        "key": service_arguments["key"],
+        "output": service_arguments["output"],
+        "signature": str(service_arguments["signature"]),
+        "description": service_arguments["description"],
+        "meta": service_arguments["meta"],
+    }))
+
+
+async def measure(func):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        await func()
+    return time.perf_counter() - start
+
+
+async def main():
+    node = RedisServiceNode()
+    node.update_service(0, BenchService())
+    node.update_service(1, RawService)
+    server = node._redis_server
+    legacy = legacy_service_map(server)
+    session = RedisSession()
+    raw_session = RedisSession()
+    raw_session.current_db = 1
+    cases = [
+        ("dispatch only", lambda: legacy_getset(server, legacy, raw_session, "echo", b'{"x": 1}'),
+         lambda: server.getset(raw_session, "echo", b'{"x": 1}')),
+        ("getset message", lambda: legacy_getset(server, legacy, session, "echo", b'{"x": 1}'),
+         lambda: server.getset(session, "echo", b'{"x": 1}')),
+        ("getset kwargs", lambda: legacy_getset(server, legacy, session, "add", b'{"x": 1, "y": 2}'),
+         lambda: server.getset(session, "add", b'{"x": 1, "y": 2}')),
+        ("get metadata", lambda: legacy_get(server, legacy, session, "echo"),
+         lambda: server.get(session, "echo")),
+    ]
+    for name, legacy_func, compiled_func in cases:
+        legacy_time = await measure(legacy_func)
+        compiled_time = await measure(compiled_func)
+        print(
+            f"{name:<16} legacy={legacy_time / ROUNDS * 1e6:>6.2f} us  "
+            f"compiled={compiled_time / ROUNDS * 1e6:>6.2f} us  speedup={legacy_time / compiled_time:.2f}x"
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
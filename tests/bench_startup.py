@@ -0,0 +1,67 @@
+import sys
+import json
+import subprocess
+
+
+ROUNDS = 5
+
+PROBE = """
+import sys, json, time, asyncio, resource
+start = time.perf_counter()
+from porkpepper import {name}
+import_time = time.perf_counter() - start
+
+
+class Service:
+    pass
+
+
+async def main():
+    start = time.perf_counter()
+    node = {factory}
+    await node.start({start_kwargs})
+    start_time = time.perf_counter() - start
+    await node.stop()
+    return start_time
+
+
+start_time = asyncio.run(main())
+print(json.dumps(dict(
+    import_time=import_time,
+    start_time=start_time,
+    rss_kb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    aiohttp="aiohttp" in sys.modules,
+)))
+"""
+
+CASES = [
+    ("service", "RedisServiceNode", "RedisServiceNode()", "service_map={0: Service}, redis_port=6392"),
+    ("service+metrics", "RedisServiceNode", "RedisServiceNode(metrics_path='/metrics')",
+     "service_map={0: Service}, redis_port=6392, host='127.0.0.1', port=9192"),
+    ("websocket", "WebsocketNode, WebsocketSession", "WebsocketNode(WebsocketSession, '/ws')",
+     "redis_port=6392, host='127.0.0.1', port=9192"),
+]
+
+
+def probe(name, factory, start_kwargs):
+    code = PROBE.format(name=name, factory=factory, start_kwargs=start_kwargs)
+    return json.loads(subprocess.check_output([sys.executable, "-c", code]))
+
+
+def main():
+    baseline = json.loads(subprocess.check_output([
+        sys.executable, "-c",
+        "import json, resource; print(json.dumps(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))",
+    ]))
+    print(f"{'python':<16} rss={baseline:>7d} KB")
+    for label, name, factory, start_kwargs in CASES:
+        samples = [probe(name, factory, start_kwargs) for _ in range(ROUNDS)]
+        import_time = min(sample["import_time"] for sample in samples)
+        start_time = min(sample["start_time"] for sample in samples)
+        rss_kb = min(sample["rss_kb"] for sample in samples)
+        print(f"{label:<16} rss={rss_kb:>7d} KB  import={import_time * 1000:>7.2f} ms  "
+              f"start={start_time * 1000:>7.2f} ms  aiohttp={samples[0]['aiohttp']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+import pytest
+from porkpepper.bench import *
+
+
+def test_percentile():
+    values = [i / 1000 for i in range(1, 1001)]
+    assert percentile(values, 0.5) == 0.5
+    assert percentile(values, 0.99) == 0.99
+    assert percentile(values, 0.999) == 0.999
+    assert percentile(list(), 0.5) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_run_benchmark():
+    options = parse_args([
+        "--requests", "200",
+        "--clients", "4",
+        "--pipeline", "4",
+        "--sessions", "4",
+        "--keys", "100",
+    ])
+    report = await run_benchmark(options)
+    results = {result["scenario"]: result for result in report["results"]}
+    assert list(results) == SCENARIOS
+    for scenario in SCENARIOS:
+        result = results[scenario]
+        assert result["errors"] == 0
+        assert result["ops_per_sec"] > 0
+        assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"] <= result["latency_ms"]["p999"]
+    assert results["service_getset"]["operations"] == 200
+    assert results["websocket_set"]["delivered"] == 200
+    assert results["fanout"]["sessions"] == 4
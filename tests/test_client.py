@@ -0,0 +1,144 @@
+import asyncio
+import pytest
+import porkpepper
+from porkpepper.design import *
+from porkpepper.error import ReplyError
+from porkpepper.client import *
+from porkpepper.client import ClientConnection
+
+
+class CalcService:
+    @classmethod
+    @service("add", output=True)
+    async def add(cls, message):
+        await asyncio.sleep(message.get("delay", 0))
+        return dict(result=message["x"] + message["y"])
+
+    @classmethod
+    @service("notify")
+    async def notify(cls, message):
+        CalcService.NOTIFIED.append(message)
+
+    NOTIFIED = list()
+
+
+class AuthRedisServer(ServiceBasedRedisServer):
+    ENABLE_AUTH = True
+
+    async def auth(self, session, password: bytes):
+        return porkpepper.Result(password == b"123456")
+
+
+def test_reply_parser():
+    parser = RedisReplyParser()
+    data = b"+OK\r\n-ERR x\r\n:12\r\n$-1\r\n$3\r\nabc\r\n*2\r\n$1\r\n0\r\n*1\r\n$1\r\nk\r\n"
+    replies = list()
+    for i in range(len(data)):
+        parser.feed(data[i:i + 1])
+        reply = parser.gets()
+        while reply is not porkpepper.client.NOT_ENOUGH_DATA:
+            replies.append(reply)
+            reply = parser.gets()
+    assert replies[0] == "OK"
+    assert isinstance(replies[1], ReplyError) and replies[1].reply == "ERR x"
+    assert replies[2:] == [12, None, b"abc", [b"0", [b"k"]]]
+
+
+def test_parse_info():
+    info = parse_info("# Server\r\nredis_version:3.0.0\r\n\r\n# Keyspace\r\ndb0:keys=1,expires=0,avg_ttl=0\r\n")
+    assert info["server"]["redis_version"] == "3.0.0"
+    assert info["keyspace"]["db0"]["keys"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_client():
+    node = RedisServiceNode()
+    await node.start(service_map={0: CalcService, 1: CalcService}, redis_host="127.0.0.1", redis_port=6379)
+    client = PorkPepperClient.from_url("redis://127.0.0.1:6379/0", max_connections=2)
+    result = await client.call(1, "add", dict(x=1, y=2))
+    assert result.unwrap() == dict(result=3)
+    results = await asyncio.gather(*[client.call(i % 2, "add", dict(x=i, y=1)) for i in range(200)])
+    assert [result.unwrap() for result in results] == [dict(result=i + 1) for i in range(200)]
+    assert client.connections_count <= 2
+    result = await client.call(0, "missing", dict())
+    assert result.is_error
+    result = await client.call(5, "add", dict(x=1, y=2))
+    assert result.is_error
+    result = await client.call(0, "add", dict(x=1, y=2, delay=0.5), timeout=0.1)
+    assert isinstance(result.error, asyncio.TimeoutError)
+    result = await client.call(0, "add", dict(x=2, y=2))
+    assert result.unwrap() == dict(result=4)
+    assert (await client.fire(0, "notify", dict(a=1))).unwrap()
+    assert CalcService.NOTIFIED == [dict(a=1)]
+    info = (await client.info()).unwrap()
+    assert info["server"]["porkpepper_mode"] == "service"
+    await client.close()
+    await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_client_select_failure():
+    node = RedisServiceNode()
+    await node.start(service_map={0: CalcService, 1: CalcService}, redis_host="127.0.0.1", redis_port=6379)
+    client = PorkPepperClient.from_url("redis://127.0.0.1:6379/0", max_connections=1)
+    assert (await client.call(1, "add", dict(x=1, y=2))).unwrap() == dict(result=3)
+    results = await asyncio.gather(client.call(5, "add", dict(x=1, y=2)), client.call(5, "add", dict(x=1, y=2)))
+    assert all(result.is_error for result in results)
+    assert (await client.call(5, "add", dict(x=1, y=2))).is_error
+    assert (await client.call(1, "add", dict(x=2, y=2))).unwrap() == dict(result=4)
+    await client.close()
+    await node.stop()
+
+
+class AbortTransport:
+    aborted = False
+
+    def abort(self):
+        self.aborted = True
+
+
+@pytest.mark.asyncio
+async def test_client_unexpected_reply():
+    connection = ClientConnection()
+    transport = AbortTransport()
+    connection.connection_made(transport)
+    connection.data_received(b"+OK\r\n")
+    assert transport.aborted
+
+
+@pytest.mark.asyncio
+async def test_client_auth():
+    node = RedisServiceNode(redis_server=AuthRedisServer)
+    await node.start(service_map={0: CalcService}, redis_host="127.0.0.1", redis_port=6379)
+    client = PorkPepperClient(password="123")
+    result = await client.call(0, "add", dict(x=1, y=2))
+    assert isinstance(result.error, ReplyError)
+    client = PorkPepperClient(password="123456")
+    result = await client.call(0, "add", dict(x=1, y=2))
+    assert result.unwrap() == dict(result=3)
+    await client.close()
+    await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_client_connect_timeout():
+    accepted = list()
+
+    async def silent(reader, writer):
+        accepted.append(writer)
+
+    server = await asyncio.start_server(silent, "127.0.0.1", 6379)
+    client = PorkPepperClient(password="123456", max_connections=1, timeout=0.2)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    result = await client.call(0, "add", dict(x=1, y=2))
+    assert isinstance(result.error, asyncio.TimeoutError)
+    result = await client.call(0, "add", dict(x=1, y=2), timeout=0.1)
+    assert isinstance(result.error, asyncio.TimeoutError)
+    assert loop.time() - start < 1
+    assert not client._connections and client._connecting == 0
+    await client.close()
+    for writer in accepted:
+        writer.close()
+    server.close()
+    await server.wait_closed()
@@ -0,0 +1,110 @@
+import random
+import pytest
+from porkpepper.key_index import *
+
+
+def test_sorted_key_index():
+    keys = [f"key{i:05d}" for i in range(5000)]
+    shuffled = list(keys)
+    random.shuffle(shuffled)
+    index = SortedKeyIndex(shuffled)
+    assert len(index) == 5000
+    assert list(index) == keys
+    index.add("key00000")
+    assert len(index) == 5000
+    for key in keys[::2]:
+        index.discard(key)
+    index.discard("missing")
+    assert len(index) == 2500
+    assert list(index) == keys[1::2]
+    assert "key00001" in index and "key00000" not in index
+    assert list(index.irange("key04995")) == ["key04997", "key04999"]
+    assert list(index.irange("key09999")) == []
+
+
+def test_cursor():
+    index = SortedKeyIndex(["SS" + "x" * 40 + str(i) for i in range(10)])
+    index.MAX_CURSORS = 2
+    assert index.load_cursor(0) is None
+    cursor, batch = index.scan(0, 3)
+    assert 0 < cursor <= CURSOR_LIMIT and len(batch) == 3
+    assert index.scan(cursor, 3)[1] == index.scan(cursor, 3)[1]
+    with pytest.raises(ValueError):
+        index.scan(12345, 3)
+    first, second = index.save_cursor("a"), index.save_cursor("b")
+    assert index.load_cursor(second) == "b"
+    index.save_cursor("c")
+    assert len(index._cursors) == 2
+    with pytest.raises(ValueError):
+        index.load_cursor(first)
+    index._last_cursor = CURSOR_LIMIT
+    assert index.save_cursor("d") == 1
+
+
+def test_scan_with_mutation():
+    keys = [f"key{i:05d}" for i in range(1000)]
+    index = SortedKeyIndex(keys)
+    cursor = 0
+    seen = list()
+    removed = set(keys[500:600])
+    while True:
+        cursor, batch = index.scan(cursor, 100)
+        assert len(batch) <= 100
+        seen.extend(batch)
+        if len(seen) == 300:
+            for key in removed:
+                index.discard(key)
+            index.add("key00000x")
+            index.add("key99999")
+        if cursor == 0:
+            break
+    assert len(seen) == len(set(seen))
+    assert set(keys) - removed <= set(seen)
+    assert "key99999" in seen
+    cursor, batch = index.scan(0, 100, "*7")
+    assert cursor != 0 and all(key.endswith("7") for key in batch)
+
+
+def test_glob_pattern():
+    cases = [
+        ("h?llo", "hello", True),
+        ("h?llo", "hllo", False),
+        ("h*llo", "hllo", True),
+        ("h*llo", "heeeello", True),
+        ("h[ae]llo", "hallo", True),
+        ("h[ae]llo", "hillo", False),
+        ("h[^e]llo", "hallo", True),
+        ("h[^e]llo", "hello", False),
+        ("h[a-b]llo", "hbllo", True),
+        ("h[a-b]llo", "hcllo", False),
+        ("h\\*llo", "h*llo", True),
+        ("h\\*llo", "hello", False),
+        ("a.b", "a.b", True),
+        ("a.b", "axb", False),
+        ("*", "", True),
+        ("tenant42:*", "tenant42:x", True),
+        ("tenant42:*", "tenant4:x", False),
+    ]
+    for pattern, key, expected in cases:
+        assert compile_pattern(pattern).match(key) == expected, (pattern, key)
+    assert compile_pattern("tenant42:*").prefix == "tenant42:"
+    assert compile_pattern("SS4f*").prefix == "SS4f"
+    assert compile_pattern("*abc").prefix == ""
+    assert compile_pattern("abc").literal
+    assert compile_pattern("tenant42:*") is compile_pattern("tenant42:*")
+
+
+def test_prefix_scan():
+    keys = [f"tenant{i}:{j:03d}" for i in range(100) for j in range(50)]
+    index = SortedKeyIndex(keys)
+    expected = [key for key in keys if key.startswith("tenant42:")]
+    assert index.keys("tenant42:*") == sorted(expected)
+    assert index.keys("tenant42:001") == ["tenant42:001"]
+    assert index.keys("tenant42:999") == []
+    cursor, batch = index.scan(0, 60, "tenant42:*")
+    assert cursor == 0 and batch == sorted(expected)
+    cursor, batch = index.scan(0, 20, "tenant42:*")
+    assert cursor != 0 and len(batch) == 20
+    cursor, rest = index.scan(cursor, 100, "tenant42:*")
+    assert cursor == 0 and batch + rest == sorted(expected)
+    assert index.keys("tenant4?:00[0-1]") == sorted(f"tenant4{i}:00{j}" for i in range(10) for j in range(2))
@@ -0,0 +1,49 @@
+import sys
+import json
+import subprocess
+
+
+def run_python(code):
+    output = subprocess.check_output([sys.executable, "-c", code])
+    return json.loads(output)
+
+
+def test_lazy_import():
+    modules = run_python("""
+import sys, json
+import porkpepper
+before = sorted(name for name in ("aiohttp", "base58", "jinja2", "aioredis") if name in sys.modules)
+from porkpepper import RedisServiceNode, Result, KeyNotFound
+after = sorted(name for name in ("aiohttp", "base58", "jinja2", "aioredis") if name in sys.modules)
+print(json.dumps(dict(before=before, after=after)))
+""")
+    assert modules == dict(before=[], after=[])
+
+
+def test_service_node_without_aiohttp():
+    result = run_python("""
+import sys, json, asyncio
+from porkpepper import RedisServiceNode, PorkPepperClient, service
+
+
+class Service:
+    @classmethod
+    @service("add", output=True)
+    async def add(cls, message):
+        return message["x"] + message["y"]
+
+
+async def main():
+    node = RedisServiceNode()
+    await node.start(service_map={0: Service}, redis_host="127.0.0.1", redis_port=6379)
+    client = PorkPepperClient()
+    result = await client.call(0, "add", dict(x=1, y=2))
+    await client.close()
+    await node.stop()
+    return result.unwrap()
+
+
+value = asyncio.run(main())
+print(json.dumps(dict(value=value, aiohttp="aiohttp" in sys.modules)))
+""")
+    assert result == dict(value=3, aiohttp=False)
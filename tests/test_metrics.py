@@ -0,0 +1,108 @@
+import json
+import asyncio
+import pytest
+import aiohttp
+import aioredis
+from porkpepper import *
+from porkpepper.design import *
+from porkpepper.metrics import *
+
+
+class MetricsService:
+    @classmethod
+    @service("add", output=True)
+    async def add(cls, message):
+        return dict(result=message["x"] + message["y"])
+
+
+def parse_samples(text):
+    samples = dict()
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, value = line.rsplit(" ", 1)
+        samples[name] = float(value)
+    return samples
+
+
+def test_metrics_writer():
+    writer = MetricsWriter(prefix="test")
+    writer.counter("requests", 3, "Requests")
+    writer.sample("labelled", 1, dict(key='a"b\\c'))
+    text = writer.render()
+    assert text.splitlines() == [
+        "# TYPE test_requests counter",
+        "# HELP test_requests Requests",
+        "test_requests_total 3",
+        'test_labelled{key="a\\"b\\\\c"} 1',
+        "# EOF",
+    ]
+
+
+def test_worker_metrics():
+    from porkpepper.redis_stats import CommandStats
+    from porkpepper.worker_stats import WorkerStatsTable
+    server = ServiceBasedRedisServer()
+    server.worker_stats = WorkerStatsTable(2, server.COMMANDS.keys())
+    server.worker_id = 0
+    server.total_commands_processed = 3
+    local = server.command_stats[b'GETSET'] = CommandStats()
+    for nsec in (1000, 2000, 3000):
+        local.calls += 1
+        local.nsec += nsec
+        local.histogram.record(nsec)
+    other = CommandStats()
+    other.calls = other.failed_calls = 1
+    other.nsec = 5000
+    other.histogram.record(5000)
+    other_stats = dict(server.stats_snapshot(), total_commands_processed=4, connected_clients=2)
+    server.worker_stats.publish(1, 12345, other_stats, {b'GETSET': other})
+    samples = parse_samples(render_metrics(server))
+    assert samples["porkpepper_commands_processed_total"] == 7
+    assert samples["porkpepper_connected_clients"] == 2
+    assert samples['porkpepper_command_calls_total{command="getset"}'] == 4
+    assert samples['porkpepper_command_failed_calls_total{command="getset"}'] == 1
+    assert samples['porkpepper_command_duration_seconds_count{command="getset"}'] == 4
+    assert samples['porkpepper_command_duration_seconds_bucket{command="getset",le="+Inf"}'] == 4
+    assert samples['porkpepper_command_duration_seconds_sum{command="getset"}'] == 11000 / 1e9
+    assert 'porkpepper_event_loop_lag_seconds{worker="0"}' in samples
+
+
+@pytest.mark.asyncio
+async def test_service_node_metrics():
+    node = RedisServiceNode(metrics_path="/metrics")
+    await node.start(service_map={0: MetricsService}, redis_host="127.0.0.1", redis_port=6379,
+                     host="127.0.0.1", port=9090)
+    conn = await aioredis.create_redis('redis://127.0.0.1:6379/0')
+    for i in range(5):
+        await conn.getset("add", json.dumps(dict(x=i, y=1)))
+    await asyncio.sleep(0.25)
+    async with aiohttp.ClientSession() as session:
+        async with session.get("http://127.0.0.1:9090/metrics") as response:
+            assert response.status == 200
+            assert response.headers["Content-Type"].startswith("application/openmetrics-text")
+            text = await response.text()
+    assert text.endswith("# EOF\n")
+    samples = parse_samples(text)
+    assert samples["porkpepper_connected_clients"] == 1
+    assert samples['porkpepper_command_calls_total{command="getset"}'] == 5
+    assert samples['porkpepper_service_duration_seconds_count{db="0",key="add"}'] == 5
+    assert samples['porkpepper_service_duration_seconds_bucket{db="0",key="add",le="+Inf"}'] == 5
+    assert samples["porkpepper_event_loop_lag_distribution_seconds_count"] >= 1
+    assert "porkpepper_websocket_sessions" not in samples
+    conn.close()
+    await conn.wait_closed()
+    await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_websocket_node_metrics():
+    node = WebsocketNode(WebsocketSession, "/stream", metrics_path="/metrics")
+    await node.start(host="127.0.0.1", port=9090)
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect('http://127.0.0.1:9090/stream') as ws:
+            async with session.get("http://127.0.0.1:9090/metrics") as response:
+                samples = parse_samples(await response.text())
+            assert samples["porkpepper_websocket_sessions"] == 1
+            assert samples["porkpepper_websocket_users"] == 0
+    await node.stop()
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+import porkpepper
+from porkpepper.redis_command import *
+
+
+class EchoRedisServer(porkpepper.ServiceBasedRedisServer):
+    @porkpepper.command("ECHO", 2, decoder=lambda commands: porkpepper.Result(dict(message=commands[1])),
+                        encoder=encode_bulk)
+    async def echo(self, session, message):
+        return porkpepper.Result(message)
+
+
+def test_registry():
+    assert b'ECHO' in EchoRedisServer.COMMANDS
+    assert b'ECHO' not in porkpepper.ServiceBasedRedisServer.COMMANDS
+    assert b'ECHO' not in porkpepper.RedisServerBase.COMMANDS
+    entry = EchoRedisServer.COMMANDS[b'ECHO']
+    assert entry.handler == "echo"
+    assert entry.check_arity([b'ECHO', b'x'])
+    assert not entry.check_arity([b'ECHO'])
+    assert EchoRedisServer.COMMANDS[b'SET'].check_arity([b'SET', b'k', b'v', b'EX'])
+    assert not EchoRedisServer.COMMANDS[b'SET'].check_arity([b'SET', b'k'])
+
+
+@pytest.mark.asyncio
+async def test_custom_command():
+    class LenRedisServer(EchoRedisServer):
+        async def strlen(self, session, key):
+            return porkpepper.Result(len(key))
+
+    LenRedisServer.register_command(b'strlen', 2, "strlen", decode_key, encode_integer)
+    assert b'STRLEN' not in EchoRedisServer.COMMANDS
+    node = porkpepper.RedisServiceNode(redis_server=LenRedisServer)
+    await node.start(redis_host="127.0.0.1", redis_port=6379)
+    reader, writer = await asyncio.open_connection("127.0.0.1", 6379)
+    writer.write(
+        b"*2\r\n$4\r\necho\r\n$5\r\nhello\r\n"
+        b"*2\r\n$6\r\nSTRLEN\r\n$5\r\nhello\r\n"
+        b"*1\r\n$7\r\nUNKNOWN\r\n"
+    )
+    expected = b"$5\r\nhello\r\n:5\r\n-COMMAND NOT EXISTS\r\n"
+    replies = await asyncio.wait_for(reader.readexactly(len(expected)), 1)
+    assert replies == expected
+    writer.close()
+    await writer.wait_closed()
+    await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_reply_format_error():
+    class BadReplyRedisServer(porkpepper.ServiceBasedRedisServer):
+        @porkpepper.command("BADARRAY", 1, decoder=decode_none, encoder=encode_array)
+        async def bad_array(self, session):
+            return porkpepper.Result([b"a", None, b"c"])
+
+        @porkpepper.command("BADREPLY", 1, decoder=decode_none, encoder=encode_reply)
+        async def bad_reply(self, session):
+            return porkpepper.Result([1, [True, 2.5]])
+
+    node = porkpepper.RedisServiceNode(redis_server=BadReplyRedisServer)
+    await node.start(redis_host="127.0.0.1", redis_port=6379)
+    reader, writer = await asyncio.open_connection("127.0.0.1", 6379)
+    writer.write(b"*1\r\n$8\r\nBADARRAY\r\n*1\r\n$8\r\nBADREPLY\r\n*1\r\n$4\r\nPING\r\n")
+    expected = b"-ERR reply format error\r\n-ERR reply format error\r\n+PONG\r\n"
+    replies = await asyncio.wait_for(reader.readexactly(len(expected)), 1)
+    assert replies == expected
+    writer.close()
+    await writer.wait_closed()
+    await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_scan_argument_error():
+    class EchoService:
+        @porkpepper.service("echo", output=True)
+        async def echo(self, message):
+            return message
+
+    node = porkpepper.RedisServiceNode(redis_server=porkpepper.ServiceBasedRedisServer)
+    await node.start(service_map={0: EchoService()}, redis_host="127.0.0.1", redis_port=6379)
+    reader, writer = await asyncio.open_connection("127.0.0.1", 6379)
+    writer.write(
+        b"*2\r\n$4\r\nSCAN\r\n$3\r\nabc\r\n"
+        b"*4\r\n$4\r\nSCAN\r\n$1\r\n0\r\n$5\r\nCOUNT\r\n$1\r\n0\r\n"
+        b"*2\r\n$4\r\nSCAN\r\n$5\r\n12345\r\n"
+        b"*1\r\n$4\r\nPING\r\n"
+    )
+    expected = b"-ERR invalid cursor\r\n-ERR syntax error\r\n-ERR invalid cursor\r\n+PONG\r\n"
+    replies = await asyncio.wait_for(reader.readexactly(len(expected)), 1)
+    assert replies == expected
+    writer.close()
+    await writer.wait_closed()
+    await node.stop()
@@ -0,0 +1,47 @@
+from porkpepper.error import RedisProtocolFormatError
+from porkpepper.redis_parser import RedisRequestParser
+
+
+def test_parse_commands():
+    parser = RedisRequestParser()
+    parser.feed(b"*1\r\n$4\r\nPING\r\n*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$5\r\nvalue\r\n")
+    assert parser.parse().unwrap() == [[b"PING"], [b"SET", b"k", b"value"]]
+    assert parser.buffered_size == 0
+    assert parser.parse().unwrap() == []
+
+
+def test_parse_partial_commands():
+    data = b"*2\r\n$3\r\nGET\r\n$10\r\n0123456789\r\n*1\r\n$4\r\nPING\r\n"
+    parser = RedisRequestParser(buffer_size=16)
+    commands = list()
+    for i in range(len(data)):
+        buffer = parser.get_buffer(-1)
+        buffer[0] = data[i]
+        parser.buffer_updated(1)
+        commands.extend(parser.parse().unwrap())
+    assert commands == [[b"GET", b"0123456789"], [b"PING"]]
+
+
+def test_parse_large_bulk():
+    payload = b"x" * 300000
+    data = b"*2\r\n$3\r\nSET\r\n$300000\r\n" + payload + b"\r\n"
+    parser = RedisRequestParser(buffer_size=1024)
+    commands = list()
+    offset = 0
+    while offset < len(data):
+        buffer = parser.get_buffer(-1)
+        size = min(len(buffer), len(data) - offset)
+        buffer[:size] = data[offset:offset + size]
+        parser.buffer_updated(size)
+        offset += size
+        commands.extend(parser.parse().unwrap())
+    assert commands == [[b"SET", payload]]
+
+
+def test_parse_error():
+    for data in [b"*-1\r\n", b"*0\r\n", b"PING\r\n", b"*1\r\n$-1\r\n", b"*1\r\n$1\r\nab\r\n"]:
+        parser = RedisRequestParser()
+        parser.feed(data)
+        result = parser.parse()
+        assert result.is_error and isinstance(result.error, RedisProtocolFormatError)
+        assert parser.parse().is_error
@@ -79,3 +79,24 @@ def test_set_binary():
     assert RedisProtocol.set_binary(False).is_error
     assert RedisProtocol.set_binary(1.2).is_error
 
+
+
+def test_cached_replies():
+    assert RedisProtocol.integer_reply(0) == b":0\r\n"
+    assert RedisProtocol.integer_reply(1) is RedisProtocol.integer_reply(1)
+    assert RedisProtocol.integer_reply(-1) == b":-1\r\n"
+    assert RedisProtocol.integer_reply(100000) == b":100000\r\n"
+    assert RedisProtocol.count_header(2) == b"*2\r\n"
+    assert RedisProtocol.count_header(5000) == b"*5000\r\n"
+    assert RedisProtocol.bulk_header(5000) == b"$5000\r\n"
+    assert RedisProtocol.count_header(-1) == b"*-1\r\n"
+    assert RedisProtocol.bulk_header(-1) == b"$-1\r\n"
+    assert RedisProtocol.status_reply("PONG") is RedisProtocol.PONG
+    assert RedisProtocol.error_reply("ERR") is RedisProtocol.ERR
+    assert RedisProtocol.error_reply("ERR x") is RedisProtocol.error_reply("ERR x")
+    payload = b"1234"
+    parts = RedisProtocol.bulk_parts(payload)
+    assert parts == (b"$4\r\n", b"1234", b"\r\n")
+    assert parts[1] is payload
+    assert RedisProtocol.bulk_parts("中") == (b"$3\r\n", "中".encode("utf8"), b"\r\n")
+    assert RedisProtocol.bulk_parts(0) == (b"$1\r\n", b"0", b"\r\n")
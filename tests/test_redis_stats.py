@@ -0,0 +1,55 @@
+from porkpepper.redis_stats import *
+
+
+def test_command_stats():
+    stats = CommandStats()
+    assert stats.usec_per_call == 0.0
+    stats.calls += 2
+    stats.nsec += 3000
+    assert stats.usec == 3
+    assert stats.usec_per_call == 1.5
+
+
+def test_instantaneous_metric():
+    metric = InstantaneousMetric(size=4)
+    assert metric.value == 0.0
+    metric.sample(0.0, 0)
+    metric.sample(0.1, 10)
+    metric.sample(0.2, 30)
+    assert round(metric.value) == 150
+    for i in range(3, 10):
+        metric.sample(i / 10, 30)
+    assert metric.value == 0.0
+    metric.reset()
+    assert metric.value == 0.0
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(0.99) == 0
+    for nsec in (500, 1500, 3000, 3500, 1000000):
+        histogram.record(nsec)
+    histogram.record(10 ** 20)
+    assert histogram.total == 6
+    assert histogram.cumulative() == [(1, 1), (2, 2), (4, 4), (1024, 5), (1 << 39, 6)]
+    assert histogram.percentile(0.5) == 4
+    assert histogram.percentile(0.8) == 1024
+
+
+def test_slowlog():
+    slowlog = SlowLog(max_len=2)
+    slowlog.add([b"GET", b"a"], 10, "127.0.0.1:1000", 0)
+    slowlog.add([b"SET", b"b", b"x" * 200], 20, "127.0.0.1:1000", 1)
+    slowlog.add([b"MSET"] + [b"k"] * 40, 30)
+    assert len(slowlog) == 2
+    first, second = slowlog.get()
+    assert first.id == 2 and second.id == 1
+    assert len(first.arguments) == 32
+    assert first.arguments[-1] == b"... (10 more arguments)"
+    assert second.arguments[2] == b"x" * 128 + b"... (72 more bytes)"
+    assert second.to_reply()[-1] == 1
+    assert len(slowlog.get(1)) == 1
+    slowlog.max_len = 1
+    assert len(slowlog) == 1 and slowlog.get()[0].id == 2
+    slowlog.reset()
+    assert len(slowlog) == 0
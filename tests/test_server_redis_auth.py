@@ -27,3 +27,31 @@ async def test_auth():
 
     await node.stop()
     await asyncio.sleep(0.1)
+
+
+class RequireAuthRedisServer(AuthRedisServer):
+    ENABLE_AUTH = True
+
+
+@pytest.mark.asyncio
+async def test_auth_pipeline():
+    node = porkpepper.RedisServiceNode(redis_server=RequireAuthRedisServer)
+    await node.start(redis_host="127.0.0.1", redis_port=6379)
+    reader, writer = await asyncio.open_connection("127.0.0.1", 6379)
+    writer.write(
+        b"*1\r\n$4\r\nPING\r\n"
+        b"*2\r\n$4\r\nAUTH\r\n$3\r\n123\r\n"
+        b"*1\r\n$4\r\nPING\r\n"
+        b"*2\r\n$4\r\nAUTH\r\n$6\r\n123456\r\n"
+        b"*1\r\n$4\r\nPING\r\n"
+    )
+    expected = b"-NOAUTH Authentication required.\r\n" \
+               b"-ERR invalid password\r\n" \
+               b"-NOAUTH Authentication required.\r\n" \
+               b"+OK\r\n" \
+               b"+PONG\r\n"
+    replies = await asyncio.wait_for(reader.readexactly(len(expected)), 1)
+    assert replies == expected
+    writer.close()
+    await writer.wait_closed()
+    await node.stop()
@@ -17,6 +17,14 @@ class ServiceAtZero:
 CALL_WITHOUT_OUTPUT = False
 
 
+class SlowService:
+    @classmethod
+    @service("slow", output=True)
+    async def slow(cls, message):
+        await asyncio.sleep(message.get("delay", 0))
+        return dict()
+
+
 class ServiceAtOne:
     @classmethod
     @service("plus", output=True, meta=dict(info="test_info"))
@@ -111,6 +119,10 @@ async def test_service():
     assert db_size == 3
     keys = await conn.keys("*")
     assert len(keys) == 3
+    keys = await conn.keys("t*")
+    assert keys == [b"times"]
+    cursor, keys = await conn.scan(0, match="*O*", count=10)
+    assert cursor == 0 and keys == [b"noOutput"]
     await common_command_check(conn)
     conn.close()
 
@@ -126,3 +138,325 @@ async def common_command_check(conn: aioredis.Redis):
     assert info["server"]["tcp_port"] == "6379"
     assert "keyspace" in info
     assert info["keyspace"]["db0"]["keys"] == "1"
+
+
+class BufferedRedisServer(ServiceBasedRedisServer):
+    ENGINE = "buffered"
+
+
+@pytest.mark.asyncio
+async def test_service_buffered_engine():
+    node = RedisServiceNode(redis_server=BufferedRedisServer)
+    await node.start(service_map={0: ServiceAtZero, 1: ServiceAtOne()}, redis_host="127.0.0.1", redis_port=6379)
+    conn = await aioredis.create_redis('redis://127.0.0.1:6379/1')
+    result = await conn.getset("plus", json.dumps(dict(x=5, y=16)))
+    assert json.loads(result) == dict(result=21)
+    payload = json.dumps(dict(a=3, b="x" * 200000))
+    results = await asyncio.gather(*[conn.getset("times", payload) for _ in range(20)])
+    assert all(json.loads(result) == dict(result="x" * 600000) for result in results)
+    keys = await conn.keys("*")
+    assert len(keys) == 3
+    conn.close()
+    await conn.wait_closed()
+    await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_service_pipeline():
+    for redis_server in [ServiceBasedRedisServer, BufferedRedisServer]:
+        node = RedisServiceNode(redis_server=redis_server)
+        await node.start(service_map={0: ServiceAtZero}, redis_host="127.0.0.1", redis_port=6379)
+        reader, writer = await asyncio.open_connection("127.0.0.1", 6379)
+        requests = list()
+        expected = list()
+        for i in range(1000):
+            payload = json.dumps(dict(x=i, y=1)).encode("utf8")
+            requests.append(b"*3\r\n$6\r\nGETSET\r\n$3\r\nadd\r\n$%d\r\n%s\r\n" % (len(payload), payload))
+            reply = json.dumps(dict(result=i + 1)).encode("utf8")
+            expected.append(b"$%d\r\n%s\r\n" % (len(reply), reply))
+        writer.write(b"".join(requests))
+        expected = b"".join(expected)
+        replies = await asyncio.wait_for(reader.readexactly(len(expected)), 5)
+        assert replies == expected
+        writer.write(b"*1\r\n$4\r\nPING\r\n*1\r\n$4\r\nPI")
+        assert await asyncio.wait_for(reader.readexactly(7), 1) == b"+PONG\r\n"
+        writer.write(b"NG\r\n")
+        assert await asyncio.wait_for(reader.readexactly(7), 1) == b"+PONG\r\n"
+        writer.close()
+        await writer.wait_closed()
+        await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_service_idle_timeout():
+    class IdleRedisServer(ServiceBasedRedisServer):
+        IDLE_TIMEOUT = 0.2
+
+    class IdleBufferedRedisServer(BufferedRedisServer):
+        IDLE_TIMEOUT = 0.2
+
+    for redis_server in [IdleRedisServer, IdleBufferedRedisServer]:
+        node = RedisServiceNode(redis_server=redis_server)
+        await node.start(service_map={0: ServiceAtZero}, redis_host="127.0.0.1", redis_port=6379)
+        reader, writer = await asyncio.open_connection("127.0.0.1", 6379)
+        for _ in range(4):
+            writer.write(b"*1\r\n$4\r\nPING\r\n")
+            assert await asyncio.wait_for(reader.readexactly(7), 1) == b"+PONG\r\n"
+            await asyncio.sleep(0.1)
+        writer.write(b"*2\r\n$3\r\nGET\r\n")
+        assert await asyncio.wait_for(reader.read(), 1) == b""
+        writer.close()
+        await node.stop()
+
+
+class SleepService:
+    @classmethod
+    @service("sleep", output=True)
+    async def sleep(cls, message):
+        await asyncio.sleep(message["delay"])
+        return dict(result=message["id"])
+
+
+class ConcurrentRedisServer(ServiceBasedRedisServer):
+    MAX_CONCURRENT_COMMANDS = 8
+
+
+def sleep_command(delay, request_id):
+    payload = json.dumps(dict(delay=delay, id=request_id)).encode("utf8")
+    return b"*3\r\n$6\r\nGETSET\r\n$5\r\nsleep\r\n$%d\r\n%s\r\n" % (len(payload), payload)
+
+
+def sleep_reply(request_id):
+    reply = json.dumps(dict(result=request_id)).encode("utf8")
+    return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+
+@pytest.mark.asyncio
+async def test_service_concurrent_commands():
+    node = RedisServiceNode(redis_server=ConcurrentRedisServer)
+    await node.start(service_map={0: SleepService, 1: SleepService}, redis_host="127.0.0.1", redis_port=6379)
+    reader, writer = await asyncio.open_connection("127.0.0.1", 6379)
+    requests = [sleep_command(0.3 - i * 0.05, i) for i in range(6)]
+    requests.append(b"*2\r\n$6\r\nSELECT\r\n$1\r\n1\r\n")
+    requests.extend(sleep_command(0.2, i) for i in range(6, 10))
+    expected = b"".join([sleep_reply(i) for i in range(6)] + [b"+OK\r\n"] + [sleep_reply(i) for i in range(6, 10)])
+    loop = asyncio.get_running_loop()
+    start_time = loop.time()
+    writer.write(b"".join(requests))
+    replies = await asyncio.wait_for(reader.readexactly(len(expected)), 2)
+    assert replies == expected
+    assert loop.time() - start_time < 0.9
+    writer.close()
+    await writer.wait_closed()
+    await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_stats():
+    node = RedisServiceNode()
+    await node.start(service_map={0: ServiceAtZero}, redis_host="127.0.0.1", redis_port=6379)
+    conn = await aioredis.create_redis('redis://127.0.0.1:6379/0')
+    for _ in range(20):
+        await asyncio.gather(*[conn.getset("add", json.dumps(dict(x=1, y=2))) for _ in range(50)])
+        await asyncio.sleep(0.02)
+    with pytest.raises(aioredis.errors.ReplyError):
+        await conn.getset("xyz", "{}")
+    info = await conn.info("stats")
+    assert list(info) == ["stats"]
+    assert int(info["stats"]["instantaneous_ops_per_sec"]) > 0
+    assert float(info["stats"]["instantaneous_input_kbps"]) > 0
+    assert float(info["stats"]["instantaneous_output_kbps"]) > 0
+    info = await conn.info("commandstats")
+    getset = info["commandstats"]["cmdstat_getset"]
+    assert getset["calls"] == "1001"
+    assert getset["failed_calls"] == "1"
+    assert float(getset["usec_per_call"]) > 0
+    info = await conn.info("all")
+    assert "commandstats" in info and "server" in info
+    assert await conn.execute(b"CONFIG", b"RESETSTAT") == b"OK"
+    info = await conn.info("commandstats")
+    assert list(info["commandstats"]) == ["cmdstat_config"]
+    assert info["commandstats"]["cmdstat_config"]["calls"] == "1"
+    conn.close()
+    await conn.wait_closed()
+    await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_slowlog_latency():
+    node = RedisServiceNode()
+    await node.start(service_map={0: SlowService}, redis_host="127.0.0.1", redis_port=6379)
+    conn = await aioredis.create_redis('redis://127.0.0.1:6379/0')
+    assert await conn.config_get("slowlog-log-slower-than") == {"slowlog-log-slower-than": "10000"}
+    assert await conn.config_set("slowlog-log-slower-than", 5000)
+    await conn.getset("slow", json.dumps(dict(delay=0.02)))
+    for _ in range(10):
+        await conn.getset("slow", json.dumps(dict()))
+    assert await conn.execute(b"SLOWLOG", b"LEN") == 1
+    entries = await conn.execute(b"SLOWLOG", b"GET")
+    entry_id, timestamp, usec, arguments, client, _, db = entries[0]
+    assert usec >= 20000
+    assert arguments == [b"GETSET", b"slow", b'{"delay": 0.02}']
+    assert client.startswith(b"127.0.0.1:")
+    assert db == 0
+    histograms = await conn.execute(b"LATENCY", b"HISTOGRAM", b"getset", b"db0:slow", b"missing")
+    assert histograms[0] == b"getset" and histograms[2] == b"db0:slow"
+    calls, total, histogram_usec, buckets = histograms[3]
+    assert total == 11
+    assert buckets[-1] == 11 and buckets[-2] >= 16384
+    assert await conn.execute(b"SLOWLOG", b"RESET") == b"OK"
+    assert await conn.execute(b"SLOWLOG", b"LEN") == 0
+    with pytest.raises(aioredis.errors.ReplyError):
+        await conn.execute(b"LATENCY", b"DOCTOR")
+    assert await conn.config_set("slowlog-log-slower-than", 0)
+    with pytest.raises(aioredis.errors.ReplyError):
+        await conn.execute(b"CONFIG", b"SET", b"requirepass", b"secret-password")
+    with pytest.raises(aioredis.errors.ReplyError):
+        await conn.execute(b"AUTH", b"secret-password")
+    conn.close()
+    await conn.wait_closed()
+    conn = await aioredis.create_redis('redis://127.0.0.1:6379/0')
+    entries = await conn.execute(b"SLOWLOG", b"GET", -1)
+    assert b"secret-password" not in repr(entries).encode("utf8")
+    logged = [entry[3] for entry in entries]
+    assert [b"AUTH", b"(redacted)"] in logged
+    assert [b"CONFIG", b"SET", b"requirepass", b"(redacted)"] in logged
+    conn.close()
+    await conn.wait_closed()
+    await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_info_sections():
+    node = RedisServiceNode()
+    await node.start(service_map={0: ServiceAtZero, 1: ServiceAtOne()}, redis_host="127.0.0.1", redis_port=6379)
+    conn = await aioredis.create_redis('redis://127.0.0.1:6379/0')
+    info = await conn.info()
+    assert list(info) == ["server", "clients", "stats", "replication", "cluster", "keyspace"]
+    assert info["server"]["run_id"].startswith("PP")
+    assert info["keyspace"]["db1"]["keys"] == "3"
+    info = await conn.info("clients")
+    assert info == {"clients": {"connected_clients": "1"}}
+    info = await conn.info("KEYSPACE")
+    assert list(info) == ["keyspace"]
+    assert list(info["keyspace"]) == ["db0", "db1"]
+    assert await conn.execute(b"INFO", b"missing") == b""
+    info = await conn.info("everything")
+    assert list(info)[-2:] == ["commandstats", "services"]
+    conn.close()
+    await conn.wait_closed()
+    await node.stop()
+
+
+class CachedService:
+    calls = 0
+
+    @classmethod
+    @service("price", output=True, cache=dict(max_entries=2, ttl=60))
+    async def price(cls, message):
+        cls.calls += 1
+        return dict(price=message["amount"] * 2)
+
+    @classmethod
+    @service("flush")
+    async def flush(cls, message):
+        invalidate_service(cls.price)
+
+
+@pytest.mark.asyncio
+async def test_service_cache():
+    node = RedisServiceNode()
+    await node.start(service_map={0: CachedService}, redis_host="127.0.0.1", redis_port=6379)
+    conn = await aioredis.create_redis('redis://127.0.0.1:6379/0')
+    for amount in (1, 1, 1, 2, 3, 1):
+        assert json.loads(await conn.getset("price", json.dumps(dict(amount=amount)))) == dict(price=amount * 2)
+    assert CachedService.calls == 4
+    services = (await conn.info("services"))["services"]["service_db0_price"]
+    assert services["cache_hits"] == "2"
+    assert services["cache_misses"] == "4"
+    assert services["cache_evictions"] == "2"
+    assert services["cache_entries"] == "2"
+    assert int(services["cache_memory"]) > 0
+
+    assert await conn.delete("price") == 1
+    assert await conn.delete("price") == 1
+    assert (await conn.info("services"))["services"]["service_db0_price"]["cache_entries"] == "0"
+    assert await conn.delete("flush") == 0
+    await conn.getset("price", json.dumps(dict(amount=1)))
+    assert CachedService.calls == 5
+    await conn.set("flush", "{}")
+    await conn.getset("price", json.dumps(dict(amount=1)))
+    assert CachedService.calls == 6
+
+    assert await conn.execute(b"CONFIG", b"RESETSTAT") == b"OK"
+    services = (await conn.info("services"))["services"]["service_db0_price"]
+    assert services["cache_hits"] == "0"
+    assert services["cache_entries"] == "1"
+    conn.close()
+    await conn.wait_closed()
+    await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_service_cache_per_entry():
+    node = RedisServiceNode()
+    await node.start(service_map={0: CachedService, 1: CachedService}, redis_host="127.0.0.1", redis_port=6379)
+    payload = json.dumps(dict(amount=7))
+    calls = CachedService.calls
+    conn0 = await aioredis.create_redis('redis://127.0.0.1:6379/0')
+    conn1 = await aioredis.create_redis('redis://127.0.0.1:6379/1')
+    await conn0.getset("price", payload)
+    await conn1.getset("price", payload)
+    assert CachedService.calls == calls + 2
+    assert await conn1.delete("price") == 1
+    await conn0.getset("price", payload)
+    assert CachedService.calls == calls + 2
+    await conn1.getset("price", payload)
+    assert CachedService.calls == calls + 3
+    node.update_service(0, CachedService)
+    await conn0.getset("price", payload)
+    assert CachedService.calls == calls + 4
+    assert invalidate_service(CachedService.price) == 2
+    for conn in (conn0, conn1, ):
+        conn.close()
+        await conn.wait_closed()
+    await node.stop()
+
+
+class FlightService:
+    calls = 0
+
+    @classmethod
+    @service("lookup", output=True, single_flight=True)
+    async def lookup(cls, message):
+        cls.calls += 1
+        await asyncio.sleep(0.1)
+        if message.get("fail"):
+            raise ValueError
+        return dict(value=message["id"])
+
+
+@pytest.mark.asyncio
+async def test_service_single_flight():
+    node = RedisServiceNode()
+    await node.start(service_map={0: FlightService}, redis_host="127.0.0.1", redis_port=6379)
+    clients = [await aioredis.create_redis('redis://127.0.0.1:6379/0') for _ in range(5)]
+    replies = await asyncio.gather(*[
+        conn.getset("lookup", json.dumps(dict(id=1 if index < 4 else 2)))
+        for index, conn in enumerate(clients)
+    ])
+    assert [json.loads(reply)["value"] for reply in replies] == [1, 1, 1, 1, 2]
+    assert FlightService.calls == 2
+    replies = await asyncio.gather(*[
+        conn.getset("lookup", json.dumps(dict(id=3, fail=True))) for conn in clients[:3]
+    ], return_exceptions=True)
+    assert all(isinstance(reply, aioredis.ReplyError) for reply in replies)
+    assert FlightService.calls == 3
+    services = (await clients[0].info("services"))["services"]["service_db0_lookup"]
+    assert services["single_flight_calls"] == "3"
+    assert services["single_flight_coalesced"] == "5"
+    assert services["single_flight_in_flight"] == "0"
+    for conn in clients:
+        conn.close()
+        await conn.wait_closed()
+    await node.stop()
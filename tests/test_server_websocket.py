@@ -108,3 +108,322 @@ async def test_websocket():
     conn_user.close()
     await asyncio.gather(conn_session.wait_closed(), conn_user.wait_closed())
     await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_websocket_scan():
+    node = WebsocketNode(Session, "/stream")
+    await node.start(host="127.0.0.1", port=9090)
+    app = node._http_app
+    session_ids = set()
+    for i in range(250):
+        session = Session()
+        app.setup_session(session, None)
+        session.current_user = f"user{i % 50}"
+        session_ids.add(session.session_id)
+    conn = await aioredis.create_redis('redis://127.0.0.1:6379/0')
+    cursor, keys = await conn.scan(0, count=100)
+    assert 0 < cursor < 2 ** 63 and len(keys) == 100
+    scanned = set(keys)
+    while cursor:
+        cursor, keys = await conn.scan(cursor, count=100)
+        scanned.update(keys)
+    scanned = {key.decode("utf8") for key in scanned}
+    assert scanned == session_ids
+    await conn.select(1)
+    cursor, keys = await conn.scan(0, count=1000)
+    assert cursor == 0 and len(keys) == 50
+    assert len(await conn.keys("*")) == 50
+    conn.close()
+    await conn.wait_closed()
+    for session in app.all_sessions():
+        app.cleanup_session(session)
+    await node.stop()
+
+
+class CountingSession(Session):
+    dumps_calls = 0
+
+    @classmethod
+    def message_dumps(cls, o):
+        CountingSession.dumps_calls += 1
+        return super(CountingSession, cls).message_dumps(o)
+
+
+class BrokenSocket:
+    closed = False
+
+    async def send_str(self, data):
+        raise ConnectionResetError
+
+    async def close(self, **kwargs):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_websocket_broadcast():
+    node = WebsocketNode(CountingSession, "/stream")
+    await node.start(host="127.0.0.1", port=9090)
+    app = node._http_app
+    async with aiohttp.ClientSession() as client:
+        sockets = [await client.ws_connect('http://127.0.0.1:9090/stream') for _ in range(3)]
+        for index, ws in enumerate(sockets):
+            await ws.send_json(dict(type="login", user="kenny" if index else "stan"))
+            assert (await ws.receive_json(timeout=1))["type"] == "login"
+        broken = CountingSession()
+        app.setup_session(broken, BrokenSocket())
+        broken_socket = broken.socket
+        CountingSession.dumps_calls = 0
+
+        counts = await app.broadcast(dict(type="notice"))
+        assert counts == dict(targets=4, delivered=3, dropped=1, pending=0, skipped=0)
+        assert CountingSession.dumps_calls == 1
+        assert broken_socket.closed and app.get_session(broken.session_id) is None
+        for ws in sockets:
+            assert await ws.receive_json(timeout=1) == dict(type="notice")
+
+        counts = await app.broadcast(dict(type="user"), user="kenny")
+        assert counts["delivered"] == 2
+        counts = await app.broadcast(dict(type="stan"), predicate=lambda session: session.current_user == "stan")
+        assert counts["delivered"] == 1
+        assert await sockets[0].receive_json(timeout=1) == dict(type="stan")
+        assert await sockets[1].receive_json(timeout=1) == dict(type="user")
+        assert await sockets[2].receive_json(timeout=1) == dict(type="user")
+        counts = await app.broadcast(set())
+        assert counts == dict(targets=3, delivered=0, dropped=0, pending=0, skipped=3)
+        assert await app.broadcast(dict(), sessions=[]) == dict(targets=0, delivered=0, dropped=0, pending=0, skipped=0)
+        for ws in sockets:
+            await ws.close()
+    await node.stop()
+
+
+class BlockedSocket:
+    def __init__(self):
+        self.released = asyncio.Event()
+        self.sent = list()
+        self.closed = False
+
+    async def send_str(self, data):
+        await self.released.wait()
+        self.sent.append(data)
+
+    async def close(self, **kwargs):
+        self.closed = True
+
+
+class RecordingSocket(BlockedSocket):
+    def __init__(self):
+        super(RecordingSocket, self).__init__()
+        self.released.set()
+
+
+@pytest.mark.asyncio
+async def test_websocket_broadcast_deadline():
+    node = WebsocketNode(WebsocketSession, "/stream")
+    await node.start(host="127.0.0.1", port=9090)
+    app = node._http_app
+    sockets = [RecordingSocket(), RecordingSocket(), BlockedSocket()]
+    sessions = [WebsocketSession() for _ in sockets]
+    for session, socket in zip(sessions, sockets):
+        app.setup_session(session, socket)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    counts = await app.broadcast(dict(type="slow"), timeout=0.1)
+    assert loop.time() - start < 0.5
+    assert counts == dict(targets=3, delivered=2, dropped=0, pending=1, skipped=0)
+    counts = await app.broadcast(dict(type="queued"), timeout=0)
+    assert counts == dict(targets=3, delivered=0, dropped=0, pending=3, skipped=0)
+    sockets[2].released.set()
+    await asyncio.sleep(0.05)
+    for socket in sockets:
+        assert socket.sent == ['{"type": "slow"}', '{"type": "queued"}']
+    for session in sessions:
+        app.cleanup_session(session)
+    await node.stop()
+
+
+class BoundedSession(WebsocketSession):
+    OUTBOUND_MAX_MESSAGES = 3
+    OUTBOUND_MAX_BYTES = 64
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy", ["drop_oldest", "drop_newest", "disconnect"])
+async def test_websocket_outbound_queue(policy):
+    node = WebsocketNode(BoundedSession, "/stream")
+    await node.start(host="127.0.0.1", port=9090)
+    app = node._http_app
+    session = BoundedSession()
+    session.OUTBOUND_POLICY = policy
+    socket = BlockedSocket()
+    app.setup_session(session, socket)
+    conn = await aioredis.create_redis('redis://127.0.0.1:6379/0')
+    for index in range(4):
+        await conn.set(session.session_id, json.dumps(index))
+    if policy == "drop_oldest":
+        await conn.set(session.session_id, json.dumps(4))
+    else:
+        with pytest.raises(aioredis.ReplyError, match="BUSY"):
+            await conn.set(session.session_id, json.dumps(4))
+    status = json.loads(await conn.get(session.session_id)) if policy != "disconnect" else None
+    socket.released.set()
+    await asyncio.sleep(0.05)
+    if policy == "drop_oldest":
+        assert status["outbound_dropped"] == 1 and status["outbound_queue"] == 3
+        assert socket.sent == ["0", "2", "3", "4"]
+    elif policy == "drop_newest":
+        assert status["outbound_dropped"] == 1 and status["outbound_queue"] == 3
+        assert socket.sent == ["0", "1", "2", "3"]
+    else:
+        assert socket.closed and session.evicted
+        assert app.get_session(session.session_id) is None
+    if policy != "disconnect":
+        status = json.loads(await conn.get(session.session_id))
+        assert status["outbound_queue"] == 0 and status["outbound_bytes"] == 0
+        assert status["outbound_sent"] == 4
+        assert not session.enqueue_frame("x" * 65)
+        assert not session.enqueue_frame("\u00e9" * 33)
+        assert session.outbound_dropped == 3
+        app.cleanup_session(session)
+    conn.close()
+    await conn.wait_closed()
+    await node.stop()
+
+
+class CoalescingSession(WebsocketSession):
+    COALESCE = "json"
+
+    async def request(self, message):
+        self.coalesce = message.get("coalesce")
+        self.coalesce_window_us = message.get("window", 0)
+        for index in range(message["count"]):
+            await self.send(dict(index=index))
+
+
+@pytest.mark.asyncio
+async def test_websocket_coalesce():
+    from porkpepper.websocket_session import unpack_batch
+    node = WebsocketNode(CoalescingSession, "/stream")
+    await node.start(host="127.0.0.1", port=9090)
+    app = node._http_app
+    async with aiohttp.ClientSession() as client:
+        async with client.ws_connect('http://127.0.0.1:9090/stream') as ws:
+            await ws.send_json(dict(coalesce="json", count=5))
+            assert await ws.receive_json(timeout=1) == [dict(index=index) for index in range(5)]
+            session = app.all_sessions()[0]
+            assert session.outbound_frames == 1 and session.outbound_sent == 5
+
+            await ws.send_json(dict(coalesce="binary", count=3))
+            msg = await ws.receive(timeout=1)
+            assert msg.type == aiohttp.WSMsgType.BINARY
+            assert [json.loads(frame) for frame in unpack_batch(msg.data)] == [dict(index=index) for index in range(3)]
+
+            conn = await aioredis.create_redis('redis://127.0.0.1:6379/0')
+            await ws.send_json(dict(coalesce="json", window=50000, count=0))
+            await asyncio.sleep(0.05)
+            for index in range(4):
+                await conn.set(session.session_id, json.dumps(index))
+            assert await ws.receive_json(timeout=1) == [0, 1, 2, 3]
+            assert session.outbound_frames == 3
+
+            await ws.send_json(dict(count=2))
+            assert await ws.receive_json(timeout=1) == dict(index=0)
+            assert await ws.receive_json(timeout=1) == dict(index=1)
+            conn.close()
+            await conn.wait_closed()
+    await node.stop()
+
+
+class ConcurrentSession(WebsocketSession):
+    DISPATCH_CONCURRENCY = 2
+
+    def message_channel(self, message):
+        return message.get("channel")
+
+    async def request(self, message):
+        await asyncio.sleep(message["delay"])
+        await self.send(dict(id=message["id"], in_flight=self.requests_in_flight))
+
+
+@pytest.mark.asyncio
+async def test_websocket_concurrent_dispatch():
+    node = WebsocketNode(ConcurrentSession, "/stream")
+    await node.start(host="127.0.0.1", port=9090)
+    app = node._http_app
+    async with aiohttp.ClientSession() as client:
+        async with client.ws_connect('http://127.0.0.1:9090/stream') as ws:
+            await ws.send_json(dict(id="slow", delay=0.2))
+            await ws.send_json(dict(id="fast", delay=0))
+            assert (await ws.receive_json(timeout=1))["id"] == "fast"
+            assert (await ws.receive_json(timeout=1))["id"] == "slow"
+
+            await ws.send_json(dict(id=1, delay=0.15, channel="a"))
+            await ws.send_json(dict(id=2, delay=0, channel="a"))
+            await ws.send_json(dict(id=3, delay=0, channel="b"))
+            replies = [(await ws.receive_json(timeout=1))["id"] for _ in range(3)]
+            assert replies.index(1) < replies.index(2)
+            session = app.all_sessions()[0]
+            assert session.requests_paused >= 1
+            assert session.requests_in_flight == 0
+            assert not session._channel_locks
+
+            conn = await aioredis.create_redis('redis://127.0.0.1:6379/0')
+            status = json.loads(await conn.get(session.session_id))
+            assert status["requests_dispatched"] == 5
+            assert status["requests_in_flight"] == 0
+            conn.close()
+            await conn.wait_closed()
+
+            await ws.send_json(dict(id=4, delay=0, channel=["unhashable"]))
+            assert (await ws.receive(timeout=1)).type == aiohttp.WSMsgType.CLOSE
+            assert not session._channel_locks
+    await node.stop()
+
+
+class EchoSession(WebsocketSession):
+    async def request(self, message):
+        await self.send(dict(echo=message, codec=self.codec.name if self.codec else None))
+
+
+class BinarySession(EchoSession):
+    CODECS = (MsgpackCodec(), CborCodec(), JsonCodec(), )
+    COALESCE = "json"
+
+
+@pytest.mark.asyncio
+async def test_websocket_binary_codecs():
+    import msgpack
+    import cbor2
+    from porkpepper.websocket_session import unpack_batch
+    node = WebsocketNode(BinarySession, "/stream")
+    await node.start(host="127.0.0.1", port=9090)
+    app = node._http_app
+    async with aiohttp.ClientSession() as client:
+        async with client.ws_connect('http://127.0.0.1:9090/stream', protocols=("msgpack", )) as ws:
+            assert ws.protocol == "msgpack"
+            await ws.send_bytes(msgpack.packb(dict(x=1, data=b"\x00\x01")))
+            msg = await ws.receive(timeout=1)
+            assert msg.type == aiohttp.WSMsgType.BINARY
+            frames = unpack_batch(msg.data)
+            assert [msgpack.unpackb(frame) for frame in frames] == [
+                dict(echo=dict(x=1, data=b"\x00\x01"), codec="msgpack")]
+            counts = await asyncio.gather(app.broadcast(dict(type="notice")), app.broadcast(dict(type="again")))
+            assert [count["delivered"] for count in counts] == [1, 1]
+            frames = unpack_batch((await ws.receive(timeout=1)).data)
+            assert [msgpack.unpackb(frame) for frame in frames] == [dict(type="notice"), dict(type="again")]
+        async with client.ws_connect('http://127.0.0.1:9090/stream', protocols=("cbor", )) as ws:
+            assert ws.protocol == "cbor"
+            await ws.send_bytes(cbor2.dumps(dict(x=[1, 2], data=b"\xff")))
+            msg = await ws.receive(timeout=1)
+            assert msg.type == aiohttp.WSMsgType.BINARY
+            assert [cbor2.loads(frame) for frame in unpack_batch(msg.data)] == [
+                dict(echo=dict(x=[1, 2], data=b"\xff"), codec="cbor")]
+        async with client.ws_connect('http://127.0.0.1:9090/stream', protocols=("json", )) as ws:
+            assert ws.protocol == "json"
+            await ws.send_bytes(json.dumps(dict(x=2)).encode("utf8"))
+            assert await ws.receive_json(timeout=1) == [dict(echo=dict(x=2), codec="json")]
+        async with client.ws_connect('http://127.0.0.1:9090/stream') as ws:
+            assert ws.protocol is None
+            await ws.send_json(dict(x=3))
+            assert await ws.receive_json(timeout=1) == [dict(echo=dict(x=3), codec=None)]
+    await node.stop()
@@ -0,0 +1,54 @@
+import time
+import pytest
+from porkpepper.service_cache import ServiceCache
+
+
+def test_lru_entries():
+    cache = ServiceCache(max_entries=2)
+    cache.put(b"a", b"1")
+    cache.put(b"b", b"2")
+    assert cache.get(b"a") == b"1"
+    cache.put(b"c", b"3")
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == b"1"
+    assert cache.get(b"c") == b"3"
+    assert cache.evictions == 1
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_memory_limit():
+    cache = ServiceCache(max_bytes=ServiceCache.ENTRY_OVERHEAD * 2 + 20)
+    cache.put(b"a", b"x" * 5)
+    cache.put(b"b", b"x" * 5)
+    assert cache.memory == ServiceCache.ENTRY_OVERHEAD * 2 + 12
+    cache.put(b"c", b"x" * 5)
+    assert len(cache) == 2 and cache.get(b"a") is None
+    cache.put(b"big", b"x" * 1000)
+    assert cache.get(b"big") is None
+    cache.put(b"b", b"yy")
+    assert cache.memory == ServiceCache.ENTRY_OVERHEAD * 2 + 9
+    assert cache.invalidate(b"b") == 1
+    assert cache.invalidate() == 1
+    assert cache.memory == 0
+
+
+def test_ttl():
+    cache = ServiceCache(ttl=0.01)
+    cache.put(b"a", b"1")
+    assert cache.get(b"a") == b"1"
+    time.sleep(0.02)
+    assert cache.get(b"a") is None
+    assert cache.expired == 1
+    assert len(cache) == 0 and cache.memory == 0
+
+
+def test_from_option():
+    assert ServiceCache.from_option(None) is None
+    assert ServiceCache.from_option(True).max_entries == ServiceCache.DEFAULT_MAX_ENTRIES
+    assert ServiceCache.from_option(8).max_entries == 8
+    assert ServiceCache.from_option(dict(max_bytes=64)).max_entries is None
+    template = ServiceCache(max_entries=3, ttl=1)
+    cache = ServiceCache.from_option(template)
+    assert cache is not template and (cache.max_entries, cache.ttl) == (3, 1)
+    with pytest.raises(ValueError):
+        ServiceCache.from_option("big")
@@ -0,0 +1,102 @@
+import os
+import json
+import time
+import asyncio
+import threading
+import pytest
+import aioredis
+from porkpepper.design import *
+from porkpepper.error import ServiceOverloaded
+from porkpepper.service_executor import ServiceExecutor
+
+
+class BlockingService:
+    @classmethod
+    @service("thread", output=True, executor="thread", max_workers=2)
+    def thread(cls, message):
+        time.sleep(message.get("delay", 0))
+        return dict(thread=threading.current_thread().name)
+
+    @classmethod
+    @service("process", output=True, executor="process", max_workers=1)
+    def process(cls, a, b, **kwargs):
+        return dict(pid=os.getpid(), result=a * b)
+
+    @classmethod
+    @service("busy", output=True, executor="thread", max_workers=1, max_queue=1)
+    def busy(cls, message):
+        time.sleep(message["delay"])
+        return dict()
+
+    @classmethod
+    @service("sink", executor="thread")
+    def sink(cls, message):
+        cls.received = message
+
+    @classmethod
+    def helper(cls, message):
+        return message
+
+
+@pytest.mark.asyncio
+async def test_executor_service():
+    node = RedisServiceNode()
+    await node.start(service_map={0: BlockingService}, redis_port=6396)
+    client = await aioredis.create_redis("redis://127.0.0.1:6396/0")
+    try:
+        assert await client.dbsize() == 4
+        reply = json.loads(await client.getset("thread", json.dumps(dict(delay=0))))
+        assert reply["thread"].startswith("porkpepper-service")
+
+        reply = json.loads(await client.getset("process", json.dumps(dict(a=6, b=7))))
+        assert reply["result"] == 42
+        assert reply["pid"] != os.getpid()
+
+        assert await client.set("sink", json.dumps(dict(x=1)))
+        assert BlockingService.received == dict(x=1)
+
+        other = await aioredis.create_redis("redis://127.0.0.1:6396/0")
+        started = time.perf_counter()
+        await asyncio.gather(*[c.getset("thread", json.dumps(dict(delay=0.2))) for c in (client, other, )])
+        assert time.perf_counter() - started < 0.35
+        other.close()
+        await other.wait_closed()
+
+        slow = asyncio.ensure_future(client.getset("busy", json.dumps(dict(delay=0.2))))
+        await asyncio.sleep(0.05)
+        other = await aioredis.create_redis("redis://127.0.0.1:6396/0")
+        with pytest.raises(aioredis.ReplyError, match="BUSY"):
+            await other.getset("busy", json.dumps(dict(delay=0)))
+        other.close()
+        await other.wait_closed()
+        assert await slow == b"{}"
+    finally:
+        client.close()
+        await client.wait_closed()
+        await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_executor_queue_limit():
+    executor = ServiceExecutor("thread", max_workers=1, max_queue=2)
+    tasks = [asyncio.ensure_future(executor.run(time.sleep, 0.1)) for _ in range(3)]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert isinstance(results[2], ServiceOverloaded)
+    assert results[:2] == [None, None]
+    assert executor.rejected == 1
+    assert executor.pending == 0
+    executor.shutdown()
+
+
+def test_executor_arguments():
+    with pytest.raises(ValueError):
+        service("x", executor="fiber")
+
+    class AsyncExecutorService:
+        @classmethod
+        @service("x", executor="thread")
+        async def x(cls, message):
+            pass
+
+    with pytest.raises(ValueError):
+        RedisServiceNode().update_service(0, AsyncExecutorService)
@@ -0,0 +1,30 @@
+import asyncio
+import pytest
+from porkpepper.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancel_caller():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def work():
+        started.set()
+        await asyncio.sleep(0.05)
+        return 1
+
+    leader = asyncio.ensure_future(flight.run(b"key", work))
+    await started.wait()
+    follower = asyncio.ensure_future(flight.run(b"key", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == 1
+    assert len(flight) == 0
+    assert (flight.calls, flight.coalesced) == (1, 1)
+
+    async def fail():
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        await flight.run(b"key", fail)
+    assert len(flight) == 0
@@ -0,0 +1,95 @@
+import os
+import json
+import signal
+import asyncio
+import pytest
+import aioredis
+from porkpepper.design import *
+from porkpepper.client import parse_info
+
+
+class WorkerService:
+    @classmethod
+    @service("pid", output=True)
+    async def pid(cls, message):
+        return dict(pid=os.getpid())
+
+    @classmethod
+    @service("process", output=True, executor="process", max_workers=1)
+    def process(cls, message):
+        return dict(pid=os.getpid(), parent=os.getppid())
+
+
+async def wait_for(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.05)
+
+
+@pytest.mark.asyncio
+async def test_serve_workers():
+    node = RedisServiceNode()
+    node.WORKER_CHECK_INTERVAL = 0.05
+    task = asyncio.create_task(node.serve(service_map={0: WorkerService}, redis_port=6395, workers=2))
+    await asyncio.wait_for(node.start_event.wait(), 2)
+    try:
+        pids = set()
+        for _ in range(20):
+            client = await aioredis.create_redis("redis://127.0.0.1:6395/0")
+            try:
+                reply = json.loads(await client.getset("pid", "{}"))
+            finally:
+                client.close()
+                await client.wait_closed()
+            pids.add(reply["pid"])
+        assert pids <= set(node.worker_pids)
+
+        client = await aioredis.create_redis("redis://127.0.0.1:6395/0")
+        reply = json.loads(await client.getset("process", "{}"))
+        assert reply["parent"] in node.worker_pids and reply["pid"] not in node.worker_pids
+        client.close()
+        await client.wait_closed()
+
+        await asyncio.sleep(0.3)
+        client = await aioredis.create_redis("redis://127.0.0.1:6395/0")
+        info = parse_info(await client.execute(b"INFO", b"stats"))["stats"]
+        assert int(info["total_commands_processed"]) >= 20
+        assert int(info["total_connections_received"]) >= 20
+        commandstats = await client.execute(b"INFO", b"commandstats")
+        assert b"cmdstat_getset:calls=21," in commandstats
+        client.close()
+        await client.wait_closed()
+
+        victim = node.worker_pids[0]
+        os.kill(victim, signal.SIGKILL)
+        await wait_for(lambda: node.worker_restarts == 1)
+        assert victim not in node.worker_pids
+        for _ in range(4):
+            client = await aioredis.create_redis("redis://127.0.0.1:6395/0")
+            reply = json.loads(await client.getset("pid", "{}"))
+            assert reply["pid"] in node.worker_pids
+            client.close()
+            await client.wait_closed()
+
+        await asyncio.sleep(0.3)
+        client = await aioredis.create_redis("redis://127.0.0.1:6395/0")
+        commandstats = await client.execute(b"INFO", b"commandstats")
+        assert b"cmdstat_getset:calls=25," in commandstats
+        info = parse_info(await client.execute(b"INFO", b"stats"))["stats"]
+        assert int(info["total_connections_received"]) >= 25
+        assert await client.execute(b"CONFIG", b"RESETSTAT") == b"OK"
+        client.close()
+        await client.wait_closed()
+        await asyncio.sleep(0.3)
+        for _ in range(4):
+            client = await aioredis.create_redis("redis://127.0.0.1:6395/0")
+            commandstats = await client.execute(b"INFO", b"commandstats")
+            assert b"cmdstat_getset" not in commandstats
+            client.close()
+            await client.wait_closed()
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    assert node.stop_event.is_set()